@@ -2,12 +2,18 @@
 Flask API Backend for Price Scraper Web Application
 Handles file uploads, scraping jobs, and email notifications
 """
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 import os
 import uuid
+import queue
+from collections import deque
+from functools import partial
+import shutil
+import tempfile
 import threading
+import time
 import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
@@ -24,126 +30,621 @@ app = Flask(__name__)
 CORS(app)
 
 # Configuration
-UPLOAD_FOLDER = 'uploads'
 RESULTS_FOLDER = 'results'
-ALLOWED_EXTENSIONS = {'xlsx', 'xls'}
+ALLOWED_EXTENSIONS = {'xlsx', 'xls', 'csv'}
 
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-os.makedirs(RESULTS_FOLDER, exist_ok=True)
+# Uploads larger than this are spooled to a temporary file instead of memory
+UPLOAD_SPOOL_BYTES = 8 * 1024 * 1024
 
-# Job status storage (in production, use Redis or database)
-jobs = {}
+os.makedirs(RESULTS_FOLDER, exist_ok=True)
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+# Column written to the results sheet for each site
+SITE_COLUMNS = {
+    'InkStation': 'Ink Station',
+    'HotToner': 'Hot Tonner',
+}
+
+# Sites fetched over plain HTTP through the async engine (InkStation needs a browser)
+HTTP_SITES = ['HotToner']
+
+
+def create_job(job_id, message='Job queued'):
+    """Add a pending job to the job store and start its event stream"""
+    from utils.job_store import get_job_store
+    from utils.job_events import get_job_events
+    get_job_store().create(job_id, message=message)
+    get_job_events().publish_state(job_id, status='pending', message=message,
+                                   progress={'current': 0, 'total': 0})
+
+
+def update_job(job_id, status=None, message=None, **details):
+    """Change a job's state in the job store and tell anyone watching it"""
+    from utils.job_store import get_job_store
+    from utils.job_events import get_job_events
+    get_job_store().update(job_id, status=status, message=message, **details)
+    changes = {key: value for key, value in (('status', status), ('message', message))
+               if value is not None}
+    if changes:
+        get_job_events().publish_state(job_id, **changes)
+
+
+def record_cache_lookups(job_id, site, hits, misses):
+    """Add result-cache hits/misses for a site to a job's status and the metrics"""
+    from utils.job_store import get_job_store
+    from utils.metrics import record_cache_lookup
+    get_job_store().add_counts(job_id, cache_hits=hits, cache_misses=misses)
+    record_cache_lookup(site, hits, misses)
+
+
 def worker_process(args):
-    """Worker function for parallel processing - must be at module level for pickling"""
-    worker_id, oem_codes_chunk, use_selenium, job_id = args
-    results = []
+    """
+    Look up a batch of codes on InkStation. Uses the browser's exported
+    Cloudflare clearance over plain HTTP when possible; the rest are loaded
+    in parallel tabs of one browser borrowed from the shared browser pool.
+    The pages are parsed on the parse workers, so the browser goes back to
+    the pool as soon as it has loaded them. Codes another job is already
+    looking up are not fetched again; this batch waits for that result.
     
-    # Import inside worker to avoid pickling issues
-    from scrapers.hottoner_scraper import scrape_hottoner
-    from scrapers.selenium_scraper import SeleniumScraper
+    Runs on the job scheduler's browser workers. Returns
+    [(code, {column: value}, spans)] so the job can record each code (and
+    where its lookup spent its time, see utils.job_trace) as soon as its
+    batch finishes.
+    """
+    from scrapers.browser_pool import get_browser_pool
+    from scrapers.inkstation_scraper import fetch_inkstation_cleared
+    from scrapers.parse_pool import ParseStage
+    from utils.result_cache import get_result_cache
+    from utils.single_flight import get_single_flight, flight_key
+    from utils.job_store import get_job_store
+    from utils.metrics import FETCH_SECONDS, WAIT_SECONDS
+    from utils.job_trace import span_since
+    import config
     
-    selenium_scraper = None
-    if use_selenium:
-        selenium_scraper = SeleniumScraper(headless=False)
+    codes, job_id = args
+    cache = get_result_cache()
+    flights = get_single_flight()
+    results = {}
+    timings = {}    # code -> spans
     
-    try:
-        for i, code in enumerate(oem_codes_chunk, 1):
-            row_data = {"OEM_CODE": code}
-            
-            # Scrape InkStation with Selenium
-            if use_selenium and selenium_scraper:
-                try:
-                    result = selenium_scraper.scrape_inkstation(code)
-                    if result:
-                        row_data["Ink Station"] = result.get("Price", "N/A")
-                    else:
-                        row_data["Ink Station"] = "N/A"
-                except Exception as e:
-                    row_data["Ink Station"] = "Error"
-            
-            # Scrape HotToner
-            try:
-                result = scrape_hottoner(code)
-                if result:
-                    row_data["Hot Tonner"] = result.get("Price", "N/A")
-                else:
-                    row_data["Hot Tonner"] = "N/A"
-            except Exception as e:
-                row_data["Hot Tonner"] = "Error"
-            
-            results.append(row_data)
-            
-            # Update progress (thread-safe update)
-            if job_id in jobs:
-                jobs[job_id]['progress']['current'] += 1
+    # Fresh cached results skip the network entirely
+    for code in codes:
+        cached = cache.get('InkStation', code)
+        if cached:
+            results[code] = cached
+    record_cache_lookups(job_id, 'InkStation', len(results), len(codes) - len(results))
+    cached_codes = set(results)
+    
+    # Lead the lookups nobody else is running; follow the rest
+    leading = []
+    following = {}
+    for code in codes:
+        if code in cached_codes:
+            continue
+        leader, future = flights.claim(flight_key('InkStation', code))
+        if leader:
+            leading.append(code)
+        else:
+            following[code] = future
+    if following:
+        get_job_store().add_counts(job_id, coalesced=len(following))
     
+    parse_stage = ParseStage(timing=lambda code, spans: timings.setdefault(code, []).extend(spans))
+    try:
+        fetched = set()
+        if config.INKSTATION_HTTP_HANDOFF:
+            for code in leading:
+                page = fetch_inkstation_cleared(code)
+                if page is not None:
+                    parse_stage.put(code, page)
+                    fetched.add(code)
+        
+        browser_codes = [code for code in leading if code not in fetched]
+        if browser_codes:
+            # No usable clearance - use a warm browser and refresh it
+            checkout_started = time.time()
+            with get_browser_pool().checkout() as selenium_scraper:
+                checkout_wait = span_since('browser_wait', checkout_started)
+                started = time.perf_counter()
+                pages = selenium_scraper.fetch_inkstation_many(browser_codes)
+                # The tabs load in parallel, so each page took the whole batch
+                elapsed = time.perf_counter() - started
+                for code, page in pages.items():
+                    FETCH_SECONDS.observe(elapsed, site='InkStation', via='browser')
+                    timings.setdefault(code, []).append(checkout_wait)
+                    parse_stage.put(code, page)
+                if config.INKSTATION_HTTP_HANDOFF:
+                    selenium_scraper.export_clearance()
+        
+        for code, result in parse_stage.finish():
+            results[code] = result
+    except Exception as e:
+        print(f"❌ InkStation worker error: {e}")
     finally:
-        if selenium_scraper:
-            selenium_scraper.close()
+        # Cache before resolving, so a lookup starting after this is a cache hit
+        for code in leading:
+            if code in results:
+                cache.put('InkStation', code, results[code])
+            flights.resolve(flight_key('InkStation', code), results.get(code))
     
-    return results
+    # Leaders are resolved above first, so two batches following each
+    # other's codes cannot wait on each other
+    for code, future in following.items():
+        try:
+            with WAIT_SECONDS.time(site='InkStation', reason='single_flight'):
+                result = future.result(timeout=config.SINGLE_FLIGHT_TIMEOUT)
+        except Exception as e:
+            print(f"❌ Shared InkStation lookup for {code} failed: {e}")
+            continue
+        if result is not None:
+            results[code] = result
+    
+    rows = []
+    for code in codes:
+        if code not in results:
+            values = {"Ink Station": "Error"}
+        elif results[code]:
+            values = {"Ink Station": results[code].get("Price", "N/A")}
+        else:
+            values = {"Ink Station": "N/A"}
+        rows.append((code, values, timings.get(code, [])))
+    return rows
 
 
-def run_scraper_job(job_id, input_file, output_file, email):
-    """Run the scraper in a background thread"""
+class JobResults:
+    """
+    Collects per-site results for a job as they stream in from the async
+    engine and the worker pool, and keeps the job's progress up to date.
+    A code counts as done once every site has reported for it.
+    Codes are added as they are read from the upload, and finished rows
+    go straight to the job's ResultWriter in input order, so only codes
+    still in flight are held in memory. Each code and finished row is
+    also recorded in the job's checkpoint, if there is one, and published
+    to the job's live event stream. Row writes are timed into the job's
+    JobTrace, if there is one, and each row's event carries the code's
+    seconds per stage.
+    """
+    
+    def __init__(self, job_id, columns, writer, checkpoints=None, trace=None):
+        from utils.job_store import get_job_store
+        from utils.job_events import get_job_events
+        from utils.metrics import CODES_COMPLETED
+        
+        self.job_id = job_id
+        self.store = get_job_store()
+        self.events = get_job_events()
+        self.columns = list(columns)
+        self.writer = writer
+        self.checkpoints = checkpoints
+        self.trace = trace
+        self.codes_completed = CODES_COMPLETED
+        self._seq = 0            # codes added so far
+        self._order = deque()    # codes not yet written, in input order
+        self._rows = {}          # code -> row, once a site has reported
+        self._pending = {}       # code -> columns still to report
+        self._progress = {'current': 0, 'total': 0}
+        self._lock = threading.Lock()
+    
+    def add_code(self, code, row=None):
+        """
+        Start tracking a code read from the input file.
+        
+        Args:
+            code: OEM code
+            row (dict): The code's finished row, when resuming from a
+                checkpoint (the code is then not scraped again)
+        """
+        with self._lock:
+            self._order.append(code)
+            if row is not None:
+                self._rows[code] = row
+                self._count(total=1, current=1)
+                self._write_finished()
+            else:
+                self._pending[code] = set(self.columns)
+                self._count(total=1)
+                if self.checkpoints:
+                    self.checkpoints.add_code(self.job_id, self._seq, code)
+            self._seq += 1
+    
+    def _count(self, current=0, total=0):
+        # Called with the lock held
+        self._progress['current'] += current
+        self._progress['total'] += total
+        self.store.add_counts(self.job_id, current=current, total=total)
+        self.events.publish_state(self.job_id, progress=dict(self._progress))
+    
+    def _write(self, code, row):
+        from utils.job_trace import span_since
+        started = time.time()
+        self.writer.write(row)
+        timings = self.trace.written(code, span_since('write', started)) if self.trace else None
+        self.events.publish_result(self.job_id, row, timings)
+    
+    def _blank_row(self, code):
+        return {"OEM_CODE": code, **{column: "N/A" for column in self.columns}}
+    
+    def add(self, code, values):
+        """
+        Record results for one code.
+        
+        Args:
+            code: OEM code the values belong to
+            values (dict): Column -> value for the sites that just finished
+        """
+        with self._lock:
+            pending = self._pending.get(code)
+            if pending is None:
+                return
+            self._rows.setdefault(code, self._blank_row(code)).update(values)
+            pending.difference_update(values)
+            if not pending:
+                del self._pending[code]
+                if self.checkpoints:
+                    self.checkpoints.code_done(self.job_id, code, self._rows[code])
+                self._count(current=1)
+                self.codes_completed.inc()
+                self._write_finished()
+    
+    def _write_finished(self):
+        # Write the run of finished codes at the front of the input order
+        while self._order and self._order[0] not in self._pending:
+            code = self._order.popleft()
+            self._write(code, self._rows.pop(code))
+    
+    def close(self):
+        """Write the codes still unfinished (as far as they got) and close the writer"""
+        with self._lock:
+            while self._order:
+                code = self._order.popleft()
+                self._pending.pop(code, None)
+                self._write(code, self._rows.pop(code, None) or self._blank_row(code))
+            self.writer.close()
+
+
+def run_scraper_job(job_id, upload, filename, output_file, email, profile=False):
+    """
+    Run the scraper in a background thread.
+    
+    Codes are streamed from the upload: the first rows are being scraped
+    while the rest of the file is still being read.
+    
+    Args:
+        job_id (str): Job to update
+        upload (file): Uploaded file (binary, seekable); closed when done
+        filename (str): Upload's file name, used to pick the format
+        output_file (str): Where to write the results workbook
+        email (str): Where to send the results
+        profile (bool): Write per-code timings and a trace file
+    """
+    from utils.excel_handler import iter_oem_codes
+    from utils.job_checkpoint import get_job_checkpoints
+    
+    checkpoints = get_job_checkpoints()
+    if checkpoints:
+        checkpoints.start(job_id, filename, output_file, email)
+    
+    def codes():
+        try:
+            for code in iter_oem_codes(upload, filename):
+                yield code, None
+        finally:
+            upload.close()
+    
+    _run_job(job_id, codes(), output_file, email, checkpoints, profile)
+
+
+def resume_scraper_job(job_id, output_file, email):
+    """
+    Continue a job interrupted by a restart, in a background thread.
+    Rows finished before the restart are taken from the checkpoint; only
+    the remaining codes are scraped.
+    
+    Args:
+        job_id (str): Job to resume
+        output_file (str): Where to write the results workbook
+        email (str): Where to send the results
+    """
+    from utils.job_checkpoint import get_job_checkpoints
+    import config
+    
+    # Whether the job was profiled is not checkpointed; use the default
+    checkpoints = get_job_checkpoints()
+    _run_job(job_id, checkpoints.codes(job_id), output_file, email, checkpoints, config.PROFILE_JOBS)
+
+
+def _run_job(job_id, codes, output_file, email, checkpoints, profile=False):
+    """
+    Scrape a job's codes, write the results and email them.
+    
+    Args:
+        job_id (str): Job to update
+        codes (iterable): (code, finished row or None) in input order,
+            consumed on a reader thread
+        output_file (str): Where to write the results workbook
+        email (str): Where to send the results
+        checkpoints (JobCheckpoints): Where progress is recorded (or None)
+        profile (bool): Write per-code timings and a trace file next to
+            the results (see utils.job_trace)
+    """
+    from utils.job_store import get_job_store
+    from utils.job_trace import JobTrace
+    
+    store = get_job_store()
     try:
         # Import scraper modules
-        from utils.excel_handler import read_oem_codes
-        import pandas as pd
-        from multiprocessing import Pool
-        
-        jobs[job_id]['status'] = 'running'
-        jobs[job_id]['message'] = 'Reading OEM codes from file...'
-        
-        # Read OEM codes
-        oem_codes = read_oem_codes(input_file)
-        total_codes = len(oem_codes)
-        
-        jobs[job_id]['progress'] = {'current': 0, 'total': total_codes}
-        jobs[job_id]['message'] = f'Found {total_codes} OEM codes. Starting parallel scraping...'
-        
-        # Split codes into chunks for parallel processing
-        num_workers = 4
-        chunk_size = len(oem_codes) // num_workers
-        chunks = []
-        for i in range(num_workers):
-            start_idx = i * chunk_size
-            if i == num_workers - 1:
-                end_idx = len(oem_codes)
-            else:
-                end_idx = start_idx + chunk_size
-            chunks.append(oem_codes[start_idx:end_idx])
+        from utils.excel_handler import ResultWriter
+        from scrapers.async_runner import scrape_pairs
+        from scrapers.parse_pool import ParseStage
+        from utils.async_fetch import AsyncFetcher
+        from utils.result_cache import get_result_cache
+        from scrapers.browser_pool import get_browser_pool
+        from scrapers.job_scheduler import get_job_scheduler
+        from utils.single_flight import get_single_flight, flight_key
+        from utils.request_utils import get_session_pool
+        import config
+        
+        update_job(job_id, status='running', message='Reading OEM codes and scraping...')
+        store.reset_counts(job_id)
         
-        worker_args = [(i+1, chunk, True, job_id) for i, chunk in enumerate(chunks)]
+        # Rows are written as they finish; the workbook is completed at the end
+        writer = ResultWriter(output_file, ['OEM_CODE'] + list(SITE_COLUMNS.values()))
+        trace = JobTrace(job_id, output_file, profile)
+        results = JobResults(job_id, list(SITE_COLUMNS.values()), writer, checkpoints, trace)
         
-        # Run parallel scraping
-        all_results = []
-        with Pool(processes=num_workers) as pool:
-            worker_results = pool.map(worker_process, worker_args)
-            for results in worker_results:
-                all_results.extend(results)
+        # The reader thread feeds codes to both fetch stages as it reads
+        # them. Workers pull browser batches from a queue, so a slow code
+        # (e.g. a Cloudflare challenge) only holds up its own worker.
+        batch_size = config.WORK_BATCH_SIZE
+        browser_batches = queue.Queue()
+        http_codes = queue.Queue()
+        reader_errors = []
         
-        # Save results to Excel
-        df = pd.DataFrame(all_results)
-        df.to_excel(output_file, index=False, engine='openpyxl')
+        def read_codes():
+            batch = []
+            try:
+                for code, row in codes:
+                    results.add_code(code, row)
+                    if row is not None:
+                        continue
+                    http_codes.put(code)
+                    batch.append(code)
+                    if len(batch) >= batch_size:
+                        browser_batches.put(batch)
+                        batch = []
+                if batch:
+                    browser_batches.put(batch)
+                if checkpoints:
+                    checkpoints.input_read(job_id)
+            except Exception as e:
+                reader_errors.append(e)
+            finally:
+                browser_batches.put(None)
+                http_codes.put(None)
+        
+        reader = threading.Thread(target=read_codes, daemon=True)
+        reader.start()
+        
+        # Run browser scraping on the scheduler's workers (one per pooled
+        # browser, shared in turn by every running job) while the HTTP sites
+        # are fetched concurrently by the async engine in this thread
+        scheduler = get_job_scheduler()
+        fetcher = AsyncFetcher()
+        try:
+            worker_args = ((batch, job_id) for batch in iter(browser_batches.get, None))
+            browser_results = scheduler.imap_unordered(job_id, worker_process, worker_args)
+            
+            # Drain worker results as they arrive so progress moves live
+            browser_errors = []
+            
+            def collect_browser_results():
+                try:
+                    for batch_rows in browser_results:
+                        for code, row_data, spans in batch_rows:
+                            trace.add(code, 'InkStation', spans)
+                            results.add(code, row_data)
+                except Exception as e:
+                    browser_errors.append(e)
+            
+            collector = threading.Thread(target=collect_browser_results, daemon=True)
+            collector.start()
+            
+            # HTTP sites: answer from the result cache where possible, share
+            # lookups another job already has in flight and fetch the rest
+            cache = get_result_cache()
+            flights = get_single_flight()
+            # Lookups this job leads. http_pairs() is pulled on the fetch
+            # engine's helper thread while this thread resolves the lookups,
+            # so `leading` is guarded by a lock. Once `stopped` is set, a
+            # lookup claimed late is failed at once instead of being left
+            # for followers to wait on.
+            leading = set()
+            leading_lock = threading.Lock()
+            stopped = threading.Event()
+            following = []    # only read once http_pairs() is exhausted
+            
+            def add_http_result(site, code, result):
+                price = result.get("Price", "N/A") if result else "N/A"
+                results.add(code, {SITE_COLUMNS[site]: price})
+            
+            def follow(site, code, future):
+                if not future.cancelled() and future.exception() is None:
+                    add_http_result(site, code, future.result())
+            
+            def http_pairs():
+                for code in iter(http_codes.get, None):
+                    for site in HTTP_SITES:
+                        cached = cache.get(site, code)
+                        record_cache_lookups(job_id, site, int(bool(cached)), int(not cached))
+                        if cached:
+                            results.add(code, {SITE_COLUMNS[site]: cached.get("Price", "N/A")})
+                            continue
+                        leader, future = flights.claim(flight_key(site, code))
+                        if leader:
+                            with leading_lock:
+                                abandoned = stopped.is_set()
+                                if not abandoned:
+                                    leading.add((site, code))
+                            if abandoned:
+                                flights.fail(flight_key(site, code), RuntimeError("lookup abandoned"))
+                                return
+                            yield site, code
+                        else:
+                            store.add_counts(job_id, coalesced=1)
+                            following.append((site, code, future))
+                            future.add_done_callback(partial(follow, site, code))
+            
+            try:
+                parse_stage = ParseStage(timing=lambda key, spans: trace.add(key[1], key[0], spans))
+                for site, code, result in scrape_pairs(http_pairs(), fetcher, parse_stage):
+                    cache.put(site, code, result)
+                    add_http_result(site, code, result)
+                    flights.resolve(flight_key(site, code), result)
+                    with leading_lock:
+                        leading.discard((site, code))
+            finally:
+                # If the loop stopped early, stop the engine pulling and
+                # fetching more pairs, then fail every lookup still led here
+                # (including pairs claimed but never fetched)
+                fetcher.close()
+                with leading_lock:
+                    stopped.set()
+                    abandoned = list(leading)
+                    leading.clear()
+                for site, code in abandoned:
+                    flights.fail(flight_key(site, code), RuntimeError("lookup abandoned"))
+            
+            # Shared lookups are recorded by their callbacks as they finish;
+            # wait for the rest before the results are closed
+            for site, code, future in following:
+                try:
+                    add_http_result(site, code, future.result(timeout=config.SINGLE_FLIGHT_TIMEOUT))
+                except Exception as e:
+                    print(f"❌ Shared {site} lookup for {code} failed: {e}")
+            
+            reader.join()
+            collector.join()
+            if reader_errors:
+                raise reader_errors[0]
+            if browser_errors:
+                raise browser_errors[0]
+        except BaseException:
+            scheduler.cancel(job_id)
+            raise
+        finally:
+            # Keep whatever finished, even if the job failed part way
+            results.close()
+            trace.close()
+            update_job(job_id, timings=trace.summary())
         
-        jobs[job_id]['status'] = 'completed'
-        jobs[job_id]['message'] = 'Scraping completed! Sending email...'
+        total_codes = writer.rows_written
+        # Async engine counters for this job, plus connection reuse of the
+        # pooled requests sessions (make_request and the cleared InkStation
+        # fetches) - those are per process, shared by every job
+        connections = dict(fetcher.stats, sessions=get_session_pool().connection_stats())
+        update_job(job_id, status='completed', message='Scraping completed! Sending email...',
+                     connections=connections, browser_pool=get_browser_pool().metrics())
         
         # Send email with results
         send_email_with_attachment(email, output_file, total_codes)
         
-        jobs[job_id]['message'] = 'Email sent successfully!'
+        update_job(job_id, message='Email sent successfully!')
+        if checkpoints:
+            checkpoints.finish(job_id, 'completed')
         
     except Exception as e:
-        jobs[job_id]['status'] = 'error'
-        jobs[job_id]['message'] = f'Error: {str(e)}'
+        update_job(job_id, status='error', message=f'Error: {str(e)}')
         print(f"Scraper error: {e}")
+        if checkpoints:
+            checkpoints.finish(job_id, 'error')
+
+
+_started = False
+_started_lock = threading.Lock()
+
+
+@app.before_request
+def startup():
+    """
+    One-time start-up work for this process: resume the jobs interrupted
+    by the last shutdown, and keep taking over the jobs of API processes
+    that die later. Runs before the first request whatever server hosts
+    the app (the debug reloader's watcher process never serves, so it
+    never resumes anything); __main__ also calls it eagerly.
+    """
+    global _started
+    with _started_lock:
+        if _started:
+            return
+        _started = True
+    threading.Thread(target=watch_for_dead_owners, daemon=True).start()
+
+
+def watch_for_dead_owners():
+    """
+    Resume interrupted jobs now and every JOB_OWNER_LEASE_SECONDS. A job
+    is only taken over once its owner's heartbeat has expired, so a quick
+    restart picks up its old jobs on the first check after the lease runs out.
+    """
+    import config
+    
+    while True:
+        try:
+            resume_jobs()
+        except Exception as e:
+            print(f"⚠️  Could not resume interrupted jobs: {e}")
+        time.sleep(config.JOB_OWNER_LEASE_SECONDS)
+
+
+def resume_jobs():
+    """
+    Restart the jobs that were running when their API process stopped.
+    Jobs that cannot be resumed are marked as failed in the job store.
+    Jobs whose process is still running (this one, or another API worker
+    sharing the job store, going by its heartbeat) are left alone.
+    
+    Returns:
+        int: Number of jobs resumed
+    """
+    from utils.job_checkpoint import get_job_checkpoints
+    from utils.job_store import get_job_store, ACTIVE_STATUSES
+    from scrapers.job_scheduler import get_job_scheduler
+    
+    store = get_job_store()
+    checkpoints = get_job_checkpoints()
+    
+    resumed = set()
+    claimed = set()
+    for job in (checkpoints.unfinished_jobs() if checkpoints else []):
+        job_id = job['job_id']
+        if not store.claim(job_id):
+            continue
+        claimed.add(job_id)
+        if not job['input_complete']:
+            # The upload itself is not kept, so codes never read are gone
+            print(f"⚠️  Job {job_id} stopped while reading its upload - cannot resume")
+            checkpoints.finish(job_id, 'error')
+            continue
+        
+        create_job(job_id, message='Resuming after restart')
+        get_job_scheduler().submit(job_id, resume_scraper_job,
+                                   (job_id, job['output_file'], job['email']), force=True)
+        resumed.add(job_id)
+    
+    # Anything else still active whose process died cannot be resumed
+    for status in ACTIVE_STATUSES:
+        for job_id in store.find(status):
+            if job_id in resumed:
+                continue
+            if job_id in claimed or store.claim(job_id):
+                update_job(job_id, status='error', message='Error: Interrupted by a restart')
+    
+    if resumed:
+        print(f"🔁 Resumed {len(resumed)} interrupted job(s)")
+    return len(resumed)
 
 
 def send_email_with_attachment(to_email, file_path, total_codes):
@@ -223,38 +724,48 @@ def start_scrape():
             return jsonify({'error': 'No file selected'}), 400
         
         if not allowed_file(file.filename):
-            return jsonify({'error': 'Invalid file type. Only .xlsx and .xls allowed'}), 400
+            return jsonify({'error': 'Invalid file type. Only .xlsx, .xls and .csv allowed'}), 400
+        
+        # Turn the upload away before reading it if no slot is left
+        from scrapers.job_scheduler import get_job_scheduler, JobQueueFull
+        scheduler = get_job_scheduler()
+        if scheduler.is_full():
+            return jsonify({'error': 'Too many jobs are queued. Please try again later.'}), 429
         
         # Generate unique job ID
         job_id = str(uuid.uuid4())
         
-        # Save uploaded file
+        # Keep the upload for the job instead of saving it to disk -
+        # the request's stream is gone once this handler returns
         filename = secure_filename(file.filename)
-        input_file = os.path.join(UPLOAD_FOLDER, f'{job_id}_{filename}')
-        file.save(input_file)
+        upload = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES)
+        shutil.copyfileobj(file.stream, upload)
+        upload.seek(0)
         
         # Output file path
         output_file = os.path.join(RESULTS_FOLDER, f'{job_id}_results.xlsx')
         
+        # Per-job profiling: form field or ?profile=1, default from config
+        import config
+        profile_flag = request.form.get('profile', request.args.get('profile'))
+        profile = (profile_flag.lower() in ('1', 'true', 'yes', 'on') if profile_flag is not None
+                   else config.PROFILE_JOBS)
+        
         # Create job record
-        jobs[job_id] = {
-            'status': 'pending',
-            'progress': {'current': 0, 'total': 0},
-            'message': 'Job queued',
-            'created_at': datetime.now().isoformat()
-        }
-        
-        # Start scraping in background thread
-        thread = threading.Thread(
-            target=run_scraper_job,
-            args=(job_id, input_file, output_file, email)
-        )
-        thread.daemon = True
-        thread.start()
+        create_job(job_id)
+        
+        # Queue the job; it runs in a background thread once a slot is free
+        try:
+            scheduler.submit(job_id, run_scraper_job, (job_id, upload, filename, output_file, email, profile))
+        except JobQueueFull:
+            upload.close()
+            update_job(job_id, status='error', message='Error: Too many jobs are queued')
+            return jsonify({'error': 'Too many jobs are queued. Please try again later.'}), 429
         
         return jsonify({
             'job_id': job_id,
-            'message': 'Scraping job started'
+            'message': 'Scraping job started',
+            'queue': scheduler.queue_info(job_id)
         }), 200
         
     except Exception as e:
@@ -264,20 +775,163 @@ def start_scrape():
 @app.route('/api/status/<job_id>', methods=['GET'])
 def get_status(job_id):
     """Get status of a scraping job"""
-    if job_id not in jobs:
+    from utils.job_store import get_job_store
+    from scrapers.job_scheduler import get_job_scheduler
+    store = get_job_store()
+    job = store.get(job_id)
+    if job is None:
         return jsonify({'error': 'Job not found'}), 404
     
-    return jsonify(jobs[job_id]), 200
+    # Waiting jobs: place in the queue and when they should start
+    queue_info = get_job_scheduler().queue_info(
+        job_id, progress_of=lambda running_id: (store.get(running_id) or {}).get('progress')
+    )
+    if queue_info:
+        job['queue'] = queue_info
+    
+    return jsonify(job), 200
+
+
+@app.route('/api/events/<job_id>', methods=['GET'])
+def stream_events(job_id):
+    """
+    Stream a job's progress, finished rows and final state as server-sent
+    events: 'status' (full snapshot) first, then 'progress', 'result',
+    'queue' while waiting, and 'done' before the stream ends. A job run by
+    another API process that stops changing for SSE_STORE_MAX_IDLE seconds
+    gets a last 'status' (with 'stream': 'closed') instead of 'done'.
+    """
+    from utils.job_store import get_job_store
+    from utils.job_events import get_job_events, sse_message
+    from scrapers.job_scheduler import get_job_scheduler
+    import config
+    
+    store = get_job_store()
+    job = store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    events = get_job_events()
+    scheduler = get_job_scheduler()
+    
+    def queue_info():
+        return scheduler.queue_info(
+            job_id, progress_of=lambda running_id: (store.get(running_id) or {}).get('progress')
+        )
+    
+    def queue_events():
+        info = queue_info()
+        return [('queue', info)] if info else []
+    
+    def stream():
+        snapshot = dict(job)
+        info = queue_info()
+        if info:
+            snapshot['queue'] = info
+        yield sse_message('status', snapshot)
+        if job['status'] in ('completed', 'error'):
+            yield sse_message('done', {'status': job['status'], 'message': job['message']})
+            return
+        
+        if events.has_job(job_id):
+            for item in events.watch(job_id, idle=queue_events):
+                yield ': keepalive\n\n' if item is None else sse_message(*item)
+            return
+        
+        # The job runs in another API process - follow it through the store
+        last = job
+        changed = time.monotonic()
+        while True:
+            time.sleep(config.SSE_STORE_POLL_SECONDS)
+            current = store.get(job_id)
+            if current is None:
+                return
+            if current == last:
+                if time.monotonic() - changed >= config.SSE_STORE_MAX_IDLE:
+                    print(f"⚠️  Job {job_id} unchanged for {config.SSE_STORE_MAX_IDLE}s - closing its event stream")
+                    yield sse_message('status', dict(current, stream='closed'))
+                    return
+                yield ': keepalive\n\n'
+                continue
+            last = current
+            changed = time.monotonic()
+            yield sse_message('progress', {key: current[key] for key in ('status', 'message', 'progress')})
+            if current['status'] in ('completed', 'error'):
+                yield sse_message('done', {'status': current['status'], 'message': current['message']})
+                return
+    
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()}), 200
+    from scrapers.browser_pool import get_browser_pool
+    from utils.selector_stats import get_selector_stats
+    from utils.job_store import get_job_store, ACTIVE_STATUSES
+    from scrapers.job_scheduler import get_job_scheduler
+    from utils.single_flight import get_single_flight
+    from utils.request_utils import get_session_pool
+    selector_stats = get_selector_stats()
+    store = get_job_store()
+    return jsonify({
+        'status': 'healthy',
+        'timestamp': datetime.now().isoformat(),
+        'jobs': {status: len(store.find(status)) for status in ACTIVE_STATUSES},
+        'scheduler': get_job_scheduler().metrics(),
+        'single_flight': get_single_flight().metrics(),
+        'browser_pool': get_browser_pool().metrics(),
+        'http_sessions': get_session_pool().connection_stats(),
+        'selectors': selector_stats.snapshot() if selector_stats else {}
+    }), 200
+
+
+@app.route('/api/metrics', methods=['GET'])
+def export_metrics():
+    """Prometheus metrics (text exposition format)"""
+    from scrapers.browser_pool import get_browser_pool
+    from scrapers.job_scheduler import get_job_scheduler
+    from utils.job_store import get_job_store
+    from utils import metrics as m
+    
+    # Gauges are sampled when scraped; counters and histograms are
+    # recorded by the pipeline as it runs
+    scheduler = get_job_scheduler()
+    scheduler_metrics = scheduler.metrics()
+    m.QUEUE_DEPTH.set(scheduler_metrics['queued'])
+    m.JOBS_RUNNING.set(scheduler_metrics['running'])
+    m.BROWSER_BATCHES_PENDING.set(sum(scheduler_metrics['pending_batches'].values()))
+    pool_metrics = get_browser_pool().metrics()
+    m.BROWSERS_OPEN.set(pool_metrics['open'])
+    m.BROWSERS_ACTIVE.set(max(pool_metrics['open'] - pool_metrics['idle'], 0))
+    
+    store = get_job_store()
+    m.JOB_CODES_PER_SECOND.clear()
+    for job_id, elapsed in scheduler.running_times().items():
+        job = store.get(job_id)
+        if job and elapsed > 0:
+            m.JOB_CODES_PER_SECOND.set(round(job['progress']['current'] / elapsed, 3), job_id=job_id)
+    
+    return Response(m.REGISTRY.render(), content_type=m.CONTENT_TYPE)
 
 
 if __name__ == '__main__':
     print("🚀 Price Scraper API Starting...")
     print("📡 API URL: http://localhost:5000")
     print("📧 Make sure to set EMAIL_FROM and EMAIL_PASSWORD in .env")
+    
+    # Launch and Cloudflare-clear the shared browsers before the first job.
+    # With the debug reloader only the serving child process does this.
+    import config
+    if config.BROWSER_POOL_PREWARM and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        from scrapers.browser_pool import get_browser_pool
+        print("🌐 Warming up browser pool...")
+        get_browser_pool().start()
+    
+    # Pick up jobs interrupted by the last shutdown now rather than on the
+    # first request (serving process only)
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        startup()
+    
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,80 @@
+"""Benchmark the HTML parser backends on synthetic search pages"""
+import sys
+import time
+sys.path.append('.')
+
+import config
+from scrapers.hottoner_scraper import parse_hottoner
+from scrapers.inkstation_scraper import parse_inkstation
+from scrapers.inkdepot_scraper import parse_inkdepot
+
+ROUNDS = 20
+
+# Roughly the size of a real search page: navigation, a results grid,
+# a long footer and inline scripts
+CHROME = "".join(
+    f'<li class="menu-item"><a href="/category/{i}">Category {i}</a></li>' for i in range(300)
+)
+FOOTER = "".join(
+    f'<div class="footer-col"><p>Footer text {i} about delivery and returns</p></div>' for i in range(300)
+)
+SCRIPTS = "<script>" + "var x = 1;\n" * 2000 + "</script>"
+
+
+def page(body):
+    return (
+        f"<html><head><title>Search</title>{SCRIPTS}</head><body>"
+        f"<ul class='nav'>{CHROME}</ul>{body}<footer>{FOOTER}</footer></body></html>"
+    )
+
+
+HOTTONER_PAGE = page(
+    "<div class='product-list'><ul>" + "".join(
+        f"<li><table><tr><td class='pl-name'><a href='/p/{i}'>Brother TN-{i} Toner</a></td>"
+        f"<td class='pl-our-price'>${40 + i}.95</td><td>InStock</td></tr></table></li>"
+        for i in range(40)
+    ) + "</ul></div>"
+)
+
+INKSTATION_PAGE = page(
+    "<div class='results'>" + "".join(
+        f"<div class='productCard'><a class='product-title' href='/p/{i}'>Genuine Ink {i}</a>"
+        f"<span class='product-price'>${20 + i}.50</span><p>In stock</p></div>"
+        for i in range(40)
+    ) + "</div>"
+)
+
+INKDEPOT_PAGE = page(
+    "<ul class='grid'>" + "".join(
+        f"<li class='grid-product'><h3>HP {i}A Cartridge</h3>"
+        f"<p class='regular-price'>${60 + i}.00</p><span>Available</span></li>"
+        for i in range(40)
+    ) + "</ul>"
+)
+
+SITES = [
+    ("HotToner", parse_hottoner, HOTTONER_PAGE),
+    ("InkStation", parse_inkstation, INKSTATION_PAGE),
+    ("InkDepot", parse_inkdepot, INKDEPOT_PAGE),
+]
+
+
+def time_backend(site, parse, html, backend):
+    config.HTML_PARSER_BACKENDS[site] = backend
+    record = parse(html, "TEST")
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        parse(html, "TEST")
+    return record, (time.perf_counter() - started) / ROUNDS * 1000
+
+
+if __name__ == "__main__":
+    print(f"{'Site':<12}{'KB':>6}{'soup ms':>10}{'lxml ms':>10}{'speedup':>9}  same record")
+    for site, parse, html in SITES:
+        soup_record, soup_ms = time_backend(site, parse, html, "beautifulsoup")
+        lxml_record, lxml_ms = time_backend(site, parse, html, "lxml")
+        print(f"{site:<12}{len(html) // 1024:>6}{soup_ms:>10.1f}{lxml_ms:>10.1f}"
+              f"{soup_ms / lxml_ms:>8.1f}x  {'✅' if soup_record == lxml_record else '❌'}")
+        if soup_record != lxml_record:
+            print(f"   soup: {soup_record}\n   lxml: {lxml_record}")
+    config.HTML_PARSER_BACKENDS.clear()
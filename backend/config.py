@@ -22,7 +22,8 @@ OUTPUT_FILE = "data/price_comparison.xlsx"
 # Useful for testing with a subset of data
 BATCH_SIZE = None  # Set to a number like 10 for testing
 
-# Delay between requests (in seconds)
+# Delay between requests (in seconds) for random_delay()
+# The scrapers themselves are paced by RATE_LIMITS below
 MIN_DELAY = 1  # Minimum delay
 MAX_DELAY = 3  # Maximum delay
 
@@ -32,6 +33,9 @@ REQUEST_TIMEOUT = 10
 # Maximum retry attempts for failed requests
 MAX_RETRIES = 3
 
+# Keep-alive connections kept open per host by each worker's session pool
+HTTP_POOL_SIZE = 10
+
 
 # ============================================================
 # WEBSITE SCRAPERS
@@ -51,15 +55,264 @@ ENABLE_CARTRIDGESTORE = True
 # Use Selenium for JavaScript-heavy sites (requires selenium installed)
 USE_SELENIUM = False
 
+# HTML parser used to extract products: "lxml" (C parser + XPath, falls
+# back automatically if lxml is not installed) or "beautifulsoup"
+# (pure-Python html.parser)
+HTML_PARSER_BACKEND = "lxml"
+
+# Per-site overrides, e.g. {"InkDepot": "beautifulsoup"}
+HTML_PARSER_BACKENDS = {}
+
+# Stream HotToner pages through an incremental parser and stop reading
+# once the product block is complete (needs the lxml backend)
+HTML_STREAMING = True
+
+# Bytes read from the socket per parser feed
+HTML_STREAM_CHUNK_SIZE = 16 * 1024
+
+# After stopping early, read and discard at most this many remaining bytes
+# to keep the connection alive; larger remainders close the connection
+HTML_STREAM_DRAIN_BYTES = 32 * 1024
+
+# Worker processes that parse downloaded pages (0 = parse in the fetching
+# thread). Sized separately from the fetchers: ASYNC_MAX_IN_FLIGHT and
+# MAX_WORKERS bound the I/O, this bounds the CPU spent on parsing.
+PARSE_WORKERS = 2
+
+# Pages handed to a parse worker at a time
+PARSE_BATCH_SIZE = 8
+
+# A partial batch goes to the parse workers once its first page has waited
+# this long, and finished batches are collected at least this often, so a
+# trickling fetch stage does not hold pages back
+PARSE_FLUSH_SECONDS = 0.2
+
+# Learn which selector in the InkStation/InkDepot cascades matches and try
+# it first. Hit counts are kept in SELECTOR_STATS_FILE across restarts.
+SELECTOR_STATS_ENABLED = True
+SELECTOR_STATS_FILE = "cache/selector_stats.sqlite3"
+
+# Scores of a field's selectors are multiplied by this on every hit, so a
+# new winner overtakes an old one quickly when a site changes its markup
+SELECTOR_SCORE_DECAY = 0.98
+
+# Hits buffered per process before they are written (or after this many seconds)
+SELECTOR_STATS_FLUSH_EVERY = 50
+SELECTOR_STATS_FLUSH_SECONDS = 30
+
 # Save HTML for debugging (creates debug files)
 DEBUG_SAVE_HTML = False
 
 # Verbose logging (show more detailed output)
 VERBOSE_LOGGING = False
 
-# Number of parallel workers (for concurrent scraping)
-# WARNING: Higher values may trigger rate limiting
-MAX_WORKERS = 1  # Set to 3-5 for parallel scraping
+# Maximum number of browsers in the shared browser pool. The actual count
+# is also capped by CPU cores and free memory. Request rate is capped by
+# RATE_LIMITS regardless of worker count.
+MAX_WORKERS = 4
+
+# Approximate memory used by one browser (Chrome + driver), in MB
+BROWSER_MEMORY_MB = 300
+
+# Pages a pooled browser may load before it is closed and replaced
+BROWSER_MAX_PAGES = 200
+
+# Seconds a job waits for a free browser before giving up on a code
+BROWSER_CHECKOUT_TIMEOUT = 600
+
+# Launch and Cloudflare-clear the pooled browsers when the API starts
+BROWSER_POOL_PREWARM = True
+
+# Upper bound (seconds) on waiting for an InkStation search page to render
+SELENIUM_RENDER_TIMEOUT = 15
+
+# Seconds without new network requests before a page counts as settled
+SELENIUM_NETWORK_QUIET = 0.5
+
+# InkStation searches loaded at once in separate tabs of one browser
+SELENIUM_TABS_PER_BROWSER = 4
+
+# Reuse the browser's Cloudflare clearance for plain HTTP InkStation lookups,
+# falling back to the browser only when a challenge page comes back
+INKSTATION_HTTP_HANDOFF = True
+
+# Where cleared cookies are kept between restarts
+CLEARANCE_FILE = "cache/cloudflare_clearance.json"
+
+# Codes handed to a worker at a time. A browser loads its batch in up to
+# SELENIUM_TABS_PER_BROWSER tabs at once. Small batches keep workers evenly
+# loaded; a slow code only delays its own batch.
+WORK_BATCH_SIZE = 4
+
+
+# ============================================================
+# RATE LIMITS
+# ============================================================
+
+# Requests per second allowed to each site. The budget is shared by every
+# API process, browser worker and running job; requests only wait once it
+# is used up.
+RATE_LIMITS = {
+    "www.hottoner.com.au": 4.0,
+    "www.inkstation.com.au": 1.0,
+    "www.inkdepot.com.au": 2.0,
+}
+
+# Requests per second for hosts not listed above (None = unlimited)
+DEFAULT_RATE_LIMIT = 2.0
+
+# Requests allowed back to back before the per-second rate kicks in
+RATE_LIMIT_BURST = 4
+
+# Where the budget is kept, so every API process on this machine draws from
+# it (must be on a local disk, like JOB_STORE_FILE)
+RATE_LIMIT_FILE = "cache/rate_limits.sqlite3"
+
+
+# ============================================================
+# RESULT CACHE
+# ============================================================
+
+# SQLite file holding recent (site, OEM code) results
+RESULT_CACHE_FILE = "cache/results.sqlite3"
+
+# Seconds a cached result stays fresh, per site (0 = don't cache)
+RESULT_CACHE_TTL = {
+    "HotToner": 6 * 60 * 60,
+    "InkStation": 6 * 60 * 60,
+    "InkDepot": 6 * 60 * 60,
+}
+
+# TTL for sites not listed above
+DEFAULT_RESULT_CACHE_TTL = 0
+
+# Conditional-request cache: keep ETag / Last-Modified validators and
+# compressed page bodies so unchanged pages come back as 304s
+HTTP_CACHE_ENABLED = True
+HTTP_CACHE_FILE = "cache/http_cache.sqlite3"
+
+# Drop stored pages not used for this many seconds
+HTTP_CACHE_MAX_AGE = 7 * 24 * 60 * 60
+
+
+# ============================================================
+# JOB STORE
+# ============================================================
+
+# Where job status and progress are kept: "sqlite" (shared by every API
+# worker process, survives restarts), "memory" (this process only) or the
+# dotted path of a custom JobStore class, e.g. "myapp.stores.RedisJobStore"
+JOB_STORE_BACKEND = "sqlite"
+JOB_STORE_FILE = "cache/jobs.sqlite3"
+
+# Progress increments are buffered for at most this many seconds
+JOB_STORE_FLUSH_SECONDS = 0.5
+
+# Finished jobs are deleted this many seconds after their last update
+JOB_STORE_TTL = 7 * 24 * 60 * 60
+
+# Seconds between compaction passes (run when a job is created); job
+# checkpoints are compacted on the same schedule
+JOB_STORE_COMPACT_INTERVAL = 60 * 60
+
+# Every API process refreshes a heartbeat in the job store this often.
+# A process whose heartbeat is older than JOB_OWNER_LEASE_SECONDS counts
+# as dead: its jobs are taken over (resumed, or marked failed) by the
+# others, which check for such jobs on that same interval.
+JOB_OWNER_HEARTBEAT_SECONDS = 10
+JOB_OWNER_LEASE_SECONDS = 60
+
+
+# ============================================================
+# JOB SCHEDULER
+# ============================================================
+
+# Jobs scraped at the same time. Their browser work shares one set of
+# workers (one per pooled browser), taken from each job in turn.
+MAX_RUNNING_JOBS = 2
+
+# Jobs allowed to wait for a free slot; further uploads get HTTP 429
+MAX_QUEUED_JOBS = 10
+
+# Both limits (and MAX_WORKERS browsers) hold for all API processes sharing
+# the job store together. A process checks this often whether a slot was
+# freed by another process's job.
+SCHEDULER_POLL_SECONDS = 2
+
+# Seconds a job waits for a lookup another job is already running for the
+# same (site, code) before recording it as an error
+SINGLE_FLIGHT_TIMEOUT = 900
+
+
+# ============================================================
+# LIVE PROGRESS (server-sent events)
+# ============================================================
+
+# Shortest time between two messages to one watcher; everything that
+# happened in between is sent together
+SSE_MIN_INTERVAL = 0.5
+
+# Seconds of silence before a keep-alive (and, for waiting jobs, a queue
+# position update) is sent
+SSE_KEEPALIVE_SECONDS = 5
+
+# Recent result rows replayed to a watcher that connects mid-job
+SSE_RESULT_BACKLOG = 200
+
+# Seconds a finished job's events are kept for late watchers
+SSE_CHANNEL_TTL = 10 * 60
+
+# Poll interval when the job runs in another API process
+SSE_STORE_POLL_SECONDS = 2
+
+# Seconds without any change to such a job before its stream is closed
+# (the job may be stuck or its process gone); the page then falls back
+# to polling /api/status
+SSE_STORE_MAX_IDLE = 10 * 60
+
+
+# ============================================================
+# JOB CHECKPOINTS
+# ============================================================
+
+# Record each job's codes and finished rows so jobs interrupted by a
+# restart resume where they stopped instead of starting over
+CHECKPOINT_ENABLED = True
+CHECKPOINT_FILE = "cache/job_checkpoints.sqlite3"
+
+# Checkpoint writes buffered before they are committed (or after this many
+# seconds). At most this much work is redone after a crash.
+CHECKPOINT_FLUSH_EVERY = 50
+CHECKPOINT_FLUSH_SECONDS = 5
+
+
+# ============================================================
+# JOB PROFILING
+# ============================================================
+
+# Write a per-code timing file (<results>_timings.jsonl) and a Chrome
+# trace-event file (<results>_trace.json) next to each job's results.
+# Jobs can turn this on or off with the "profile" form field or query
+# parameter of /api/scrape; this is the default. Every job's status
+# carries its seconds per stage either way.
+PROFILE_JOBS = False
+
+
+# ============================================================
+# ASYNC FETCH ENGINE (HTTP scrapers)
+# ============================================================
+
+# Maximum number of HTTP requests in flight across all hosts
+ASYNC_MAX_IN_FLIGHT = 200
+
+# Maximum concurrent requests to a single host (politeness limit)
+# Hosts not listed below use DEFAULT_HOST_CONCURRENCY
+DEFAULT_HOST_CONCURRENCY = 4
+HOST_CONCURRENCY = {
+    "www.hottoner.com.au": 8,
+    "www.inkstation.com.au": 4,
+    "www.inkdepot.com.au": 4,
+}
 
 
 # ============================================================
@@ -72,6 +325,14 @@ INCLUDE_SUMMARY_SHEET = True
 # Include timestamp in output filename
 ADD_TIMESTAMP_TO_OUTPUT = False  # If True, output will be like "results_2024-01-15.xlsx"
 
+# Result rows written before the side outputs are flushed to disk
+RESULT_FLUSH_EVERY = 100
+
+# Extra result files written next to the workbook as rows arrive:
+# "csv" and/or "jsonl". Unlike the .xlsx (complete only once the job
+# finishes) these hold every row up to the last flush if a job dies.
+RESULT_SIDE_OUTPUTS = []
+
 
 # ============================================================
 # USER AGENTS (Randomly selected for each request)
@@ -114,8 +375,8 @@ TIPS FOR CUSTOMIZATION:
    - Higher delays = slower but safer
 
 3. Parallel Scraping:
-   Set MAX_WORKERS = 3-5 for faster scraping
-   WARNING: May trigger rate limiting on some sites
+   MAX_WORKERS caps the shared browser pool
+   Per-site request rates are set in RATE_LIMITS
 
 4. Debugging:
    Set DEBUG_SAVE_HTML = True to save HTML files for inspection
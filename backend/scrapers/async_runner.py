@@ -0,0 +1,149 @@
+"""
+Run the HTTP scrapers through the asyncio fetch engine.
+Pages are fetched concurrently and handed to the parse stage as each one
+arrives.
+"""
+import sys
+import os
+from functools import partial
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.async_fetch import AsyncFetcher
+from utils.http_cache import cached_page
+from scrapers.hottoner_scraper import (
+    HOTTONER_HEADERS, build_hottoner_url, not_found_hottoner, error_hottoner, stream_hottoner
+)
+from scrapers.inkstation_scraper import (
+    build_inkstation_url, not_found_inkstation, error_inkstation
+)
+from scrapers.inkdepot_scraper import (
+    build_inkdepot_url, not_found_inkdepot, error_inkdepot
+)
+from scrapers.parse_pool import Page, ParseStage
+
+
+# Per-site hooks used by scrape_many. Pages are parsed by the site's entry
+# in scrapers.parse_pool.parsers(). `headers` of None means the
+# rotating headers from utils.request_utils.get_headers(). `stream`, if set,
+# builds an extractor that parses the page while it downloads and stops
+# reading once the product is found.
+HTTP_SITES = {
+    "HotToner": {
+        "build_url": build_hottoner_url,
+        "not_found": not_found_hottoner,
+        "error": error_hottoner,
+        "headers": HOTTONER_HEADERS,
+        "stream": stream_hottoner,
+    },
+    "InkStation": {
+        "build_url": build_inkstation_url,
+        "not_found": not_found_inkstation,
+        "error": error_inkstation,
+        "headers": None,
+        "stream": None,
+    },
+    "InkDepot": {
+        "build_url": build_inkdepot_url,
+        "not_found": not_found_inkdepot,
+        "error": error_inkdepot,
+        "headers": None,
+        "stream": None,
+    },
+}
+
+
+def scrape_many(oem_codes, sites=("HotToner",), fetcher=None):
+    """
+    Scrape many OEM codes on the given sites concurrently
+    
+    Args:
+        oem_codes (list): OEM product codes to search for
+        sites (iterable): Site names from HTTP_SITES
+        fetcher (AsyncFetcher): Engine to use (a default one is created if None)
+        
+    Yields:
+        tuple: (site, oem_code, result dict) in completion order
+    """
+    pairs = [(site, code) for code in oem_codes for site in sites]
+    yield from scrape_pairs(pairs, fetcher)
+
+
+def scrape_pairs(pairs, fetcher=None, parse_stage=None):
+    """
+    Scrape an explicit list of (site, OEM code) lookups concurrently.
+    Pages are fetched by the async engine and parsed on the parse workers.
+    
+    Args:
+        pairs (iterable): (site, oem_code) tuples, site names from HTTP_SITES;
+            consumed lazily, on a helper thread
+        fetcher (AsyncFetcher): Engine to use (a default one is created if None)
+        parse_stage (ParseStage): Parse stage to use (a default one if None)
+        
+    Yields:
+        tuple: (site, oem_code, result dict) in completion order
+    """
+    fetcher = fetcher or AsyncFetcher()
+    parse_stage = parse_stage or ParseStage()
+    
+    def items():
+        # Lazy, so `pairs` can still be growing (e.g. codes being read from a file)
+        for site, code in pairs:
+            hooks = HTTP_SITES[site]
+            url = hooks["build_url"](code)
+            stream = partial(hooks["stream"], code, url) if hooks["stream"] else None
+            yield (site, code), url, hooks["headers"], stream
+    
+    # Wake up while fetches trickle in, so partial batches still get parsed
+    # and parsed records are handed on without waiting for the next page
+    for fetched in fetcher.iter_fetch(items(), idle=parse_stage.flush_seconds):
+        if fetched is not None:
+            site, code = fetched.key
+            parse_stage.put(fetched.key, page_for(site, code, fetched))
+        for (site, code), record in parse_stage.ready():
+            yield site, code, record
+    
+    for (site, code), record in parse_stage.finish():
+        yield site, code, record
+
+
+def page_for(site, code, fetched):
+    """
+    Turn a fetch result into a Page for the parse stage
+    
+    Args:
+        site (str): Site name from HTTP_SITES
+        code (str): OEM code the page was fetched for
+        fetched (FetchResult): Outcome of the fetch
+        
+    Returns:
+        Page: Page to parse, or one already holding its final record
+    """
+    hooks = HTTP_SITES[site]
+    
+    if fetched.record is not None:
+        # Already extracted while the page was streamed
+        return Page(site, code, fetched.url, None, fetched.record, fetched.timings)
+    
+    if fetched.status == 304:
+        # Unchanged - reuse the record extracted last time, or reparse the stored body
+        record, html = cached_page(fetched.url, code)
+        if record is not None or html is not None:
+            return Page(site, code, fetched.url, html, record, fetched.timings)
+        # Evicted between the check and now: nothing to parse, so not a miss
+        print(f"❌ Error scraping {site} for {code}: 304 with no stored copy")
+        return Page(site, code, fetched.url, None, hooks["error"](code, fetched.url), fetched.timings)
+    
+    if fetched.text is None:
+        if fetched.status == 404:
+            return Page(site, code, fetched.url, None, hooks["not_found"](code, fetched.url), fetched.timings)
+        # Retries ran out (network error, 429, 5xx): an error, which is
+        # never cached, rather than "Not Available" for the whole TTL
+        if fetched.error is not None:
+            print(f"❌ Error scraping {site} for {code}: {fetched.error}")
+        else:
+            print(f"❌ Error scraping {site} for {code}: HTTP {fetched.status}")
+        return Page(site, code, fetched.url, None, hooks["error"](code, fetched.url), fetched.timings)
+    
+    return Page(site, code, fetched.url, fetched.text, None, fetched.timings)
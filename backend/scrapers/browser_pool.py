@@ -0,0 +1,267 @@
+"""
+Pool of warm, Cloudflare-cleared Chrome sessions shared across jobs.
+Jobs check a browser out for each lookup and return it afterwards, so the
+ChromeDriver install, Chrome launch and first Cloudflare wait are paid once
+per browser instead of once per job. Browsers are counted in the job store,
+so the pool size caps the browsers of every API process on the host together.
+"""
+import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from scrapers.selenium_scraper import SeleniumScraper
+from utils.metrics import WAIT_SECONDS
+
+
+def choose_browser_count():
+    """
+    Pick how many browsers the pool may keep open.
+
+    Bounded by config.MAX_WORKERS, CPU cores and free memory (each
+    browser needs roughly config.BROWSER_MEMORY_MB).
+
+    Returns:
+        int: Browser count (at least 1)
+    """
+    limits = [config.MAX_WORKERS, os.cpu_count() or 1]
+
+    try:
+        free_mb = os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') // (1024 * 1024)
+        limits.append(free_mb // config.BROWSER_MEMORY_MB)
+    except (AttributeError, ValueError, OSError):
+        # Not available on Windows - fall back to the other limits
+        pass
+
+    return max(1, min(limits))
+
+
+class BrowserPool:
+    """Thread-safe pool of long-lived SeleniumScraper sessions"""
+
+    def __init__(self, size=None, max_pages=None, headless=False, store=None):
+        """
+        Args:
+            size (int): Maximum browsers kept open
+            max_pages (int): Pages a browser may load before it is recycled
+            headless (bool): Passed to SeleniumScraper
+            store (JobStore): Job store the browsers of all processes are
+                counted in (this pool only if None)
+        """
+        self.size = size or choose_browser_count()
+        self.max_pages = max_pages or config.BROWSER_MAX_PAGES
+        self.headless = headless
+        self.store = store
+
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._launched = 0  # Browsers open or being launched
+        self._closed = False
+
+        self._stats = {
+            'checkouts': 0,
+            'checkout_wait_total': 0.0,
+            'checkout_wait_max': 0.0,
+            'launched': 0,
+            'recycled': 0,
+            'unhealthy': 0,
+        }
+
+    def _launch(self):
+        """Start a browser and clear Cloudflare on it"""
+        scraper = SeleniumScraper(headless=self.headless)
+        scraper.warm_up()
+        with self._lock:
+            self._stats['launched'] += 1
+        return scraper
+
+    def _launch_into_pool(self):
+        try:
+            scraper = self._launch()
+        except Exception as e:
+            print(f"❌ Browser launch failed: {e}")
+            self._release_launch()
+            return
+        self._idle.put(scraper)
+
+    def _reserve_launch(self):
+        """Claim a slot for a new browser if the pool (and the host) is not full"""
+        with self._lock:
+            if self._closed or self._launched >= self.size:
+                return False
+            self._launched += 1
+        if self.store is not None:
+            try:
+                reserved = self.store.reserve_browser(self.size)
+            except Exception as e:
+                print(f"⚠️  Could not count browsers in the job store: {e}")
+                reserved = True
+            if not reserved:
+                # Other API processes have the host's browsers open
+                with self._lock:
+                    self._launched -= 1
+                return False
+        return True
+
+    def _release_launch(self):
+        """Free a browser slot"""
+        with self._lock:
+            self._launched -= 1
+        if self.store is not None:
+            try:
+                self.store.release_browser()
+            except Exception as e:
+                print(f"⚠️  Could not count browsers in the job store: {e}")
+
+    def _discard(self, scraper, reason):
+        """Close a browser and free its slot"""
+        with self._lock:
+            self._stats[reason] += 1
+        self._release_launch()
+        try:
+            scraper.close()
+        except Exception:
+            pass
+
+    def _replace_in_background(self):
+        if self._reserve_launch():
+            threading.Thread(target=self._launch_into_pool, daemon=True).start()
+
+    def start(self):
+        """Pre-launch browsers up to the pool size (in the background)"""
+        while self._reserve_launch():
+            threading.Thread(target=self._launch_into_pool, daemon=True).start()
+
+    @staticmethod
+    def is_healthy(scraper):
+        """
+        Check that a browser is still responsive.
+
+        Returns:
+            bool: True if the driver answered
+        """
+        if not scraper.driver:
+            return False
+        try:
+            scraper.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """
+        Borrow a warm browser for the duration of a with-block.
+
+        Args:
+            timeout (float): Seconds to wait for a free browser
+
+        Yields:
+            SeleniumScraper: Browser with Cloudflare already cleared
+
+        Raises:
+            TimeoutError: If no browser became free in time
+        """
+        timeout = timeout if timeout is not None else config.BROWSER_CHECKOUT_TIMEOUT
+        started = time.monotonic()
+        scraper = None
+
+        while scraper is None:
+            try:
+                scraper = self._idle.get_nowait()
+            except queue.Empty:
+                if self._reserve_launch():
+                    # Pool not full yet - launch on demand in this thread
+                    try:
+                        scraper = self._launch()
+                    except Exception:
+                        self._release_launch()
+                        raise
+                    break
+                remaining = timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    raise TimeoutError(f"No browser free after {timeout}s")
+                try:
+                    scraper = self._idle.get(timeout=min(remaining, 1.0))
+                except queue.Empty:
+                    continue
+
+            if not self.is_healthy(scraper):
+                self._discard(scraper, 'unhealthy')
+                scraper = None
+
+        wait = time.monotonic() - started
+        # The pooled browsers only serve InkStation
+        WAIT_SECONDS.observe(wait, site="InkStation", reason="browser_checkout")
+        with self._lock:
+            self._stats['checkouts'] += 1
+            self._stats['checkout_wait_total'] += wait
+            self._stats['checkout_wait_max'] = max(self._stats['checkout_wait_max'], wait)
+
+        try:
+            yield scraper
+        finally:
+            self._checkin(scraper)
+
+    def _checkin(self, scraper):
+        if self._closed:
+            self._discard(scraper, 'recycled')
+        elif scraper.request_count >= self.max_pages:
+            # Long-lived Chrome sessions bloat - swap in a fresh one
+            self._discard(scraper, 'recycled')
+            self._replace_in_background()
+        else:
+            self._idle.put(scraper)
+
+    def metrics(self):
+        """
+        Pool counters.
+
+        Returns:
+            dict: Size, idle count and checkout / recycling statistics
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = self.size
+            stats['open'] = self._launched
+        stats['idle'] = self._idle.qsize()
+        checkouts = stats['checkouts']
+        stats['checkout_wait_avg'] = stats['checkout_wait_total'] / checkouts if checkouts else 0.0
+        return stats
+
+    def close(self):
+        """Close every idle browser; browsers in use close when returned"""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                scraper = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(scraper, 'recycled')
+
+
+_browser_pool = None
+_browser_pool_lock = threading.Lock()
+
+
+def get_browser_pool():
+    """
+    Get the browser pool shared by every job in this process. Its size
+    caps the browsers of all API processes sharing the job store.
+
+    Returns:
+        BrowserPool: Shared pool
+    """
+    global _browser_pool
+    with _browser_pool_lock:
+        if _browser_pool is None:
+            from utils.job_store import get_job_store
+            _browser_pool = BrowserPool(store=get_job_store())
+        return _browser_pool
@@ -1,7 +1,6 @@
 """
 Scraper for HotToner.com.au
 """
-import requests
 from bs4 import BeautifulSoup
 import sys
 import os
@@ -9,7 +8,278 @@ import os
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.request_utils import make_request, random_delay, safe_extract_text, clean_price
+from utils.request_utils import make_request, safe_extract_text, clean_price, get_session_pool
+from utils.rate_limiter import wait_for_rate_limit
+from utils.http_cache import conditional_headers, has_stored_copy, store_page, extract_record
+from utils.html_parser import (
+    parser_backend, parse_document, select_first, element_text, text_parent,
+    has_class, text_contains_ci
+)
+from utils.html_stream import StreamExtractor, streaming_enabled, charset_from, feed_response
+
+
+HOTTONER_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+    "Connection": "keep-alive",
+}
+
+
+def build_hottoner_url(oem_code):
+    """
+    Build the HotToner search URL for an OEM code
+    
+    Args:
+        oem_code (str): OEM product code to search for
+        
+    Returns:
+        str: Search URL
+    """
+    return f"https://www.hottoner.com.au/index.php?route=product/search&filter_cartridge={oem_code}"
+
+
+def _record(oem_code, title, price, status, url):
+    return {
+        "OEM_CODE": oem_code,
+        "Title": title,
+        "Price": price,
+        "Website": "HotToner",
+        "Status": status,
+        "URL": url
+    }
+
+
+def not_found_hottoner(oem_code, url=None):
+    """Result returned when HotToner has no page for the code"""
+    return _record(oem_code, "Not Found", "N/A", "Not Available", url or build_hottoner_url(oem_code))
+
+
+def error_hottoner(oem_code, url=None):
+    """Result returned when the HotToner lookup failed"""
+    return _record(oem_code, "Error", "N/A", "Error", url or build_hottoner_url(oem_code))
+
+
+def parse_hottoner(html, oem_code, url=None):
+    """
+    Extract product information from a HotToner search or product page
+    
+    Args:
+        html (str): Page HTML
+        oem_code (str): OEM product code the page was fetched for
+        url (str): URL the page was fetched from
+        
+    Returns:
+        dict: Product information
+    """
+    url = url or build_hottoner_url(oem_code)
+    if parser_backend("HotToner") == "lxml":
+        return _parse_hottoner_lxml(html, oem_code, url)
+    return _parse_hottoner_soup(html, oem_code, url)
+
+
+def _parse_hottoner_lxml(html, oem_code, url):
+    """parse_hottoner on lxml - same fields and fallbacks as the soup version"""
+    return _extract_hottoner(parse_document(html), oem_code, url)
+
+
+def _extract_hottoner(doc, oem_code, url):
+    """Build the record from a parsed (possibly partial) HotToner document"""
+    if select_first(doc, f"//div[{has_class('product-info')}]") is not None:
+        # CASE 1: Product detail page (single product)
+        title = element_text(select_first(doc, "//h1"))
+        
+        price = "N/A"
+        price_span = select_first(
+            doc, f"(//div[{has_class('price')}])[1]//span[{has_class('price-new')}]"
+        )
+        if price_span is not None:
+            price = clean_price(element_text(price_span))
+        
+        status = "Available"
+        availability_text = select_first(doc, "//text()[contains(., 'Availability:')]")
+        if availability_text is not None:
+            parent = text_parent(availability_text)
+            if parent is not None:
+                stock_text = element_text(parent)
+                if 'InStock' in stock_text:
+                    status = "In Stock"
+                elif 'OutOfStock' in stock_text or 'Out of Stock' in stock_text:
+                    status = "Out of Stock"
+        
+        if select_first(doc, f"//div[{has_class('OutofStock')}]") is not None:
+            status = "Out of Stock"
+    
+    else:
+        # CASE 2: Search results page - first li of the first product list
+        product_li = select_first(doc, f"(//div[{has_class('product-list')}])[1]//li")
+        if product_li is None:
+            return not_found_hottoner(oem_code, url)
+        
+        title = "N/A"
+        title_link = select_first(product_li, f"(.//td[{has_class('pl-name')}])[1]//a")
+        if title_link is not None:
+            title = element_text(title_link)
+        
+        price = "N/A"
+        price_cell = select_first(product_li, f".//td[{has_class('pl-our-price')}]")
+        if price_cell is not None:
+            price = clean_price(element_text(price_cell))
+        
+        status = "Available"
+        if select_first(product_li, ".//text()[contains(., 'InStock')]") is not None:
+            status = "In Stock"
+        elif select_first(
+            product_li,
+            f".//text()[contains(., 'OutOfStock') or {text_contains_ci('out of stock')}]"
+        ) is not None:
+            status = "Out of Stock"
+    
+    return _record(oem_code, title, price, status, url)
+
+
+def _has_class_token(element, name):
+    return name in (element.get("class") or "").split()
+
+
+def hottoner_target_complete(element):
+    """
+    Check whether a just-closed element holds everything parse needs:
+    the first result of a search page.
+    
+    Detail pages never stop early: their stock status also depends on an
+    OutofStock marker that can sit anywhere below the product-info block,
+    so they are read (and parsed) to the end.
+    
+    Args:
+        element: lxml element whose end tag was just parsed
+        
+    Returns:
+        bool: True if reading can stop
+    """
+    if element.tag != "li":
+        return False
+    for ancestor in element.iterancestors():
+        if ancestor.tag == "li":
+            return False
+        if ancestor.tag == "div" and _has_class_token(ancestor, "product-list"):
+            # A product list on a detail page (e.g. related products) is not
+            # the search result
+            root = element.getroottree().getroot()
+            return select_first(root, f"//div[{has_class('product-info')}]") is None
+    return False
+
+
+def stream_hottoner(oem_code, url=None, encoding=None):
+    """
+    Incremental extractor for a HotToner page being read off the socket.
+    
+    Reading can stop once the extractor reports done, which only happens
+    on search pages; detail pages are read in full (see
+    hottoner_target_complete).
+    
+    Args:
+        oem_code (str): OEM product code the page is fetched for
+        url (str): URL being fetched
+        encoding (str): Response charset
+        
+    Returns:
+        StreamExtractor or None: None when streaming is off or lxml is
+        not the parser backend (read the whole page instead)
+    """
+    if not streaming_enabled() or parser_backend("HotToner") != "lxml":
+        return None
+    url = url or build_hottoner_url(oem_code)
+    return StreamExtractor(
+        hottoner_target_complete,
+        lambda doc: _extract_hottoner(doc, oem_code, url),
+        encoding
+    )
+
+
+def _parse_hottoner_soup(html, oem_code, url):
+    """parse_hottoner on BeautifulSoup (html.parser)"""
+    soup = BeautifulSoup(html, "html.parser")
+    
+    # HotToner has two possible page types:
+    # 1. Product detail page (single product - redirects directly)
+    # 2. Search results page (multiple products - shows table)
+    
+    # Check for product detail page first
+    product_info_div = soup.find('div', class_='product-info')
+    
+    if product_info_div:
+        # CASE 1: Product detail page (single product)
+        # Extract title from h1 tag
+        title = "N/A"
+        h1_title = soup.find('h1')
+        if h1_title:
+            title = safe_extract_text(h1_title)
+        
+        # Extract price from div.price > span.price-new
+        price = "N/A"
+        price_div = soup.find('div', class_='price')
+        if price_div:
+            price_span = price_div.find('span', class_='price-new')
+            if price_span:
+                price_text = safe_extract_text(price_span)
+                price = clean_price(price_text)
+        
+        # Extract availability status
+        status = "Available"
+        availability_text = soup.find(string=lambda x: x and 'Availability:' in str(x))
+        if availability_text:
+            parent = availability_text.find_parent()
+            if parent:
+                stock_text = safe_extract_text(parent)
+                if 'InStock' in stock_text:
+                    status = "In Stock"
+                elif 'OutOfStock' in stock_text or 'Out of Stock' in stock_text:
+                    status = "Out of Stock"
+        
+        # Check for "Out of Stock" indicator
+        outofstock_div = soup.find('div', class_='OutofStock')
+        if outofstock_div:
+            status = "Out of Stock"
+    
+    else:
+        # CASE 2: Search results page (multiple products in table)
+        product_list = soup.find('div', class_='product-list')
+        
+        if not product_list:
+            # Product not found
+            return not_found_hottoner(oem_code, url)
+        
+        # Find first product (li element with table inside)
+        product_li = product_list.find('li')
+        
+        if not product_li:
+            return not_found_hottoner(oem_code, url)
+        
+        # Extract title from td.pl-name
+        title = "N/A"
+        title_cell = product_li.find('td', class_='pl-name')
+        if title_cell:
+            title_link = title_cell.find('a')
+            if title_link:
+                title = safe_extract_text(title_link)
+        
+        # Extract price from td.pl-our-price
+        price = "N/A"
+        price_cell = product_li.find('td', class_='pl-our-price')
+        if price_cell:
+            price_text = safe_extract_text(price_cell)
+            price = clean_price(price_text)
+        
+        # Extract availability status
+        status = "Available"
+        stock_indicator = product_li.find(string=lambda x: x and 'InStock' in str(x))
+        if stock_indicator:
+            status = "In Stock"
+        elif product_li.find(string=lambda x: x and ('OutOfStock' in str(x) or 'out of stock' in str(x).lower())):
+            status = "Out of Stock"
+    
+    return _record(oem_code, title, price, status, url)
 
 
 def scrape_hottoner(oem_code):
@@ -22,144 +292,44 @@ def scrape_hottoner(oem_code):
     Returns:
         dict or None: Product information or None if not found
     """
-    url = f"https://www.hottoner.com.au/index.php?route=product/search&filter_cartridge={oem_code}"
+    url = build_hottoner_url(oem_code)
     
     try:
-        # HotToner seems to have issues with make_request, use direct requests
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Connection": "keep-alive",
-        }
-        response = requests.get(url, headers=headers, timeout=15)
+        # HotToner seems to have issues with make_request's retries, so do a
+        # single request, still on this worker's pooled keep-alive session
+        session = get_session_pool().session_for(url)
+        headers = dict(HOTTONER_HEADERS, **conditional_headers(url))
+        wait_for_rate_limit(url)
+        response = session.get(url, headers=headers, timeout=15, stream=True)
+        
+        if response.status_code == 304:
+            response.close()
+            if has_stored_copy(url):
+                # Unchanged - reuse the record extracted last time
+                return extract_record(url, oem_code, None, True, parse_hottoner)
+            # The stored copy is gone - ask again for the whole page
+            wait_for_rate_limit(url)
+            response = session.get(url, headers=HOTTONER_HEADERS, timeout=15, stream=True)
         
         if response.status_code != 200:
-            return {
-                "OEM_CODE": oem_code,
-                "Title": "Not Found",
-                "Price": "N/A",
-                "Website": "HotToner",
-                "Status": "Not Available",
-                "URL": url
-            }
-        
-        soup = BeautifulSoup(response.text, "html.parser")
-        
-        # HotToner has two possible page types:
-        # 1. Product detail page (single product - redirects directly)
-        # 2. Search results page (multiple products - shows table)
-        
-        # Check for product detail page first
-        product_info_div = soup.find('div', class_='product-info')
-        
-        if product_info_div:
-            # CASE 1: Product detail page (single product)
-            # Extract title from h1 tag
-            title = "N/A"
-            h1_title = soup.find('h1')
-            if h1_title:
-                title = safe_extract_text(h1_title)
-            
-            # Extract price from div.price > span.price-new
-            price = "N/A"
-            price_div = soup.find('div', class_='price')
-            if price_div:
-                price_span = price_div.find('span', class_='price-new')
-                if price_span:
-                    price_text = safe_extract_text(price_span)
-                    price = clean_price(price_text)
-            
-            # Extract availability status
-            status = "Available"
-            availability_text = soup.find(string=lambda x: x and 'Availability:' in str(x))
-            if availability_text:
-                parent = availability_text.find_parent()
-                if parent:
-                    stock_text = safe_extract_text(parent)
-                    if 'InStock' in stock_text:
-                        status = "In Stock"
-                    elif 'OutOfStock' in stock_text or 'Out of Stock' in stock_text:
-                        status = "Out of Stock"
-            
-            # Check for "Out of Stock" indicator
-            outofstock_div = soup.find('div', class_='OutofStock')
-            if outofstock_div:
-                status = "Out of Stock"
-        
-        else:
-            # CASE 2: Search results page (multiple products in table)
-            product_list = soup.find('div', class_='product-list')
-            
-            if not product_list:
-                # Product not found
-                return {
-                    "OEM_CODE": oem_code,
-                    "Title": "Not Found",
-                    "Price": "N/A",
-                    "Website": "HotToner",
-                    "Status": "Not Available",
-                    "URL": url
-                }
-            
-            # Find first product (li element with table inside)
-            product_li = product_list.find('li')
-            
-            if not product_li:
-                return {
-                    "OEM_CODE": oem_code,
-                    "Title": "Not Found",
-                    "Price": "N/A",
-                    "Website": "HotToner",
-                    "Status": "Not Available",
-                    "URL": url
-                }
-            
-            # Extract title from td.pl-name
-            title = "N/A"
-            title_cell = product_li.find('td', class_='pl-name')
-            if title_cell:
-                title_link = title_cell.find('a')
-                if title_link:
-                    title = safe_extract_text(title_link)
-            
-            # Extract price from td.pl-our-price
-            price = "N/A"
-            price_cell = product_li.find('td', class_='pl-our-price')
-            if price_cell:
-                price_text = safe_extract_text(price_cell)
-                price = clean_price(price_text)
-            
-            # Extract availability status
-            status = "Available"
-            stock_indicator = product_li.find(string=lambda x: x and 'InStock' in str(x))
-            if stock_indicator:
-                status = "In Stock"
-            elif product_li.find(string=lambda x: x and ('OutOfStock' in str(x) or 'out of stock' in str(x).lower())):
-                status = "Out of Stock"
-        
-        # Add delay to avoid rate limiting
-        random_delay(1, 3)
-        
-        return {
-            "OEM_CODE": oem_code,
-            "Title": title,
-            "Price": price,
-            "Website": "HotToner",
-            "Status": status,
-            "URL": url
-        }
+            response.close()
+            return not_found_hottoner(oem_code, url)
+        
+        extractor = stream_hottoner(oem_code, url, charset_from(response.headers.get('Content-Type')))
+        if extractor is None:
+            store_page(url, response.headers, response.text)
+            return extract_record(url, oem_code, response.text, False, parse_hottoner)
+        
+        # Stop reading once the product block has been parsed; a page cut
+        # short is stored with its record only, never as a partial body
+        feed_response(response, extractor)
+        result = extractor.record()
+        store_page(url, response.headers, None if extractor.done else extractor.text(), result)
+        return result
         
     except Exception as e:
         print(f"❌ Error scraping HotToner for {oem_code}: {e}")
-        return {
-            "OEM_CODE": oem_code,
-            "Title": "Error",
-            "Price": "N/A",
-            "Website": "HotToner",
-            "Status": "Error",
-            "URL": url
-        }
+        return error_hottoner(oem_code, url)
 
 
 # Test function
@@ -9,7 +9,213 @@ import os
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.request_utils import make_request, random_delay, safe_extract_text, clean_price
+from utils.request_utils import make_request, safe_extract_text, clean_price
+from utils.http_cache import extract_record
+from utils.selector_stats import ordered, record_hit
+from utils.html_parser import (
+    parser_backend, parse_document, select_first, element_text,
+    has_class, class_contains, text_contains_ci
+)
+
+
+def build_inkdepot_url(oem_code):
+    """
+    Build the InkDepot search URL for an OEM code
+    
+    Args:
+        oem_code (str): OEM product code to search for
+        
+    Returns:
+        str: Search URL
+    """
+    # Other search formats seen on the site:
+    #   /search?keywords={oem_code}
+    #   /catalogsearch/result/?q={oem_code}
+    return f"https://www.inkdepot.com.au/search?q={oem_code}"
+
+
+def _record(oem_code, title, price, status, url):
+    return {
+        "OEM_CODE": oem_code,
+        "Title": title,
+        "Price": price,
+        "Website": "InkDepot",
+        "Status": status,
+        "URL": url
+    }
+
+
+def not_found_inkdepot(oem_code, url=None):
+    """Result returned when InkDepot has no product for the code"""
+    return _record(oem_code, "Not Found", "N/A", "Not Available", url or build_inkdepot_url(oem_code))
+
+
+def error_inkdepot(oem_code, url=None):
+    """Result returned when the InkDepot lookup failed"""
+    return _record(oem_code, "Error", "N/A", "Error", url or build_inkdepot_url(oem_code))
+
+
+def parse_inkdepot(html, oem_code, url=None):
+    """
+    Extract product information from an InkDepot search page
+    
+    Args:
+        html (str): Page HTML
+        oem_code (str): OEM product code the page was fetched for
+        url (str): URL the page was fetched from
+        
+    Returns:
+        dict: Product information
+    """
+    url = url or build_inkdepot_url(oem_code)
+    if parser_backend("InkDepot") == "lxml":
+        return _parse_inkdepot_lxml(html, oem_code, url)
+    return _parse_inkdepot_soup(html, oem_code, url)
+
+
+# XPath versions of the soup selector cascades below, in declaration order.
+# The lxml parser tries them in the order utils.selector_stats has learned.
+PRODUCT_XPATHS = [
+    f"//div[{has_class('product-item')}]",
+    f"//div[{has_class('product')}]",
+    f"//li[{has_class('item')}]",
+    f"//div[{has_class('product-card')}]",
+]
+
+# Generic last resorts - always tried after the learned order
+PRODUCT_FALLBACK_XPATHS = [
+    f"//*[self::div or self::li or self::article][{class_contains('product')}]",
+]
+
+TITLE_XPATHS = [
+    f".//a[{class_contains('title')} or {class_contains('name')}]",
+    ".//h2",
+    ".//h3",
+    ".//h4",
+]
+
+PRICE_XPATHS = [
+    f".//span[{class_contains('price')}]",
+    f".//div[{class_contains('price')}]",
+    f".//p[{class_contains('price')}]",
+]
+
+PRICE_FALLBACK_XPATHS = [
+    ".//text()[contains(., '$')]",
+]
+
+OUT_OF_STOCK_XPATH = (
+    f".//text()[({text_contains_ci('stock')} or {text_contains_ci('available')}) "
+    f"and {text_contains_ci('out')}]"
+)
+
+
+def _parse_inkdepot_lxml(html, oem_code, url):
+    """parse_inkdepot on lxml - same cascades as the soup version"""
+    doc = parse_document(html)
+    
+    product = None
+    for expression in ordered("InkDepot", "product", PRODUCT_XPATHS) + PRODUCT_FALLBACK_XPATHS:
+        product = select_first(doc, expression)
+        if product is not None:
+            record_hit("InkDepot", "product", expression)
+            break
+    
+    if product is None:
+        return not_found_inkdepot(oem_code, url)
+    
+    title = None
+    for expression in ordered("InkDepot", "title", TITLE_XPATHS):
+        title_elem = select_first(product, expression)
+        if title_elem is not None:
+            title = element_text(title_elem)
+            if title != "N/A":
+                if title:
+                    record_hit("InkDepot", "title", expression)
+                break
+    
+    price = None
+    for expression in ordered("InkDepot", "price", PRICE_XPATHS) + PRICE_FALLBACK_XPATHS:
+        price_elem = select_first(product, expression)
+        if price_elem is not None:
+            price = clean_price(element_text(price_elem))
+            if price != "N/A":
+                record_hit("InkDepot", "price", expression)
+                break
+    
+    status = "Available"
+    if select_first(product, OUT_OF_STOCK_XPATH) is not None:
+        status = "Out of Stock"
+    
+    return _record(oem_code, title if title else "N/A", price if price else "N/A", status, url)
+
+
+def _parse_inkdepot_soup(html, oem_code, url):
+    """parse_inkdepot on BeautifulSoup (html.parser)"""
+    soup = BeautifulSoup(html, "html.parser")
+    
+    # Try multiple possible selectors
+    product = None
+    selectors = [
+        {"tag": "div", "class_": "product-item"},
+        {"tag": "div", "class_": "product"},
+        {"tag": "li", "class_": "item"},
+        {"tag": "div", "class_": "product-card"}
+    ]
+    
+    for selector in selectors:
+        product = soup.find(selector["tag"], class_=selector["class_"])
+        if product:
+            break
+    
+    if not product:
+        # Try to find any product-related element
+        product = soup.find(["div", "li", "article"], class_=lambda x: x and "product" in x.lower())
+    
+    if not product:
+        return not_found_inkdepot(oem_code, url)
+    
+    # Extract title
+    title = None
+    title_selectors = [
+        product.find("a", class_=lambda x: x and ("title" in x.lower() or "name" in x.lower())),
+        product.find("h2"),
+        product.find("h3"),
+        product.find("h4")
+    ]
+    
+    for title_elem in title_selectors:
+        if title_elem:
+            title = safe_extract_text(title_elem)
+            if title != "N/A":
+                break
+    
+    # Extract price
+    price = None
+    price_selectors = [
+        product.find("span", class_=lambda x: x and "price" in x.lower()),
+        product.find("div", class_=lambda x: x and "price" in x.lower()),
+        product.find("p", class_=lambda x: x and "price" in x.lower()),
+        product.find(string=lambda x: x and "$" in str(x))
+    ]
+    
+    for price_elem in price_selectors:
+        if price_elem:
+            price = clean_price(safe_extract_text(price_elem) if hasattr(price_elem, 'text') else str(price_elem))
+            if price != "N/A":
+                break
+    
+    # Check availability
+    stock_indicators = product.find_all(string=lambda x: x and any(
+        keyword in x.lower() for keyword in ["stock", "available", "in stock", "out of stock"]
+    ))
+    status = "Available"
+    for indicator in stock_indicators:
+        if "out" in indicator.lower():
+            status = "Out of Stock"
+            break
+    
+    return _record(oem_code, title if title else "N/A", price if price else "N/A", status, url)
 
 
 def scrape_inkdepot(oem_code):
@@ -22,120 +228,22 @@ def scrape_inkdepot(oem_code):
     Returns:
         dict or None: Product information or None if not found
     """
-    # Try multiple URL patterns as different sites use different search formats
-    url_patterns = [
-        f"https://www.inkdepot.com.au/search?q={oem_code}",
-        f"https://www.inkdepot.com.au/search?keywords={oem_code}",
-        f"https://www.inkdepot.com.au/catalogsearch/result/?q={oem_code}"
-    ]
-    
-    url = url_patterns[0]  # Use the first pattern
+    url = build_inkdepot_url(oem_code)
     
     try:
         response = make_request(url)
         
         if not response:
-            return {
-                "OEM_CODE": oem_code,
-                "Title": "Not Found",
-                "Price": "N/A",
-                "Website": "InkDepot",
-                "Status": "Not Available",
-                "URL": url
-            }
-        
-        soup = BeautifulSoup(response.text, "html.parser")
-        
-        # Try multiple possible selectors
-        product = None
-        selectors = [
-            {"tag": "div", "class_": "product-item"},
-            {"tag": "div", "class_": "product"},
-            {"tag": "li", "class_": "item"},
-            {"tag": "div", "class_": "product-card"}
-        ]
-        
-        for selector in selectors:
-            product = soup.find(selector["tag"], class_=selector["class_"])
-            if product:
-                break
-        
-        if not product:
-            # Try to find any product-related element
-            product = soup.find(["div", "li", "article"], class_=lambda x: x and "product" in x.lower())
-        
-        if not product:
-            return {
-                "OEM_CODE": oem_code,
-                "Title": "Not Found",
-                "Price": "N/A",
-                "Website": "InkDepot",
-                "Status": "Not Available",
-                "URL": url
-            }
-        
-        # Extract title
-        title = None
-        title_selectors = [
-            product.find("a", class_=lambda x: x and ("title" in x.lower() or "name" in x.lower())),
-            product.find("h2"),
-            product.find("h3"),
-            product.find("h4")
-        ]
-        
-        for title_elem in title_selectors:
-            if title_elem:
-                title = safe_extract_text(title_elem)
-                if title != "N/A":
-                    break
-        
-        # Extract price
-        price = None
-        price_selectors = [
-            product.find("span", class_=lambda x: x and "price" in x.lower()),
-            product.find("div", class_=lambda x: x and "price" in x.lower()),
-            product.find("p", class_=lambda x: x and "price" in x.lower()),
-            product.find(string=lambda x: x and "$" in str(x))
-        ]
-        
-        for price_elem in price_selectors:
-            if price_elem:
-                price = clean_price(safe_extract_text(price_elem) if hasattr(price_elem, 'text') else str(price_elem))
-                if price != "N/A":
-                    break
-        
-        # Check availability
-        stock_indicators = product.find_all(string=lambda x: x and any(
-            keyword in x.lower() for keyword in ["stock", "available", "in stock", "out of stock"]
-        ))
-        status = "Available"
-        for indicator in stock_indicators:
-            if "out" in indicator.lower():
-                status = "Out of Stock"
-                break
-        
-        # Add delay to avoid rate limiting
-        random_delay(1, 3)
+            return not_found_inkdepot(oem_code, url)
         
-        return {
-            "OEM_CODE": oem_code,
-            "Title": title if title else "N/A",
-            "Price": price if price else "N/A",
-            "Website": "InkDepot",
-            "Status": status,
-            "URL": url
-        }
+        # make_request already waited on the shared rate limit.
+        # On a 304 the record extracted last time is reused unparsed.
+        html = None if response.not_modified else response.text
+        return extract_record(url, oem_code, html, response.not_modified, parse_inkdepot)
         
     except Exception as e:
         print(f"❌ Error scraping InkDepot for {oem_code}: {e}")
-        return {
-            "OEM_CODE": oem_code,
-            "Title": "Error",
-            "Price": "N/A",
-            "Website": "InkDepot",
-            "Status": "Error",
-            "URL": url
-        }
+        return error_inkdepot(oem_code, url)
 
 
 # Test function
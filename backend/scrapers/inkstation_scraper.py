@@ -5,123 +5,333 @@ import requests
 from bs4 import BeautifulSoup
 import sys
 import os
+import time
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.request_utils import make_request, random_delay, safe_extract_text, clean_price
+from utils.request_utils import make_request, safe_extract_text, clean_price, get_headers, get_session_pool
+from utils.rate_limiter import wait_for_rate_limit
+from utils.clearance import load_clearance, discard_clearance, apply_clearance
+from utils.http_cache import conditional_headers, store_page, cached_page, extract_record
+from utils.selector_stats import ordered, record_hit
+from utils.html_parser import (
+    parser_backend, parse_document, select_first, element_text,
+    has_class, class_contains, text_contains_ci
+)
+from scrapers.parse_pool import Page
+from utils.job_trace import span_since
 
 
-def scrape_inkstation(oem_code):
+INKSTATION_HOST = "www.inkstation.com.au"
+
+# Markers of a Cloudflare challenge instead of real content
+CHALLENGE_MARKERS = ["cf-chl", "challenge-platform", "cf_chl_opt", "<title>just a moment...</title>"]
+
+
+def build_inkstation_url(oem_code):
     """
-    Scrape product information from inkstation.com.au
+    Build the InkStation search URL for an OEM code
     
     Args:
         oem_code (str): OEM product code to search for
         
     Returns:
-        dict or None: Product information or None if not found
+        str: Search URL
+    """
+    return f"https://www.inkstation.com.au/search?keywords={oem_code}"
+
+
+def _record(oem_code, title, price, status, url):
+    return {
+        "OEM_CODE": oem_code,
+        "Title": title,
+        "Price": price,
+        "Website": "InkStation",
+        "Status": status,
+        "URL": url
+    }
+
+
+def not_found_inkstation(oem_code, url=None):
+    """Result returned when InkStation has no product for the code"""
+    return _record(oem_code, "Not Found", "N/A", "Not Available", url or build_inkstation_url(oem_code))
+
+
+def error_inkstation(oem_code, url=None):
+    """Result returned when the InkStation lookup failed"""
+    return _record(oem_code, "Error", "N/A", "Error", url or build_inkstation_url(oem_code))
+
+
+def parse_inkstation(html, oem_code, url=None):
     """
-    url = f"https://www.inkstation.com.au/search?keywords={oem_code}"
+    Extract product information from an InkStation search page
     
-    try:
-        response = make_request(url)
+    Args:
+        html (str): Page HTML
+        oem_code (str): OEM product code the page was fetched for
+        url (str): URL the page was fetched from
         
-        if not response:
-            return {
-                "OEM_CODE": oem_code,
-                "Title": "Not Found",
-                "Price": "N/A",
-                "Website": "InkStation",
-                "Status": "Not Available",
-                "URL": url
-            }
+    Returns:
+        dict: Product information
+    """
+    url = url or build_inkstation_url(oem_code)
+    if parser_backend("InkStation") == "lxml":
+        return _parse_inkstation_lxml(html, oem_code, url)
+    return _parse_inkstation_soup(html, oem_code, url)
+
+
+# XPath versions of the soup selector cascades below, in declaration order.
+# The lxml parser tries them in the order utils.selector_stats has learned.
+PRODUCT_XPATHS = [
+    f"//div[{has_class('product-item')}]",
+    f"//div[{has_class('product')}]",
+    f"//article[{has_class('product-item')}]",
+    f"//div[{has_class('productCard')}]",
+]
+
+# Generic last resorts - always tried after the learned order
+PRODUCT_FALLBACK_XPATHS = [
+    f"//div[{class_contains('product')}]",
+]
+
+TITLE_XPATHS = [
+    f".//a[{class_contains('title')}]",
+    ".//h2",
+    ".//h3",
+    f".//a[{class_contains('name')}]",
+]
+
+PRICE_XPATHS = [
+    f".//span[{class_contains('price')}]",
+    f".//div[{class_contains('price')}]",
+    f".//p[{class_contains('price')}]",
+]
+
+STOCK_XPATH = f".//text()[{text_contains_ci('stock')} or {text_contains_ci('available')}]"
+
+
+def _parse_inkstation_lxml(html, oem_code, url):
+    """parse_inkstation on lxml - same cascades as the soup version"""
+    doc = parse_document(html)
+    
+    product = None
+    for expression in ordered("InkStation", "product", PRODUCT_XPATHS) + PRODUCT_FALLBACK_XPATHS:
+        product = select_first(doc, expression)
+        if product is not None:
+            record_hit("InkStation", "product", expression)
+            break
+    
+    if product is None:
+        return not_found_inkstation(oem_code, url)
+    
+    title = None
+    for expression in ordered("InkStation", "title", TITLE_XPATHS):
+        title_elem = select_first(product, expression)
+        if title_elem is not None:
+            title = element_text(title_elem)
+            if title != "N/A":
+                if title:
+                    record_hit("InkStation", "title", expression)
+                break
+    
+    price = None
+    for expression in ordered("InkStation", "price", PRICE_XPATHS):
+        price_elem = select_first(product, expression)
+        if price_elem is not None:
+            price = clean_price(element_text(price_elem))
+            if price != "N/A":
+                record_hit("InkStation", "price", expression)
+                break
+    
+    stock_elem = select_first(product, STOCK_XPATH)
+    status = "Available" if stock_elem is None or "out" not in stock_elem.lower() else "Out of Stock"
+    
+    return _record(oem_code, title if title else "N/A", price if price else "N/A", status, url)
+
+
+def _parse_inkstation_soup(html, oem_code, url):
+    """parse_inkstation on BeautifulSoup (html.parser)"""
+    soup = BeautifulSoup(html, "html.parser")
+    
+    # Try multiple possible selectors (websites change their HTML)
+    product = None
+    selectors = [
+        {"tag": "div", "class_": "product-item"},
+        {"tag": "div", "class_": "product"},
+        {"tag": "article", "class_": "product-item"},
+        {"tag": "div", "class_": "productCard"}
+    ]
+    
+    for selector in selectors:
+        product = soup.find(selector["tag"], class_=selector["class_"])
+        if product:
+            break
+    
+    if not product:
+        # Try to find any product-related div
+        product = soup.find("div", class_=lambda x: x and "product" in x.lower())
+    
+    if not product:
+        return not_found_inkstation(oem_code, url)
+    
+    # Extract title - try multiple selectors
+    title = None
+    title_selectors = [
+        product.find("a", class_=lambda x: x and "title" in x.lower()),
+        product.find("h2"),
+        product.find("h3"),
+        product.find("a", class_=lambda x: x and "name" in x.lower())
+    ]
+    
+    for title_elem in title_selectors:
+        if title_elem:
+            title = safe_extract_text(title_elem)
+            if title != "N/A":
+                break
+    
+    # Extract price - try multiple selectors
+    price = None
+    price_selectors = [
+        product.find("span", class_=lambda x: x and "price" in x.lower()),
+        product.find("div", class_=lambda x: x and "price" in x.lower()),
+        product.find("p", class_=lambda x: x and "price" in x.lower())
+    ]
+    
+    for price_elem in price_selectors:
+        if price_elem:
+            price = clean_price(safe_extract_text(price_elem))
+            if price != "N/A":
+                break
+    
+    # Check availability
+    stock_elem = product.find(string=lambda x: x and ("stock" in x.lower() or "available" in x.lower()))
+    status = "Available" if not stock_elem or "out" not in str(stock_elem).lower() else "Out of Stock"
+    
+    return _record(oem_code, title if title else "N/A", price if price else "N/A", status, url)
+
+
+def is_challenge_page(status_code, html):
+    """
+    Check whether a response is a Cloudflare challenge.
+    
+    Args:
+        status_code (int): HTTP status
+        html (str): Response body
         
-        soup = BeautifulSoup(response.text, "html.parser")
+    Returns:
+        bool: True if the page is a challenge rather than search results
+    """
+    if status_code not in (200, 403, 503):
+        return False
+    page = (html or "")[:20000].lower()
+    return any(marker in page for marker in CHALLENGE_MARKERS)
+
+
+def fetch_inkstation_cleared(oem_code):
+    """
+    Fetch an InkStation search over plain HTTP using the Cloudflare
+    clearance exported by a browser session.
+    
+    Args:
+        oem_code (str): OEM product code to search for
         
-        # Try multiple possible selectors (websites change their HTML)
-        product = None
-        selectors = [
-            {"tag": "div", "class_": "product-item"},
-            {"tag": "div", "class_": "product"},
-            {"tag": "article", "class_": "product-item"},
-            {"tag": "div", "class_": "productCard"}
-        ]
+    Returns:
+        Page or None: The page (or final record) for the parse stage, or None
+        when there is no valid clearance or a challenge came back (the
+        caller should use the browser)
+    """
+    clearance = load_clearance(INKSTATION_HOST)
+    if not clearance:
+        return None
+    
+    url = build_inkstation_url(oem_code)
+    
+    try:
+        session = get_session_pool().session_for(url)
+        headers = get_headers()
+        headers.update(apply_clearance(session, clearance))
         
-        for selector in selectors:
-            product = soup.find(selector["tag"], class_=selector["class_"])
-            if product:
+        timings = []
+        for conditional in (True, False):
+            request_headers = dict(headers, **conditional_headers(url)) if conditional else headers
+            wait_started = time.time()
+            if wait_for_rate_limit(url):
+                timings.append(span_since("rate_limit_wait", wait_started))
+            fetch_started = time.time()
+            response = session.get(url, headers=request_headers, timeout=15, allow_redirects=True)
+            timings.append(span_since("fetch", fetch_started))
+            if response.status_code != 304:
                 break
+            record, html = cached_page(url, oem_code)
+            if record is not None or html is not None:
+                return Page("InkStation", oem_code, url, html, record, timings)
+            # The stored copy is gone - ask again for the whole page
         
-        if not product:
-            # Try to find any product-related div
-            product = soup.find("div", class_=lambda x: x and "product" in x.lower())
-        
-        if not product:
-            return {
-                "OEM_CODE": oem_code,
-                "Title": "Not Found",
-                "Price": "N/A",
-                "Website": "InkStation",
-                "Status": "Not Available",
-                "URL": url
-            }
+        if is_challenge_page(response.status_code, response.text):
+            print("⚠️  InkStation challenge detected again - falling back to the browser")
+            discard_clearance(INKSTATION_HOST)
+            return None
         
-        # Extract title - try multiple selectors
-        title = None
-        title_selectors = [
-            product.find("a", class_=lambda x: x and "title" in x.lower()),
-            product.find("h2"),
-            product.find("h3"),
-            product.find("a", class_=lambda x: x and "name" in x.lower())
-        ]
+        if response.status_code == 404:
+            return Page("InkStation", oem_code, url, None, not_found_inkstation(oem_code, url), timings)
+        if response.status_code != 200:
+            # Rate limited or a server error - not cached as a miss
+            print(f"❌ InkStation (cleared session) returned HTTP {response.status_code} for {oem_code}")
+            return Page("InkStation", oem_code, url, None, error_inkstation(oem_code, url), timings)
         
-        for title_elem in title_selectors:
-            if title_elem:
-                title = safe_extract_text(title_elem)
-                if title != "N/A":
-                    break
+        store_page(url, response.headers, response.text)
+        return Page("InkStation", oem_code, url, response.text, None, timings)
         
-        # Extract price - try multiple selectors
-        price = None
-        price_selectors = [
-            product.find("span", class_=lambda x: x and "price" in x.lower()),
-            product.find("div", class_=lambda x: x and "price" in x.lower()),
-            product.find("p", class_=lambda x: x and "price" in x.lower())
-        ]
+    except Exception as e:
+        print(f"❌ Error scraping InkStation (cleared session) for {oem_code}: {e}")
+        return None
+
+
+def scrape_inkstation_cleared(oem_code):
+    """
+    Scrape InkStation over plain HTTP with a browser's Cloudflare clearance
+    
+    Args:
+        oem_code (str): OEM product code to search for
         
-        for price_elem in price_selectors:
-            if price_elem:
-                price = clean_price(safe_extract_text(price_elem))
-                if price != "N/A":
-                    break
+    Returns:
+        dict or None: Product information, or None when the browser is needed
+    """
+    page = fetch_inkstation_cleared(oem_code)
+    if page is None:
+        return None
+    if page.record is not None:
+        return page.record
+    return extract_record(page.url, oem_code, page.html, False, parse_inkstation)
+
+
+def scrape_inkstation(oem_code):
+    """
+    Scrape product information from inkstation.com.au
+    
+    Args:
+        oem_code (str): OEM product code to search for
         
-        # Check availability
-        stock_elem = product.find(string=lambda x: x and ("stock" in x.lower() or "available" in x.lower()))
-        status = "Available" if not stock_elem or "out" not in str(stock_elem).lower() else "Out of Stock"
+    Returns:
+        dict or None: Product information or None if not found
+    """
+    url = build_inkstation_url(oem_code)
+    
+    try:
+        response = make_request(url)
         
-        # Add delay to avoid rate limiting
-        random_delay(1, 3)
+        if not response:
+            return not_found_inkstation(oem_code, url)
         
-        return {
-            "OEM_CODE": oem_code,
-            "Title": title if title else "N/A",
-            "Price": price if price else "N/A",
-            "Website": "InkStation",
-            "Status": status,
-            "URL": url
-        }
+        # make_request already waited on the shared rate limit.
+        # On a 304 the record extracted last time is reused unparsed.
+        html = None if response.not_modified else response.text
+        return extract_record(url, oem_code, html, response.not_modified, parse_inkstation)
         
     except Exception as e:
         print(f"❌ Error scraping InkStation for {oem_code}: {e}")
-        return {
-            "OEM_CODE": oem_code,
-            "Title": "Error",
-            "Price": "N/A",
-            "Website": "InkStation",
-            "Status": "Error",
-            "URL": url
-        }
+        return error_inkstation(oem_code, url)
 
 
 # Test function
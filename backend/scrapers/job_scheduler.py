@@ -0,0 +1,350 @@
+"""
+Global scheduler for scraping jobs.
+
+All jobs share one fixed budget: at most MAX_RUNNING_JOBS run at once,
+at most MAX_QUEUED_JOBS wait behind them (further uploads are turned
+away), and the browser work of every running job is served by one set
+of worker threads - one per pooled browser - taking batches from the
+jobs in turn, so a big upload cannot starve a small one.
+
+With a job store the budget holds across every API process sharing it:
+jobs are only started through JobStore.start_job(), admission counts the
+store's pending and running jobs, and slots freed by other processes are
+picked up every SCHEDULER_POLL_SECONDS. Queue positions and estimates
+only cover this process's queue.
+"""
+import os
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is full"""
+
+
+class JobScheduler:
+    """Admits, queues and runs jobs, and shares the browser workers between them"""
+
+    def __init__(self, workers, max_running=None, max_queued=None, store=None):
+        """
+        Args:
+            workers (int): Threads doing browser work for all jobs
+                (normally the browser pool size)
+            max_running (int): Jobs run at once
+            max_queued (int): Jobs allowed to wait for a free slot
+            store (JobStore): Shared job store the limits are counted in
+                (this process only if None)
+        """
+        self.workers = max(1, workers)
+        self.max_running = max(1, max_running or config.MAX_RUNNING_JOBS)
+        self.max_queued = max_queued if max_queued is not None else config.MAX_QUEUED_JOBS
+        self.store = store
+        self._poller = None
+
+        self._cond = threading.Condition()
+        self._waiting = deque()          # (job_id, target, args) not started yet
+        self._running = {}               # job_id -> start time (monotonic)
+        self._tasks = OrderedDict()      # job_id -> deque of (fn, item, results), round-robin order
+        self._results = {}               # job_id -> result queues of its open task streams
+        self._durations = deque(maxlen=20)   # seconds taken by recent jobs
+        self._threads = []
+
+    # ---- Jobs -------------------------------------------------------------
+
+    def submit(self, job_id, target, args=(), force=False):
+        """
+        Queue a job; it starts as soon as a slot is free.
+
+        Args:
+            job_id (str): Job id
+            target (callable): Runs the job (called on its own thread)
+            args (tuple): Arguments for target
+            force (bool): Admit even if the queue is full (resumed jobs)
+
+        Raises:
+            JobQueueFull: If the queue is full
+        """
+        with self._cond:
+            if not force and self._is_full_locked(exclude=job_id):
+                raise JobQueueFull(f"{self._counts_locked(job_id)[1]} jobs are already waiting")
+            self._waiting.append((job_id, target, args))
+            self._dispatch_locked()
+            if self.store is not None and self._poller is None:
+                self._poller = threading.Thread(target=self._poll_shared_slots, daemon=True)
+                self._poller.start()
+
+    def is_full(self):
+        """True if a new job would be turned away"""
+        with self._cond:
+            return self._is_full_locked()
+
+    def _counts_locked(self, exclude=None):
+        # (running, waiting) here, or in every process sharing the store
+        running, waiting = len(self._running), len(self._waiting)
+        if self.store is not None:
+            try:
+                jobs = self.store.active_jobs()
+            except Exception as e:
+                print(f"⚠️  Could not count shared jobs: {e}")
+            else:
+                running = max(running, len(jobs.get('running', [])))
+                waiting = max(waiting, len([job_id for job_id in jobs.get('pending', [])
+                                            if job_id != exclude]))
+        return running, waiting
+
+    def _is_full_locked(self, exclude=None):
+        running, waiting = self._counts_locked(exclude)
+        return running >= self.max_running and waiting >= self.max_queued
+
+    def _may_start_locked(self, job_id):
+        if self.store is None:
+            return True
+        try:
+            return self.store.start_job(job_id, self.max_running)
+        except Exception as e:
+            # Do not stall every job on a store error; this process's own
+            # limit still applies
+            print(f"⚠️  Could not take a shared job slot for {job_id}: {e}")
+            return True
+
+    def _dispatch_locked(self):
+        while self._waiting and len(self._running) < self.max_running:
+            job_id, target, args = self._waiting[0]
+            if not self._may_start_locked(job_id):
+                break    # Every shared slot is taken; the poller retries
+            self._waiting.popleft()
+            self._running[job_id] = time.monotonic()
+            thread = threading.Thread(target=self._run_job, args=(job_id, target, args))
+            thread.daemon = True
+            thread.start()
+
+    def _poll_shared_slots(self):
+        # Jobs finishing in other processes do not wake this one up
+        while True:
+            time.sleep(config.SCHEDULER_POLL_SECONDS)
+            with self._cond:
+                if self._waiting:
+                    self._dispatch_locked()
+
+    def _run_job(self, job_id, target, args):
+        try:
+            target(*args)
+        finally:
+            self._release_shared_slot(job_id)
+            with self._cond:
+                started = self._running.pop(job_id, None)
+                if started is not None:
+                    self._durations.append(time.monotonic() - started)
+                self._tasks.pop(job_id, None)
+                self._dispatch_locked()
+
+    def _release_shared_slot(self, job_id):
+        # A job that ended without a final state would hold its shared
+        # slot for as long as this process lives
+        if self.store is None:
+            return
+        try:
+            job = self.store.get(job_id)
+            if job is not None and job['status'] == 'running':
+                self.store.update(job_id, status='error', message='Error: Job stopped unexpectedly')
+        except Exception as e:
+            print(f"⚠️  Could not release the shared job slot of {job_id}: {e}")
+
+    def running_times(self):
+        """
+        How long each running job has been running.
+
+        Returns:
+            dict: job_id -> seconds since it started
+        """
+        now = time.monotonic()
+        with self._cond:
+            return {job_id: now - started for job_id, started in self._running.items()}
+
+    def queue_info(self, job_id, progress_of=None):
+        """
+        Where a waiting job stands.
+
+        Args:
+            job_id (str): Job id
+            progress_of (callable): progress_of(job_id) -> {'current', 'total'}
+                for running jobs, used to estimate when they finish
+
+        Returns:
+            dict or None: {'position', 'estimated_start'} (1-based position,
+                ISO time or None if unknown), None if the job is not waiting
+        """
+        now = time.monotonic()
+        with self._cond:
+            waiting = [queued_id for queued_id, _, _ in self._waiting]
+            running = dict(self._running)
+            average = sum(self._durations) / len(self._durations) if self._durations else None
+        if job_id not in waiting:
+            return None
+        position = waiting.index(job_id) + 1
+
+        # When each slot frees up: running jobs extrapolated from their
+        # progress, then the jobs ahead in the queue at the average duration
+        free_at = []
+        for running_id, started in running.items():
+            elapsed = now - started
+            progress = progress_of(running_id) if progress_of else None
+            if progress and progress.get('current'):
+                done, total = progress['current'], max(progress['total'], progress['current'])
+                free_at.append(elapsed / done * (total - done))
+            elif average is not None:
+                free_at.append(max(average - elapsed, 0.0))
+            else:
+                free_at.append(None)
+        free_at += [0.0] * (self.max_running - len(free_at))
+
+        estimate = None
+        if None not in free_at and (average is not None or position == 1):
+            free_at.sort()
+            for _ in range(position - 1):
+                free_at.append(free_at.pop(0) + average)
+                free_at.sort()
+            estimate = (datetime.now() + timedelta(seconds=free_at[0])).isoformat()
+        return {'position': position, 'estimated_start': estimate}
+
+    # ---- Browser work -----------------------------------------------------
+
+    def _start_workers_locked(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _next_task_locked(self):
+        # Round-robin: take from the first job with work, then move it to the back
+        for job_id, tasks in self._tasks.items():
+            if tasks:
+                task = tasks.popleft()
+                self._tasks.move_to_end(job_id)
+                return task
+        return None
+
+    def _work(self):
+        while True:
+            with self._cond:
+                task = self._next_task_locked()
+                while task is None:
+                    self._cond.wait()
+                    task = self._next_task_locked()
+            fn, item, results = task
+            try:
+                results.put(('ok', fn(item)))
+            except Exception as e:
+                results.put(('error', e))
+
+    def imap_unordered(self, job_id, fn, items):
+        """
+        Run fn over items on the shared browser workers, in turn with
+        every other running job. Like Pool.imap_unordered.
+
+        Args:
+            job_id (str): Job the work belongs to
+            fn (callable): fn(item) -> result
+            items (iterable): Work items, consumed on a helper thread
+
+        Yields:
+            Results in completion order
+
+        Raises:
+            Exception: The first exception raised by fn or by items
+        """
+        results = queue.Queue()
+        with self._cond:
+            self._start_workers_locked()
+            self._tasks.setdefault(job_id, deque())
+            self._results.setdefault(job_id, []).append(results)
+
+        def feed():
+            count = 0
+            try:
+                for item in items:
+                    with self._cond:
+                        tasks = self._tasks.get(job_id)
+                        if tasks is None:
+                            break    # job cancelled
+                        tasks.append((fn, item, results))
+                        self._cond.notify()
+                    count += 1
+            except Exception as e:
+                results.put(('error', e))
+            results.put(('fed', count))
+
+        threading.Thread(target=feed, daemon=True).start()
+
+        try:
+            received, submitted = 0, None
+            while submitted is None or received < submitted:
+                kind, value = results.get()
+                if kind == 'fed':
+                    submitted = value
+                elif kind == 'cancelled':
+                    return
+                elif kind == 'error':
+                    raise value
+                else:
+                    received += 1
+                    yield value
+        finally:
+            with self._cond:
+                streams = self._results.get(job_id, [])
+                if results in streams:
+                    streams.remove(results)
+                if not streams:
+                    self._results.pop(job_id, None)
+
+    def cancel(self, job_id):
+        """Drop a job's browser work that has not started yet"""
+        with self._cond:
+            self._tasks.pop(job_id, None)
+            for results in self._results.pop(job_id, []):
+                results.put(('cancelled', None))
+
+    def metrics(self):
+        """Running/waiting job counts for the health endpoint"""
+        with self._cond:
+            running, queued = self._counts_locked()
+            return {
+                'running': len(self._running),
+                'queued': len(self._waiting),
+                'running_all': running,
+                'queued_all': queued,
+                'max_running': self.max_running,
+                'max_queued': self.max_queued,
+                'workers': self.workers,
+                'pending_batches': {job_id: len(tasks) for job_id, tasks in self._tasks.items()},
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_job_scheduler():
+    """
+    Get the scheduler shared by every job in this process. Its limits are
+    counted in the job store, so they hold across API processes.
+
+    Returns:
+        JobScheduler: Shared scheduler
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            from scrapers.browser_pool import get_browser_pool
+            from utils.job_store import get_job_store
+            _scheduler = JobScheduler(workers=get_browser_pool().size, store=get_job_store())
+        return _scheduler
@@ -0,0 +1,274 @@
+"""
+Parse stage of the scraping pipeline.
+
+Fetchers (the async engine, plain HTTP and the browsers) only download
+pages and return them as Page tuples. Parsing is CPU-bound, so pages are
+handed in batches to a pool of worker processes running the sites' pure
+parse(html, oem_code, url) functions. The fetch stage is sized by
+ASYNC_MAX_IN_FLIGHT / MAX_WORKERS, the parse stage by PARSE_WORKERS.
+"""
+import multiprocessing
+import sys
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from utils.http_cache import store_record
+from utils.metrics import PARSE_SECONDS
+from utils.job_trace import Span
+
+
+# A downloaded page waiting to be parsed. `parser` names an entry in
+# parsers(). Either `html` is set, or `record` already holds the result
+# (not found, error, or reused from the HTTP cache) and nothing is parsed.
+# `timings` holds the fetcher's spans for the page (utils.job_trace.Span).
+Page = namedtuple("Page", ["parser", "oem_code", "url", "html", "record", "timings"],
+                  defaults=((),))
+
+# Website named in the record when a parser is unavailable or fails
+PARSER_SITES = {
+    "HotToner": "HotToner",
+    "InkStation": "InkStation",
+    "InkDepot": "InkDepot",
+    "InkStationRendered": "InkStation",
+}
+
+
+def parsers():
+    """
+    Pure parse functions by parser name (imported lazily - the scrapers
+    themselves use this module).
+
+    Returns:
+        dict: name -> parse(html, oem_code, url) -> record
+    """
+    from scrapers.hottoner_scraper import parse_hottoner
+    from scrapers.inkstation_scraper import parse_inkstation
+    from scrapers.inkdepot_scraper import parse_inkdepot
+    from scrapers.selenium_scraper import parse_inkstation_rendered
+    return {
+        "HotToner": parse_hottoner,
+        "InkStation": parse_inkstation,
+        "InkDepot": parse_inkdepot,
+        "InkStationRendered": parse_inkstation_rendered,
+    }
+
+
+def error_record(page):
+    """Result for a page that could not be parsed"""
+    return {
+        "OEM_CODE": page.oem_code,
+        "Title": "Error",
+        "Price": "N/A",
+        "Website": PARSER_SITES.get(page.parser, page.parser),
+        "Status": "Error",
+        "URL": page.url
+    }
+
+
+def parse_page(page):
+    """
+    Turn a Page into a record in the current process.
+
+    Args:
+        page (Page): Downloaded page
+
+    Returns:
+        dict: Product record
+    """
+    if page.record is not None:
+        return page.record
+    try:
+        return parsers()[page.parser](page.html or "", page.oem_code, page.url)
+    except Exception as e:
+        print(f"❌ Error parsing {page.parser} page for {page.oem_code}: {e}")
+        return error_record(page)
+
+
+def timed_parse(page):
+    """
+    Parse a page and time it.
+
+    Returns:
+        tuple: (record, Span of the parse)
+    """
+    started = time.time()
+    record = parse_page(page)
+    return record, Span("parse", started, max(time.time() - started, 0.0))
+
+
+def parse_batch(pages):
+    """
+    Parse a batch of pages (runs in a parse worker process). Timings go
+    back with the records, since metrics are only kept by the parent.
+
+    Returns:
+        list: (record, Span) per page
+    """
+    return [timed_parse(page) for page in pages]
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_parse_executor():
+    """
+    Get the process pool shared by every job, or None when
+    config.PARSE_WORKERS is 0 (parse in the calling thread).
+
+    Returns:
+        ProcessPoolExecutor or None: Parse workers
+    """
+    global _executor
+    if not config.PARSE_WORKERS:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            # spawn: forking the threaded API process could copy held locks
+            _executor = ProcessPoolExecutor(
+                max_workers=config.PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+
+def _discard_executor(executor):
+    """Forget a broken pool so the next ParseStage starts a fresh one"""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+
+class ParseStage:
+    """
+    Collects pages from a fetch stage, parses them in batches on the
+    parse workers and hands records back as batches finish.
+    """
+
+    def __init__(self, executor=None, batch_size=None, timing=None, flush_seconds=None):
+        """
+        Args:
+            executor (Executor): Parse workers (the shared pool if None)
+            batch_size (int): Pages sent to a worker at a time
+            timing (callable): timing(key, spans), called with each page's
+                fetch and parse spans as its record is ready
+            flush_seconds (float): Longest time a partial batch waits
+                before ready() sends it anyway
+        """
+        self.executor = executor or get_parse_executor()
+        self.batch_size = batch_size or config.PARSE_BATCH_SIZE
+        self.timing = timing
+        self.flush_seconds = (flush_seconds if flush_seconds is not None
+                              else config.PARSE_FLUSH_SECONDS)
+        self._buffer = []     # (key, page) not yet submitted
+        self._buffered_at = None    # when the oldest buffered page arrived
+        self._running = []    # (future, [(key, page)])
+        self._done = []       # (key, record)
+
+    def put(self, key, page):
+        """
+        Queue a page for parsing.
+
+        Args:
+            key: Returned with the record (e.g. (site, oem_code))
+            page (Page): Downloaded page
+        """
+        if page.record is not None:
+            self._timed(key, page.timings)
+            self._done.append((key, page.record))
+        elif self.executor is None:
+            self._done.append((key, self._finish(key, page, *timed_parse(page))))
+        else:
+            if not self._buffer:
+                self._buffered_at = time.monotonic()
+            self._buffer.append((key, page))
+            if len(self._buffer) >= self.batch_size:
+                self._submit()
+
+    def _submit(self):
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        self._buffered_at = None
+        try:
+            future = self.executor.submit(parse_batch, [page for _, page in batch])
+        except Exception as e:
+            # Pool broken or shut down - parse here instead
+            print(f"⚠️  Parse pool unavailable ({e}), parsing in-process")
+            _discard_executor(self.executor)
+            self.executor = None
+            self._done.extend((key, self._finish(key, page, *timed_parse(page))) for key, page in batch)
+            return
+        self._running.append((future, batch))
+
+    def _collect(self, future, batch):
+        try:
+            parsed = future.result()
+        except Exception as e:
+            print(f"⚠️  Parse worker failed ({e}), parsing in-process")
+            if isinstance(e, BrokenProcessPool):
+                _discard_executor(self.executor)
+            parsed = [timed_parse(page) for _, page in batch]
+        for (key, page), (record, span) in zip(batch, parsed):
+            self._done.append((key, self._finish(key, page, record, span)))
+
+    def _timed(self, key, spans):
+        if self.timing is not None and spans:
+            self.timing(key, spans)
+
+    def _finish(self, key, page, record, span):
+        # Cache writes and metrics stay in this process (store_record is a
+        # no-op for pages with no stored body)
+        PARSE_SECONDS.observe(span.seconds, site=PARSER_SITES.get(page.parser, page.parser))
+        self._timed(key, tuple(page.timings) + (span,))
+        store_record(page.url, record)
+        return record
+
+    def _collect_finished(self):
+        still_running = []
+        for future, batch in self._running:
+            if future.done():
+                self._collect(future, batch)
+            else:
+                still_running.append((future, batch))
+        self._running = still_running
+
+    def ready(self):
+        """
+        Records for pages parsed so far, without waiting. Also sends a
+        partial batch that has waited flush_seconds; call it periodically
+        while the fetch stage is idle (see AsyncFetcher.iter_fetch).
+
+        Yields:
+            tuple: (key, record)
+        """
+        if self._buffer and time.monotonic() - self._buffered_at >= self.flush_seconds:
+            self._submit()
+        self._collect_finished()
+        done, self._done = self._done, []
+        yield from done
+
+    def finish(self):
+        """
+        Parse everything still queued and wait for it.
+
+        Yields:
+            tuple: (key, record) in completion order
+        """
+        self._submit()
+        while self._running or self._done:
+            done, self._done = self._done, []
+            yield from done
+            if self._running:
+                wait([future for future, _ in self._running], return_when=FIRST_COMPLETED)
+                self._collect_finished()
@@ -6,11 +6,252 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
+from bs4.element import NavigableString, Tag
 import time
 import random
+import re
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from utils.rate_limiter import wait_for_rate_limit
+from utils.clearance import save_clearance
+from utils.html_parser import make_soup
+from scrapers.inkstation_scraper import (
+    build_inkstation_url, not_found_inkstation, error_inkstation, is_challenge_page
+)
+from scrapers.parse_pool import Page, parse_page
+from utils.job_trace import Span, span_since
+
+
+# Elements that mean the InkStation results grid has rendered
+RESULT_CARD_SELECTOR = ", ".join([
+    ".product-item", ".product-card", ".search-result", "[data-product-id]", "[data-product]"
+])
+
+# Page text that means the search rendered with no matches
+NO_RESULTS_MARKERS = [
+    "no results", "no products were found", "0 results", "did not match any products",
+    "no matching products"
+]
+
+# Snapshot of render state used by wait_for_results. `stale` is true while a
+# tab still shows the previous page after a scripted navigation.
+PAGE_STATE_SCRIPT = """
+const text = document.body ? document.body.innerText.toLowerCase() : "";
+return {
+    stale: window.__searchNavigationPending === true,
+    ready: document.readyState,
+    cards: document.querySelectorAll(arguments[0]).length,
+    empty: arguments[1].some(marker => text.includes(marker)),
+    resources: performance.getEntriesByType("resource").length
+};
+"""
+
+# Price text inside a product card
+PRICE_PATTERN = re.compile(r'\$\s*[\d,]+')
+
+# Containers considered as product cards by find_product_card
+CARD_TAGS = {'div', 'article', 'li'}
+
+# Class-name hints that a container is a product card
+CARD_CLASS_HINTS = {'product': 2, 'card': 1, 'item': 1}
+
+
+def _card_score(tag, prices, images):
+    """Score a container that holds at least one price and one link"""
+    # A card shows one price; wrappers around many cards score lower
+    score = 3 - prices
+    if images:
+        score += 1
+    classes = " ".join(tag.get('class') or []).lower()
+    for hint, bonus in CARD_CLASS_HINTS.items():
+        if hint in classes:
+            score += bonus
+    if tag.has_attr('data-product-id') or tag.has_attr('data-product'):
+        score += 2
+    return score
+
+
+def find_product_card(soup):
+    """
+    Find the most card-like container on a results page in one pass.
+    
+    The tree is walked once bottom-up (reversed document order visits
+    every descendant before its ancestors), adding each node's price, link
+    and image counts into its parent. Every div/article/li with at least
+    one price and one link is scored as it is completed; ties go to the
+    earliest (outermost) container.
+    
+    Args:
+        soup (BeautifulSoup): Parsed results page
+        
+    Returns:
+        Tag or None: Best product card
+    """
+    nodes = [node for node in soup.descendants
+             if isinstance(node, Tag) or type(node) is NavigableString]
+    counts = {}  # id(tag) -> [prices, links, images] within the tag
+    best = None
+    best_key = None
+    
+    for position in range(len(nodes) - 1, -1, -1):
+        node = nodes[position]
+        parent = node.parent
+        
+        if isinstance(node, Tag):
+            own = counts.pop(id(node), None) or [0, 0, 0]
+            if node.name == 'a' and node.has_attr('href'):
+                own[1] += 1
+            elif node.name == 'img':
+                own[2] += 1
+            
+            if node.name in CARD_TAGS and own[0] and own[1]:
+                key = (_card_score(node, own[0], own[2]), -position)
+                if best_key is None or key > best_key:
+                    best, best_key = node, key
+        else:
+            if not PRICE_PATTERN.search(node):
+                continue
+            own = [1, 0, 0]
+        
+        if parent is not None:
+            totals = counts.setdefault(id(parent), [0, 0, 0])
+            totals[0] += own[0]
+            totals[1] += own[1]
+            totals[2] += own[2]
+    
+    return best
+
+
+def parse_inkstation_rendered(html, oem_code, url=None):
+    """
+    Extract product information from a browser-rendered InkStation search page
+    
+    Args:
+        html (str): Page source after rendering
+        oem_code (str): Product code the page was loaded for
+        url (str): Search URL
+        
+    Returns:
+        dict: Product information
+    """
+    url = url or build_inkstation_url(oem_code)
+    
+    # Try to find product elements
+    try:
+        soup = make_soup(html, "InkStation")
+        
+        # InkStation specific: Find product card
+        # Try multiple possible container structures
+        product = None
+        
+        # Method 1: Look for InkStation-specific product listing containers
+        # Common patterns: product-item, product-card, search-result-item, etc.
+        selectors = [
+            {'class_': 'product-item'},
+            {'class_': 'product-card'},
+            {'class_': 'search-result'},
+            {'class_': 'item'},
+            {'attrs': {'data-product-id': True}},
+            {'attrs': {'data-product': True}},
+        ]
+        
+        for selector in selectors:
+            products = soup.find_all('div', **selector)
+            if not products:
+                products = soup.find_all('article', **selector)
+            if not products:
+                products = soup.find_all('li', **selector)
+            
+            if products:
+                # Found potential products, verify they have price
+                for p in products:
+                    if p.find(string=lambda x: x and '$' in str(x)):
+                        product = p
+                        print(f"✅ Found product using selector: {selector}")
+                        break
+            if product:
+                break
+        
+        # Method 2: Generic fallback - best-scoring container with a
+        # price and a link, found in a single pass over the page
+        if not product:
+            product = find_product_card(soup)
+            if product:
+                print(f"✅ Found product using fallback detection")
+        
+        if not product:
+            print(f"⚠️  No product found for {oem_code}")
+            return not_found_inkstation(oem_code, url)
+        
+        print(f"✅ Product card found for {oem_code}")
+        
+        # Extract title - look for heading or product link text
+        title = "N/A"
+        if hasattr(product, 'find'):  # BeautifulSoup
+            # Try to find title in multiple ways
+            title_elem = (product.find("h2") or product.find("h3") or product.find("h4") or
+                        product.find("a", href=lambda x: x and 'product' in str(x).lower()) or
+                        product.find("a", class_=lambda x: x and any(t in str(x).lower() for t in ['title', 'name', 'product'])))
+            if title_elem:
+                title = title_elem.get_text(strip=True)
+            # If still not found, look for any link with substantial text
+            if title == "N/A":
+                links = product.find_all('a')
+                for link in links:
+                    text = link.get_text(strip=True)
+                    if len(text) > 10 and '$' not in text:  # Avoid price links
+                        title = text
+                        break
+        
+        # Extract price - look for $ symbol
+        price = "N/A"
+        if hasattr(product, 'find'):  # BeautifulSoup
+            # Find any element with $ in text
+            price_elem = product.find(string=lambda x: x and '$' in str(x))
+            if price_elem:
+                # Extract price from text
+                price_match = re.search(r'\$[\d,]+\.?\d*', str(price_elem))
+                if price_match:
+                    price = price_match.group(0)
+            
+            # If not found, try price-specific elements
+            if price == "N/A":
+                price_elems = product.find_all(['span', 'div', 'p'], 
+                    class_=lambda x: x and 'price' in str(x).lower())
+                for elem in price_elems:
+                    text = elem.get_text(strip=True)
+                    price_match = re.search(r'\$[\d,]+\.?\d*', text)
+                    if price_match:
+                        price = price_match.group(0)
+                        break
+        
+        # Check availability
+        page_source = html.lower()
+        status = "Available"
+        if "out of stock" in page_source or "not available" in page_source:
+            status = "Out of Stock"
+        
+        return {
+            "OEM_CODE": oem_code,
+            "Title": title,
+            "Price": price,
+            "Website": "InkStation",
+            "Status": status,
+            "URL": url
+        }
+        
+    except Exception as e:
+        print(f"⚠️  Error parsing page for {oem_code}: {e}")
+        return error_inkstation(oem_code, url)
 
 
 class SeleniumScraper:
@@ -27,6 +268,7 @@ class SeleniumScraper:
         self.driver = None
         self.headless = headless
         self.cloudflare_solved = False  # Track if we've already solved Cloudflare
+        self.challenge_pending = False  # Last page captured was a challenge (clearance is stale)
         self.request_count = 0  # Track number of requests
         
     def setup_driver(self):
@@ -93,6 +335,250 @@ class SeleniumScraper:
         print("\n⚠️ Timeout - proceeding anyway...")
         return False
     
+    def warm_up(self, url="https://www.inkstation.com.au/"):
+        """
+        Launch the browser and clear Cloudflare before any lookups,
+        so the first search runs on an established session.
+        
+        Args:
+            url (str): Page to open for the Cloudflare check
+        """
+        if not self.driver:
+            self.setup_driver()
+        
+        if not self.cloudflare_solved:
+            wait_for_rate_limit(url)
+            self.driver.get(url)
+            self.wait_for_cloudflare(timeout=120)
+            self.cloudflare_solved = True
+            self.export_clearance()
+    
+    def export_clearance(self, host="www.inkstation.com.au"):
+        """
+        Save this browser's cookies and user agent so the plain HTTP
+        scraper can reuse its Cloudflare clearance.
+        
+        Args:
+            host (str): Host the cookies belong to
+        """
+        if not self.driver or not self.cloudflare_solved or self.challenge_pending:
+            return
+        try:
+            cookies = self.driver.get_cookies()
+            user_agent = self.driver.execute_script("return navigator.userAgent")
+            save_clearance(host, cookies, user_agent)
+        except Exception as e:
+            print(f"⚠️  Could not export browser clearance: {e}")
+    
+    def wait_for_results(self, timeout=None):
+        """
+        Wait until the search page has actually rendered, instead of
+        sleeping for a fixed time.
+        
+        The page counts as rendered once the document is complete, no new
+        network requests have started for SELENIUM_NETWORK_QUIET seconds,
+        and either a product card or a "no results" message is present.
+        
+        Args:
+            timeout (float): Upper bound in seconds (SELENIUM_RENDER_TIMEOUT if None)
+            
+        Returns:
+            str: 'results', 'no_results' or 'timeout'
+        """
+        timeout = timeout or config.SELENIUM_RENDER_TIMEOUT
+        network = {'resources': None, 'since': time.monotonic()}
+        
+        try:
+            return WebDriverWait(self.driver, timeout, poll_frequency=0.1).until(
+                lambda driver: self._render_state(network)
+            )
+        except TimeoutException:
+            return 'timeout'
+    
+    def _render_state(self, network):
+        """
+        One non-blocking render check of the current tab.
+        
+        Args:
+            network (dict): {'resources', 'since'} tracked across checks of
+                the same page to tell when network activity has stopped;
+                'loaded' is added once the document has finished loading
+            
+        Returns:
+            str or bool: 'results', 'no_results' or False if not rendered yet
+        """
+        state = self.driver.execute_script(PAGE_STATE_SCRIPT, RESULT_CARD_SELECTOR, NO_RESULTS_MARKERS)
+        now = time.monotonic()
+        if state['stale']:
+            return False
+        if state['resources'] != network['resources']:
+            network['resources'] = state['resources']
+            network['since'] = now
+        if state['ready'] == 'complete':
+            network.setdefault('loaded', time.time())
+        
+        if state['ready'] != 'complete' or now - network['since'] < config.SELENIUM_NETWORK_QUIET:
+            return False
+        if state['cards']:
+            return 'results'
+        if state['empty']:
+            return 'no_results'
+        return False
+    
+    def _open_tabs(self, count):
+        """
+        Make sure the browser has at least `count` tabs open.
+        
+        Returns:
+            list: Window handles of the first `count` tabs
+        """
+        while len(self.driver.window_handles) < count:
+            self.driver.switch_to.new_window('tab')
+        return self.driver.window_handles[:count]
+    
+    def scrape_inkstation_many(self, oem_codes, tabs=None):
+        """
+        Scrape several codes at once in parallel tabs and parse the pages
+        here (see fetch_inkstation_many to parse them elsewhere)
+        
+        Args:
+            oem_codes (list): Product codes to search
+            tabs (int): Tabs to load in parallel (SELENIUM_TABS_PER_BROWSER if None)
+            
+        Returns:
+            dict: oem_code -> product information
+        """
+        pages = self.fetch_inkstation_many(oem_codes, tabs)
+        return {code: parse_page(page) for code, page in pages.items()}
+    
+    def fetch_inkstation_many(self, oem_codes, tabs=None):
+        """
+        Load several searches at once, each in its own tab of this browser.
+        Pages are captured as each tab finishes rendering and the freed tab
+        moves on to the next code.
+        
+        Args:
+            oem_codes (list): Product codes to search
+            tabs (int): Tabs to load in parallel (SELENIUM_TABS_PER_BROWSER if None)
+            
+        Returns:
+            dict: oem_code -> Page (rendered source, or the final record)
+        """
+        tabs = min(tabs or config.SELENIUM_TABS_PER_BROWSER, len(oem_codes))
+        
+        # The first load may need a manual Cloudflare solve - do it in one tab
+        if tabs <= 1 or not self.driver or not self.cloudflare_solved:
+            return {code: self.fetch_inkstation(code) for code in oem_codes}
+        
+        results = {}
+        pending = list(oem_codes)
+        loading = {}  # handle -> state of the search loading in that tab
+        challenged = []  # codes that came back as a Cloudflare challenge
+        retry = []
+        
+        try:
+            handles = self._open_tabs(tabs)
+            
+            # Once a challenge shows up, let the open tabs finish but start no new searches
+            while loading or (pending and not challenged):
+                # Start a search in every idle tab
+                for handle in handles:
+                    if handle in loading or not pending or challenged:
+                        continue
+                    code = pending.pop(0)
+                    url = build_inkstation_url(code)
+                    self.request_count += 1
+                    timings = []
+                    wait_started = time.time()
+                    if wait_for_rate_limit(url):
+                        timings.append(span_since("rate_limit_wait", wait_started))
+                    print(f"🌐 Loading {url} (tab {handles.index(handle) + 1})")
+                    self.driver.switch_to.window(handle)
+                    # Navigate without blocking so the other tabs keep loading
+                    self.driver.execute_script(
+                        "window.__searchNavigationPending = true; window.location.href = arguments[0];", url
+                    )
+                    now = time.monotonic()
+                    loading[handle] = {
+                        'code': code, 'url': url, 'started': now, 'scrolled': False,
+                        'network': {'resources': None, 'since': now},
+                        'timings': timings, 'navigated': time.time(),
+                    }
+                
+                # Check every loading tab once
+                for handle, tab in list(loading.items()):
+                    self.driver.switch_to.window(handle)
+                    try:
+                        state = self._render_state(tab['network'])
+                    except Exception:
+                        state = False  # Page mid-navigation
+                    timed_out = time.monotonic() - tab['started'] > config.SELENIUM_RENDER_TIMEOUT
+                    
+                    if state == 'results' and not tab['scrolled'] and not timed_out:
+                        # Trigger lazy loading, then wait for it to settle again
+                        self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                        self.driver.execute_script("window.scrollTo(0, 0);")
+                        tab['scrolled'] = True
+                        tab['loaded'] = tab['network'].get('loaded')
+                        tab['network'] = {'resources': None, 'since': time.monotonic()}
+                        continue
+                    
+                    if state == 'no_results':
+                        print(f"⚠️  No product found for {tab['code']}")
+                        results[tab['code']] = Page("InkStationRendered", tab['code'], tab['url'], None,
+                                                    not_found_inkstation(tab['code'], tab['url']))
+                    elif state == 'results' or timed_out:
+                        page = self._capture(tab['code'], tab['url'])
+                        del loading[handle]
+                        if page is None:
+                            challenged.append(tab['code'])
+                            continue
+                        results[tab['code']] = page
+                    else:
+                        continue
+                    loading.pop(handle, None)
+                    loaded = tab.get('loaded') or tab['network'].get('loaded')
+                    results[tab['code']] = results[tab['code']]._replace(
+                        timings=tab['timings'] + self._load_spans(tab['navigated'], loaded)
+                    )
+                
+                if loading:
+                    time.sleep(0.1)
+            
+            # Load the challenged codes (and any not started) one at a time:
+            # the first waits for the challenge to be solved
+            retry, pending = challenged + pending, []
+            if retry:
+                print(f"⚠️  Cloudflare challenge is back - retrying {len(retry)} code(s) once it is solved")
+            while retry:
+                code = retry.pop(0)
+                results[code] = self.fetch_inkstation(code)
+        
+        except Exception as e:
+            print(f"❌ Error in multi-tab scrape: {e}")
+            for code in [tab['code'] for tab in loading.values()] + pending + retry:
+                url = build_inkstation_url(code)
+                results[code] = Page("InkStationRendered", code, url, None, error_inkstation(code, url))
+        
+        return results
+    
+    @staticmethod
+    def _load_spans(navigated, loaded):
+        """
+        Split a page load into its download (until the document finished
+        loading) and the wait for it to render.
+        
+        Args:
+            navigated (float): When navigation started (time.time())
+            loaded (float): When the document finished loading, or None
+            
+        Returns:
+            list: 'fetch' and 'render_wait' Spans
+        """
+        now = time.time()
+        loaded = min(max(loaded or now, navigated), now)
+        return [Span("fetch", navigated, loaded - navigated), Span("render_wait", loaded, now - loaded)]
+    
     def scrape_inkstation(self, oem_code):
         """
         Scrape InkStation using Selenium
@@ -103,15 +589,35 @@ class SeleniumScraper:
         Returns:
             dict: Product information
         """
-        url = f"https://www.inkstation.com.au/search?keywords={oem_code}"
+        return parse_page(self.fetch_inkstation(oem_code))
+    
+    def fetch_inkstation(self, oem_code):
+        """
+        Load an InkStation search in the browser and capture the rendered page
+        
+        Args:
+            oem_code (str): Product code to search
+            
+        Returns:
+            Page: Rendered source, or the final record (no results / error)
+        """
+        url = build_inkstation_url(oem_code)
         
         try:
             if not self.driver:
                 self.setup_driver()
             
             self.request_count += 1
+            timings = []
+            # Browser loads share the site's request budget with the HTTP scrapers
+            wait_started = time.time()
+            if wait_for_rate_limit(url):
+                timings.append(span_since("rate_limit_wait", wait_started))
             print(f"🌐 Loading {url}")
+            fetch_started = time.time()
             self.driver.get(url)
+            timings.append(span_since("fetch", fetch_started))
+            render_started = time.time()
             
             # Only wait for Cloudflare on first request or if we detect it again
             if not self.cloudflare_solved:
@@ -119,168 +625,73 @@ class SeleniumScraper:
                 self.cloudflare_solved = True  # Mark as solved for subsequent requests
                 print("✅ Cloudflare session established - subsequent requests will be faster!")
             else:
-                # Just wait for page to load (much faster)
-                time.sleep(3)
                 print("⚡ Using existing Cloudflare session (no CAPTCHA needed)")
             
-            # Additional wait for dynamic content
-            print("⏳ Waiting for page to fully render...")
-            time.sleep(5)  # Reduced from 8 seconds since no CAPTCHA
+            # Wait for the results grid or a "no results" message
+            print("⏳ Waiting for page to render...")
+            page_state = self.wait_for_results()
             
-            # Scroll to trigger lazy loading
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)
-            self.driver.execute_script("window.scrollTo(0, 0);")
-            time.sleep(2)
+            if page_state == 'no_results':
+                print(f"⚠️  No product found for {oem_code}")
+                timings.append(span_since("render_wait", render_started))
+                return Page("InkStationRendered", oem_code, url, None, not_found_inkstation(oem_code, url),
+                            timings)
             
-            # Try to find product elements
-            try:
-                # Wait for page content to load (more flexible)
-                WebDriverWait(self.driver, 15).until(
-                    lambda d: d.execute_script("return document.readyState") == "complete"
-                )
-                
-                # Get page source for BeautifulSoup parsing (more reliable)
-                from bs4 import BeautifulSoup
-                soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-                
-                # InkStation specific: Find product card
-                # Try multiple possible container structures
-                product = None
-                
-                # Method 1: Look for InkStation-specific product listing containers
-                # Common patterns: product-item, product-card, search-result-item, etc.
-                selectors = [
-                    {'class_': 'product-item'},
-                    {'class_': 'product-card'},
-                    {'class_': 'search-result'},
-                    {'class_': 'item'},
-                    {'attrs': {'data-product-id': True}},
-                    {'attrs': {'data-product': True}},
-                ]
-                
-                for selector in selectors:
-                    products = soup.find_all('div', **selector)
-                    if not products:
-                        products = soup.find_all('article', **selector)
-                    if not products:
-                        products = soup.find_all('li', **selector)
-                    
-                    if products:
-                        # Found potential products, verify they have price
-                        for p in products:
-                            if p.find(string=lambda x: x and '$' in str(x)):
-                                product = p
-                                print(f"✅ Found product using selector: {selector}")
-                                break
-                    if product:
-                        break
-                
-                # Method 2: Generic fallback - find any div/article containing price
-                if not product:
-                    all_containers = soup.find_all(['div', 'article', 'li'])
-                    for container in all_containers:
-                        # Check if has price and product-like attributes
-                        has_price = container.find(string=lambda x: x and '$' in str(x))
-                        has_link = container.find('a', href=True)
-                        has_image = container.find('img')
-                        
-                        # Product should have at least price and link
-                        if has_price and has_link:
-                            product = container
-                            print(f"✅ Found product using fallback detection")
-                            break
-                
-                if not product:
-                    print(f"⚠️  No product found for {oem_code}")
-                    return {
-                        "OEM_CODE": oem_code,
-                        "Title": "Not Found",
-                        "Price": "N/A",
-                        "Website": "InkStation",
-                        "Status": "Not Available",
-                        "URL": url
-                    }
-                
-                print(f"✅ Product card found for {oem_code}")
-                
-                # Extract title - look for heading or product link text
-                title = "N/A"
-                if hasattr(product, 'find'):  # BeautifulSoup
-                    # Try to find title in multiple ways
-                    title_elem = (product.find("h2") or product.find("h3") or product.find("h4") or
-                                product.find("a", href=lambda x: x and 'product' in str(x).lower()) or
-                                product.find("a", class_=lambda x: x and any(t in str(x).lower() for t in ['title', 'name', 'product'])))
-                    if title_elem:
-                        title = title_elem.get_text(strip=True)
-                    # If still not found, look for any link with substantial text
-                    if title == "N/A":
-                        links = product.find_all('a')
-                        for link in links:
-                            text = link.get_text(strip=True)
-                            if len(text) > 10 and '$' not in text:  # Avoid price links
-                                title = text
-                                break
-                
-                # Extract price - look for $ symbol
-                price = "N/A"
-                if hasattr(product, 'find'):  # BeautifulSoup
-                    # Find any element with $ in text
-                    import re
-                    price_elem = product.find(string=lambda x: x and '$' in str(x))
-                    if price_elem:
-                        # Extract price from text
-                        price_match = re.search(r'\$[\d,]+\.?\d*', str(price_elem))
-                        if price_match:
-                            price = price_match.group(0)
-                    
-                    # If not found, try price-specific elements
-                    if price == "N/A":
-                        price_elems = product.find_all(['span', 'div', 'p'], 
-                            class_=lambda x: x and 'price' in str(x).lower())
-                        for elem in price_elems:
-                            text = elem.get_text(strip=True)
-                            price_match = re.search(r'\$[\d,]+\.?\d*', text)
-                            if price_match:
-                                price = price_match.group(0)
-                                break
-                
-                # Check availability
-                page_source = self.driver.page_source.lower()
-                status = "Available"
-                if "out of stock" in page_source or "not available" in page_source:
-                    status = "Out of Stock"
-                
-                return {
-                    "OEM_CODE": oem_code,
-                    "Title": title,
-                    "Price": price,
-                    "Website": "InkStation",
-                    "Status": status,
-                    "URL": url
-                }
-                
-            except Exception as e:
-                print(f"⚠️  Error parsing page for {oem_code}: {e}")
-                return {
-                    "OEM_CODE": oem_code,
-                    "Title": "Error",
-                    "Price": "N/A",
-                    "Website": "InkStation",
-                    "Status": "Error",
-                    "URL": url
-                }
+            if page_state == 'results':
+                # Scroll to trigger lazy loading, then let those requests settle
+                self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                self.driver.execute_script("window.scrollTo(0, 0);")
+                self.wait_for_results()
+            else:
+                print(f"⚠️  Page did not settle within {config.SELENIUM_RENDER_TIMEOUT}s, parsing anyway")
+            
+            timings.append(span_since("render_wait", render_started))
+            page = self._capture(oem_code, url)
+            if page is None:
+                return Page("InkStationRendered", oem_code, url, None, error_inkstation(oem_code, url),
+                            timings)
+            return page._replace(timings=timings)
         
         except Exception as e:
             print(f"❌ Error loading page for {oem_code}: {e}")
-            return {
-                "OEM_CODE": oem_code,
-                "Title": "Error",
-                "Price": "N/A",
-                "Website": "InkStation",
-                "Status": "Error",
-                "URL": url
-            }
+            return Page("InkStationRendered", oem_code, url, None, error_inkstation(oem_code, url))
+    
+    def _capture(self, oem_code, url):
+        """
+        Capture the current tab, unless Cloudflare challenged it again.
+        
+        A challenge marks the session as needing a new solve (the next
+        fetch_inkstation waits for it) and stops export_clearance from
+        handing out the stale cookies until a page loads normally again.
+        
+        Args:
+            oem_code (str): Product code the page was loaded for
+            url (str): Search URL
+            
+        Returns:
+            Page or None: Rendered page, or None for a challenge
+        """
+        page = self._rendered_page(oem_code, url)
+        if is_challenge_page(200, page.html):
+            print(f"⚠️  Cloudflare challenge instead of results for {oem_code}")
+            self.cloudflare_solved = False
+            self.challenge_pending = True
+            return None
+        self.challenge_pending = False
+        return page
+    
+    def _rendered_page(self, oem_code, url):
+        """
+        Capture the page loaded in the current tab for the parse stage
+        
+        Args:
+            oem_code (str): Product code the page was loaded for
+            url (str): Search URL
+            
+        Returns:
+            Page: Rendered page source, parsed by parse_inkstation_rendered
+        """
+        return Page("InkStationRendered", oem_code, url, self.driver.page_source, None)
     
     def close(self):
         """Close the browser"""
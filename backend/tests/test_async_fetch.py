@@ -0,0 +1,75 @@
+"""
+Stopping an iter_fetch run must stop pulling items and fetching.
+"""
+import http.server
+import itertools
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import config
+from utils.async_fetch import AsyncFetcher
+from utils.rate_limiter import RateLimiter
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(0.05)
+        body = b"<html><body>ok</body></html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(config, "HTTP_CACHE_ENABLED", False)
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+def _fetcher():
+    return AsyncFetcher(max_in_flight=4, default_host_limit=4, timeout=5, max_retries=1,
+                        rate_limiter=RateLimiter(rate_limits={}, burst=1))
+
+
+def _counted_items(base, pulled):
+    for i in itertools.count():
+        pulled.append(i)
+        yield i, f"{base}/{i}", None, None
+
+
+@pytest.mark.parametrize("stop", ["close_generator", "close_fetcher"])
+def test_stopping_a_run_stops_pulling_items(server, monkeypatch, stop):
+    monkeypatch.setattr(config, "DEFAULT_RATE_LIMIT", 0)
+    pulled = []
+    fetcher = _fetcher()
+    results = fetcher.iter_fetch(_counted_items(server, pulled))
+
+    for _ in range(3):
+        assert next(results).status == 200
+
+    if stop == "close_generator":
+        results.close()
+    else:
+        fetcher.close()
+        # The consumer sees the run end instead of more results
+        assert list(results) == []
+
+    time.sleep(0.3)
+    count = len(pulled)
+    time.sleep(0.5)
+    assert len(pulled) == count
+    assert fetcher._runs == set()
@@ -0,0 +1,35 @@
+"""
+Fetch outcomes become the right records: only a 404 is a missing product;
+a lookup that ran out of retries is an error and is never cached.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from scrapers.async_runner import page_for
+from utils.async_fetch import FetchResult
+from utils.result_cache import ResultCache
+
+URL = "https://www.hottoner.com.au/index.php?route=product/search&search=TN2450"
+
+
+def _fetched(status, error=None):
+    return FetchResult(("HotToner", "TN2450"), URL, status, None, error)
+
+
+def test_404_is_not_available():
+    page = page_for("HotToner", "TN2450", _fetched(404))
+    assert page.record["Status"] == "Not Available"
+
+
+@pytest.mark.parametrize("status, error", [(429, None), (503, None), (None, TimeoutError())])
+def test_giving_up_is_an_error_and_not_cached(tmp_path, status, error):
+    page = page_for("HotToner", "TN2450", _fetched(status, error))
+    assert page.record["Status"] == "Error"
+
+    cache = ResultCache(path=str(tmp_path / "results.sqlite3"))
+    cache.put("HotToner", "TN2450", page.record)
+    assert cache.get("HotToner", "TN2450") is None
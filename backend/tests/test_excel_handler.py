@@ -0,0 +1,58 @@
+"""
+OEM codes are streamed from uploads row by row, in file order and without
+duplicates, for every supported format.
+"""
+import io
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from openpyxl import Workbook
+
+from utils.excel_handler import iter_oem_codes
+
+
+def _xlsx(rows):
+    workbook = Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    stream = io.BytesIO()
+    workbook.save(stream)
+    stream.seek(0)
+    return stream
+
+
+def test_csv_codes_in_order_without_blanks_or_duplicates():
+    data = b"\xef\xbb\xbfName,OEM_CODE\na,TN2450\nb,\nc,CF226A\nd,TN2450\n"
+    assert list(iter_oem_codes(io.BytesIO(data), "codes.csv")) == ["TN2450", "CF226A"]
+
+
+def test_csv_is_read_lazily():
+    data = b"OEM_CODE\n" + b"".join(f"CODE{i}\n".encode() for i in range(100000))
+    stream = io.BytesIO(data)
+    codes = iter_oem_codes(stream, "codes.csv")
+    assert next(codes) == "CODE0"
+    # Only the first buffer of a ~1MB upload has been read
+    assert 0 < stream.tell() < len(data) // 10
+    codes.close()
+
+
+def test_xlsx_upload_stream():
+    stream = _xlsx([["Name", "OEM_CODE"], ["a", "TN2450"], ["b", None], ["c", "TN2450"], ["d", "CF226A"]])
+    assert list(iter_oem_codes(stream, "codes.xlsx")) == ["TN2450", "CF226A"]
+
+
+@pytest.mark.parametrize("filename, stream", [
+    ("codes.csv", lambda: io.BytesIO(b"Name,Code\na,TN2450\n")),
+    ("codes.xlsx", lambda: _xlsx([["Name", "Code"], ["a", "TN2450"]])),
+])
+def test_missing_column_names_the_file(filename, stream):
+    with pytest.raises(ValueError, match=f"{filename} must contain an 'OEM_CODE' column"):
+        list(iter_oem_codes(stream(), filename))
+
+
+def test_unsupported_extension():
+    with pytest.raises(ValueError, match="Unsupported file type"):
+        list(iter_oem_codes(io.BytesIO(b""), "codes.txt"))
@@ -0,0 +1,73 @@
+"""
+Streamed HotToner extraction must give the same record as parsing the
+whole page.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import config
+from scrapers.hottoner_scraper import parse_hottoner, stream_hottoner
+
+URL = "https://www.hottoner.com.au/product/tn-2450"
+
+DETAIL_PAGE = """<html><head><title>TN-2450</title></head><body>
+<div id="content">
+  <h1>Brother TN-2450 Toner</h1>
+  <div class="product-info">
+    <div class="price"><span class="price-new">$54.95</span></div>
+    <div class="description">Availability: 2-3 Days</div>
+  </div>
+  <div class="tabs">""" + "<p>Specifications and reviews</p>" * 500 + """</div>
+  <div class="OutofStock">Currently out of stock</div>
+</div>
+<div class="product-list"><ul><li><table><tr>
+  <td class="pl-name"><a href="#">Related cartridge</a></td>
+  <td class="pl-our-price">$10.00</td>
+</tr></table></li></ul></div>
+<footer>""" + "<p>Footer</p>" * 200 + """</footer>
+</body></html>"""
+
+SEARCH_PAGE = """<html><body>
+<div class="product-list"><ul>
+  <li><table><tr>
+    <td class="pl-name"><a href="#">Brother TN-2450 Toner</a></td>
+    <td class="pl-our-price">$54.95</td><td>InStock</td>
+  </tr></table></li>
+  <li><table><tr><td class="pl-name"><a href="#">Second result</a></td></tr></table></li>
+</ul></div>
+<footer>""" + "<p>Footer</p>" * 500 + """</footer>
+</body></html>"""
+
+
+@pytest.fixture(autouse=True)
+def streaming(monkeypatch):
+    monkeypatch.setattr(config, "HTML_STREAMING", True)
+    monkeypatch.setattr(config, "HTML_PARSER_BACKENDS", {"HotToner": "lxml"})
+
+
+def stream(html, chunk_size=512):
+    """Feed a page in chunks like the fetcher does; returns (record, stopped early)"""
+    extractor = stream_hottoner("TN-2450", URL, "utf-8")
+    body = html.encode("utf-8")
+    for start in range(0, len(body), chunk_size):
+        if extractor.feed(body[start:start + chunk_size]):
+            break
+    return extractor.record(), extractor.bytes_read < len(body)
+
+
+def test_detail_page_sees_out_of_stock_marker_below_product_info():
+    record, stopped_early = stream(DETAIL_PAGE)
+    assert record == parse_hottoner(DETAIL_PAGE, "TN-2450", URL)
+    assert record["Status"] == "Out of Stock"
+    assert not stopped_early
+
+
+def test_search_page_stops_after_first_result():
+    record, stopped_early = stream(SEARCH_PAGE)
+    assert record == parse_hottoner(SEARCH_PAGE, "TN-2450", URL)
+    assert record["Status"] == "In Stock"
+    assert stopped_early
@@ -0,0 +1,101 @@
+"""
+Validators are only kept with something that can answer a 304, and a 304
+the cache cannot answer is fetched again in full.
+"""
+import http.server
+import os
+import sys
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import config
+import utils.async_fetch
+import utils.http_cache
+from scrapers.async_runner import page_for
+from utils.async_fetch import AsyncFetcher, FetchResult
+from utils.http_cache import HttpCache
+from utils.rate_limiter import RateLimiter
+
+URL = "https://www.hottoner.com.au/index.php?route=product/search&search=TN2450"
+HEADERS = {"ETag": '"v1"'}
+RECORD = {"Status": "Available", "Price": "$10.00"}
+PAGE = "<html><body>full page</body></html>"
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = HttpCache(path=str(tmp_path / "http.sqlite3"))
+    monkeypatch.setattr(config, "HTTP_CACHE_ENABLED", True)
+    monkeypatch.setattr(utils.http_cache, "_http_cache", cache)
+    yield cache
+    cache.close()
+
+
+def test_full_body_is_stored_with_validators(cache):
+    cache.store_page(URL, HEADERS, PAGE)
+    assert cache.validators(URL) == {"If-None-Match": '"v1"'}
+    assert cache.body(URL) == PAGE
+
+
+def test_partly_read_page_keeps_only_its_record(cache):
+    cache.store_page(URL, HEADERS, None, RECORD)
+    assert cache.validators(URL) == {"If-None-Match": '"v1"'}
+    assert cache.body(URL) is None
+    assert cache.record(URL) == RECORD
+
+
+def test_partly_read_page_without_a_record_drops_the_old_copy(cache):
+    cache.store_page(URL, HEADERS, PAGE)
+    cache.store_page(URL, {"ETag": '"v2"'}, None, {"Status": "Error"})
+    assert cache.validators(URL) == {}
+    assert not cache.has_copy(URL)
+
+
+def test_304_without_a_stored_copy_is_an_error(cache):
+    page = page_for("HotToner", "TN2450", FetchResult(("HotToner", "TN2450"), URL, 304, None, None))
+    assert page.record["Status"] == "Error"
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    seen = []
+
+    def do_GET(self):
+        self.seen.append(self.headers.get("If-None-Match"))
+        if self.headers.get("If-None-Match"):
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = PAGE.encode()
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_304_without_a_stored_copy_is_fetched_again(cache, monkeypatch):
+    monkeypatch.setattr(config, "DEFAULT_RATE_LIMIT", None)
+    # Validators sent for a copy that is gone by the time the 304 arrives
+    monkeypatch.setattr(utils.async_fetch, "conditional_headers", lambda url: {"If-None-Match": '"v1"'})
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{httpd.server_address[1]}/search"
+    _Handler.seen = []
+    try:
+        fetcher = AsyncFetcher(max_in_flight=1, default_host_limit=1, timeout=5, max_retries=1,
+                               rate_limiter=RateLimiter(rate_limits={}))
+        [fetched] = list(fetcher.iter_fetch([("key", url, None, None)]))
+    finally:
+        httpd.shutdown()
+
+    assert _Handler.seen == ['"v1"', None]
+    assert fetched.status == 200
+    assert fetched.text == PAGE
+    assert cache.body(url) == PAGE
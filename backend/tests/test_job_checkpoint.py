@@ -0,0 +1,103 @@
+"""
+A job stopped mid-run resumes from its checkpoint: finished rows are
+replayed in upload order and only the remaining codes are scraped again.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import utils.job_store
+from app import JobResults
+from utils.job_checkpoint import JobCheckpoints
+from utils.job_store import MemoryJobStore
+
+COLUMNS = ["HotToner", "InkStation"]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "checkpoints.sqlite3")
+
+
+def _row(code):
+    return {"OEM_CODE": code, "HotToner": "$10.00", "InkStation": "$12.00"}
+
+
+def _crash(checkpoints):
+    # The process dies: buffered writes are lost, nothing is flushed
+    checkpoints._pending = []
+    checkpoints._conn.close()
+
+
+def test_unfinished_job_resumes_with_its_finished_rows(path):
+    checkpoints = JobCheckpoints(path, flush_every=1000, flush_seconds=3600)
+    checkpoints.start("job-1", "codes.xlsx", "out.xlsx", "a@example.com")
+    for seq, code in enumerate(["TN2450", "CF226A", "TN3440"]):
+        checkpoints.add_code("job-1", seq, code)
+    checkpoints.input_read("job-1")
+    checkpoints.code_done("job-1", "TN2450", _row("TN2450"))
+    checkpoints.flush()
+    # Finished after the last flush, so it is redone
+    checkpoints.code_done("job-1", "TN3440", _row("TN3440"))
+    _crash(checkpoints)
+
+    reopened = JobCheckpoints(path)
+    assert reopened.unfinished_jobs() == [{
+        "job_id": "job-1", "filename": "codes.xlsx", "output_file": "out.xlsx",
+        "email": "a@example.com", "input_complete": True,
+    }]
+    assert list(reopened.codes("job-1", chunk_size=2)) == [
+        ("TN2450", _row("TN2450")), ("CF226A", None), ("TN3440", None),
+    ]
+
+
+def test_job_stopped_while_reading_its_upload_is_not_complete(path):
+    checkpoints = JobCheckpoints(path, flush_every=1)
+    checkpoints.start("job-1", "codes.csv", "out.xlsx", None)
+    checkpoints.add_code("job-1", 0, "TN2450")
+    _crash(checkpoints)
+
+    [job] = JobCheckpoints(path).unfinished_jobs()
+    assert not job["input_complete"]
+
+
+def test_finished_jobs_are_not_resumed(path):
+    checkpoints = JobCheckpoints(path)
+    checkpoints.start("job-1", "codes.csv", "out.xlsx", None)
+    checkpoints.add_code("job-1", 0, "TN2450")
+    checkpoints.input_read("job-1")
+    checkpoints.finish("job-1", "completed")
+    assert checkpoints.unfinished_jobs() == []
+    assert list(checkpoints.codes("job-1")) == []
+
+
+class _Writer:
+    def __init__(self):
+        self.rows = []
+
+    def write(self, row):
+        self.rows.append(row)
+
+
+def test_resumed_rows_are_written_in_upload_order(path, monkeypatch):
+    monkeypatch.setattr(utils.job_store, "_job_store", MemoryJobStore())
+    monkeypatch.setattr(utils.job_store, "_job_store_pid", os.getpid())
+    checkpoints = JobCheckpoints(path, flush_every=1)
+    checkpoints.start("job-1", "codes.csv", "out.xlsx", None)
+    writer = _Writer()
+    results = JobResults("job-1", COLUMNS, writer, checkpoints)
+
+    # As resume_scraper_job feeds them: one row replayed, one still to scrape
+    results.add_code("TN2450")
+    results.add_code("CF226A", _row("CF226A"))
+    assert writer.rows == []
+    results.add("TN2450", {"HotToner": "$10.00"})
+    assert writer.rows == []
+    results.add("TN2450", {"InkStation": "$12.00"})
+
+    assert writer.rows == [_row("TN2450"), _row("CF226A")]
+    # Only the scraped code was recorded again
+    assert list(checkpoints.codes("job-1")) == [("TN2450", _row("TN2450"))]
@@ -0,0 +1,113 @@
+"""
+Scheduler admission: the running and queued limits hold for every API
+process sharing the job store, not per process.
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import config
+from scrapers.job_scheduler import JobQueueFull, JobScheduler
+from utils.job_store import SQLiteJobStore
+
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    # One store per simulated API process, all on the same file
+    monkeypatch.setattr(config, "SCHEDULER_POLL_SECONDS", 0.05)
+    path = str(tmp_path / "jobs.sqlite3")
+    opened = [SQLiteJobStore(path) for _ in range(2)]
+    yield opened
+    for store in opened:
+        store.close()
+
+
+def _job(store, job_id, release, started):
+    def run():
+        started.append(job_id)
+        release.wait(5)
+        store.update(job_id, status="completed")
+    return run
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_running_limit_is_shared_between_processes(stores):
+    first, second = stores
+    schedulers = [JobScheduler(workers=1, max_running=1, max_queued=5, store=store) for store in stores]
+    release, started = threading.Event(), []
+
+    first.create("a")
+    schedulers[0].submit("a", _job(first, "a", release, started))
+    _wait_for(lambda: started == ["a"])
+
+    second.create("b")
+    schedulers[1].submit("b", _job(second, "b", release, started))
+    time.sleep(0.3)
+    # The other process's job holds the only slot
+    assert started == ["a"]
+    assert second.get("b")["status"] == "pending"
+
+    release.set()
+    # Picked up by the poller once the slot is free
+    _wait_for(lambda: started == ["a", "b"])
+
+
+def test_admission_counts_jobs_queued_in_other_processes(stores):
+    first, second = stores
+    schedulers = [JobScheduler(workers=1, max_running=1, max_queued=1, store=store) for store in stores]
+    release, started = threading.Event(), []
+    try:
+        first.create("a")
+        schedulers[0].submit("a", _job(first, "a", release, started))
+        _wait_for(lambda: started == ["a"])
+        first.create("b")
+        schedulers[0].submit("b", _job(first, "b", release, started))
+
+        # The second process has nothing of its own, but the host is full
+        assert schedulers[1].is_full()
+        second.create("c")
+        with pytest.raises(JobQueueFull):
+            schedulers[1].submit("c", _job(second, "c", release, started))
+        second.update("c", status="error")    # as /api/scrape does
+    finally:
+        release.set()
+    _wait_for(lambda: first.active_jobs() == {"pending": [], "running": []})
+
+
+def test_job_left_running_releases_its_slot(stores):
+    first, _ = stores
+    scheduler = JobScheduler(workers=1, max_running=1, max_queued=5, store=first)
+    first.create("a")
+    # Returns without recording a final state
+    scheduler.submit("a", lambda: None)
+    _wait_for(lambda: first.get("a")["status"] == "error")
+    assert first.active_jobs()["running"] == []
+
+
+def test_browsers_are_counted_across_processes(stores):
+    first, second = stores
+    assert first.reserve_browser(2)
+    assert second.reserve_browser(2)
+    assert not first.reserve_browser(2)
+    second.release_browser()
+    assert first.reserve_browser(2)
+
+
+def test_browsers_of_a_closed_process_are_not_counted(stores):
+    first, second = stores
+    gone = SQLiteJobStore(first.path)
+    assert gone.reserve_browser(1)
+    assert not first.reserve_browser(1)
+    gone.close()
+    assert first.reserve_browser(1)
@@ -0,0 +1,105 @@
+"""
+Job ownership: a process only takes over jobs whose owner stopped
+heartbeating, and two processes never both claim the same job.
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import config
+from utils.job_store import MemoryJobStore, SQLiteJobStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "jobs.sqlite3")
+
+
+def test_own_and_live_owners_jobs_are_not_claimed(path):
+    first = SQLiteJobStore(path)
+    second = SQLiteJobStore(path)
+    try:
+        first.create("job-1", status="running")
+        assert not first.claim("job-1")
+        assert not second.claim("job-1")
+    finally:
+        first.close()
+        second.close()
+
+
+def test_jobs_of_a_closed_store_are_taken_over(path):
+    first = SQLiteJobStore(path)
+    first.create("job-1", status="running")
+    first.close()
+
+    second = SQLiteJobStore(path)
+    try:
+        assert second.claim("job-1")
+        # Now it is second's job
+        assert not second.claim("job-1")
+        assert second.get("job-1")["status"] == "running"
+    finally:
+        second.close()
+
+
+def test_owner_is_dead_once_its_heartbeat_expires(path, monkeypatch):
+    monkeypatch.setattr(config, "JOB_OWNER_HEARTBEAT_SECONDS", 60)
+    crashed = SQLiteJobStore(path, lease_seconds=0.3)
+    crashed.create("job-1", status="running")
+    crashed._closed.set()    # heartbeat stops, as if the process was killed
+
+    other = SQLiteJobStore(path, lease_seconds=0.3)
+    try:
+        assert not other.claim("job-1")
+        time.sleep(0.4)
+        assert other.claim("job-1")
+    finally:
+        other.close()
+
+
+def test_heartbeat_keeps_a_long_running_owner_alive(path, monkeypatch):
+    monkeypatch.setattr(config, "JOB_OWNER_HEARTBEAT_SECONDS", 0.05)
+    owner = SQLiteJobStore(path, lease_seconds=0.3)
+    other = SQLiteJobStore(path, lease_seconds=0.3)
+    try:
+        owner.create("job-1", status="running")
+        time.sleep(0.6)
+        assert not other.claim("job-1")
+    finally:
+        owner.close()
+        other.close()
+
+
+def test_unknown_job_is_claimed_exactly_once(path):
+    stores = [SQLiteJobStore(path) for _ in range(4)]
+    claims = []
+    start = threading.Barrier(len(stores))
+
+    def claim(store):
+        start.wait()
+        claims.append(store.claim("job-1"))
+
+    threads = [threading.Thread(target=claim, args=(store,)) for store in stores]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(claims) == [False, False, False, True]
+        assert stores[0].get("job-1")["status"] == "pending"
+    finally:
+        for store in stores:
+            store.close()
+
+
+def test_memory_store_claims_only_unknown_jobs():
+    store = MemoryJobStore()
+    store.create("job-1")
+    assert not store.claim("job-1")
+    assert store.claim("job-2")
+    assert not store.claim("job-2")
@@ -0,0 +1,68 @@
+"""
+The per-site budget is one budget, whichever thread or API process draws
+from it.
+"""
+import multiprocessing
+import os
+import sys
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import config
+from utils.rate_limiter import RateLimiter
+
+URL = "https://www.hottoner.com.au/index.php?route=product/search&search=TN2450"
+
+
+def _reserve_many(path, count, delays):
+    limiter = RateLimiter(rate_limits={"www.hottoner.com.au": 10.0}, burst=1, path=path)
+    delays.extend([limiter.reserve(URL) for _ in range(count)])
+
+
+def test_burst_then_waits_at_the_rate(tmp_path):
+    limiter = RateLimiter(rate_limits={"www.hottoner.com.au": 10.0}, burst=3,
+                          path=str(tmp_path / "rates.sqlite3"))
+    delays = [limiter.reserve(URL) for _ in range(5)]
+    assert delays[:3] == [0.0, 0.0, 0.0]
+    # The bucket refills while the test runs, so waits can only be shorter
+    assert 0.05 < delays[3] <= 0.1
+    assert 0.15 < delays[4] <= 0.2
+
+
+def test_unlimited_hosts_never_wait(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "DEFAULT_RATE_LIMIT", None)
+    limiter = RateLimiter(rate_limits={}, path=str(tmp_path / "rates.sqlite3"))
+    assert [limiter.reserve("http://127.0.0.1/") for _ in range(10)] == [0.0] * 10
+    assert not (tmp_path / "rates.sqlite3").exists()
+
+
+def test_threads_share_one_budget(tmp_path):
+    path = str(tmp_path / "rates.sqlite3")
+    delays = []
+    threads = [threading.Thread(target=_reserve_many, args=(path, 10, delays)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 20 requests at 10/s with no burst: the last one waits about 1.9s
+    assert max(delays) >= 1.7
+
+
+def test_processes_share_one_budget(tmp_path):
+    path = str(tmp_path / "rates.sqlite3")
+    context = multiprocessing.get_context("spawn")
+    with context.Manager() as manager:
+        delays = manager.list()
+        processes = [context.Process(target=_reserve_many, args=(path, 10, delays)) for _ in range(2)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(timeout=60)
+            assert process.exitcode == 0
+        delays = list(delays)
+    assert len(delays) == 20
+    # Separate per-process budgets would let each process wait at most ~0.9s
+    assert max(delays) >= 1.7
@@ -0,0 +1,73 @@
+"""
+Single-flight lookups: followers get the leader's outcome, and a leader
+that gives up frees the key instead of leaving followers waiting.
+"""
+import os
+import sys
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from utils.single_flight import SingleFlight, flight_key
+
+
+def test_followers_get_the_leaders_result():
+    flights = SingleFlight()
+    key = flight_key("HotToner", "tn-2450")
+
+    leader, future = flights.claim(key)
+    assert leader
+    follower, shared = flights.claim(flight_key("HotToner", " TN-2450 "))
+    assert not follower
+    assert shared is future
+
+    flights.resolve(key, {"Price": "$1.00"})
+    assert shared.result(timeout=1) == {"Price": "$1.00"}
+    assert flights.metrics() == {'led': 1, 'coalesced': 1, 'in_flight': 0}
+
+
+def test_leader_failure_reaches_followers_and_frees_the_key():
+    flights = SingleFlight()
+    key = flight_key("InkStation", "TN2450")
+    flights.claim(key)
+    _, shared = flights.claim(key)
+
+    waited = []
+
+    def follow():
+        try:
+            shared.result(timeout=5)
+        except RuntimeError as e:
+            waited.append(str(e))
+
+    follower = threading.Thread(target=follow)
+    follower.start()
+    flights.fail(key, RuntimeError("lookup abandoned"))
+    follower.join(timeout=5)
+
+    assert waited == ["lookup abandoned"]
+    # The next job leads a fresh lookup instead of joining the failed one
+    leader, future = flights.claim(key)
+    assert leader
+    assert future is not shared
+
+
+def test_a_follower_cannot_cancel_the_shared_lookup():
+    flights = SingleFlight()
+    key = flight_key("HotToner", "CE285A")
+    flights.claim(key)
+    _, first = flights.claim(key)
+    _, second = flights.claim(key)
+
+    assert not first.cancel()
+    flights.resolve(key, {"Price": "$2.00"})
+    assert second.result(timeout=1) == {"Price": "$2.00"}
+
+
+def test_resolving_an_unclaimed_key_is_ignored():
+    flights = SingleFlight()
+    flights.resolve(flight_key("HotToner", "X"), None)
+    flights.fail(flight_key("HotToner", "X"), RuntimeError("gone"))
+    assert flights.metrics()['in_flight'] == 0
@@ -0,0 +1,360 @@
+"""
+Asyncio fetch engine for the HTTP scrapers.
+Keeps many requests in flight at once while capping concurrency per host,
+and hands pages back as soon as each one completes.
+"""
+import asyncio
+import queue
+import random
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import urlparse
+
+import aiohttp
+
+import config
+from utils.request_utils import get_headers
+from utils.rate_limiter import get_rate_limiter
+from utils.http_cache import conditional_headers, has_stored_copy, store_page
+from utils.html_stream import should_drain
+from utils.metrics import FETCH_SECONDS, WAIT_SECONDS, record_response, site_for
+from utils.job_trace import span_since
+
+
+# Outcome of a single fetch. `text` is only set for HTTP 200, `error` only
+# when the final attempt raised instead of returning a response. Status 304
+# means the page is unchanged since the copy in utils.http_cache. `record`
+# is set when the page was streamed and extracted while it was read; `text`
+# is then only the part of the page that was read. `timings` holds the
+# rate-limit waits and downloads of every attempt (utils.job_trace.Span).
+FetchResult = namedtuple("FetchResult", ["key", "url", "status", "text", "error", "record", "timings"],
+                         defaults=(None, ()))
+
+
+class AsyncFetcher:
+    """Fetch many URLs concurrently with a per-host politeness cap"""
+
+    def __init__(self, max_in_flight=None, host_limits=None, default_host_limit=None,
+                 timeout=None, max_retries=None, rate_limiter=None):
+        """
+        Initialize the fetcher
+
+        Args:
+            max_in_flight (int): Maximum requests in flight across all hosts
+            host_limits (dict): Maximum concurrent requests per host name
+            default_host_limit (int): Limit for hosts not in host_limits
+            timeout (int): Per-request timeout in seconds
+            max_retries (int): Maximum attempts per URL
+            rate_limiter (RateLimiter): Per-site budget (the shared one if None)
+        """
+        self.max_in_flight = max_in_flight or config.ASYNC_MAX_IN_FLIGHT
+        self.host_limits = host_limits if host_limits is not None else config.HOST_CONCURRENCY
+        self.default_host_limit = default_host_limit or config.DEFAULT_HOST_CONCURRENCY
+        self.timeout = timeout or config.REQUEST_TIMEOUT
+        self.max_retries = max_retries or config.MAX_RETRIES
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self._host_semaphores = {}
+        self._runs = set()    # stop() callables of the running iter_fetch calls
+        self._runs_lock = threading.Lock()
+        # Connection reuse counters, accumulated over every fetch_all run
+        self.stats = {'requests': 0, 'new_connections': 0, 'reused_connections': 0,
+                      'bytes_read': 0, 'stopped_early': 0}
+
+    def _trace_config(self):
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            self.stats['requests'] += 1
+
+        async def on_connection_create_end(session, context, params):
+            self.stats['new_connections'] += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.stats['reused_connections'] += 1
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    def _semaphore_for(self, url):
+        host = urlparse(url).netloc
+        if host not in self._host_semaphores:
+            limit = self.host_limits.get(host, self.default_host_limit)
+            self._host_semaphores[host] = asyncio.Semaphore(limit)
+        return self._host_semaphores[host]
+
+    async def _read_streamed(self, response, extractor):
+        """
+        Feed the body into a StreamExtractor, stopping once it has what it
+        needs. The rest is drained if short (keeps the connection alive)
+        or the connection is closed.
+        """
+        async for chunk in response.content.iter_chunked(config.HTML_STREAM_CHUNK_SIZE):
+            if extractor.feed(chunk):
+                break
+        self.stats['bytes_read'] += extractor.bytes_read
+
+        if extractor.done:
+            self.stats['stopped_early'] += 1
+            # Content-Length counts compressed bytes, bytes_read does not
+            wire_bytes = None if response.headers.get('Content-Encoding') else extractor.bytes_read
+            if should_drain(response.headers.get('Content-Length'), wire_bytes):
+                rest = await response.content.read()
+                self.stats['bytes_read'] += len(rest)
+            else:
+                response.close()
+
+        # The chunks were parsed on the loop as they arrived (that is what
+        # decides when to stop reading); finishing the tree and extracting
+        # the record runs on a helper thread so it does not stall the loop
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self._extract_streamed, extractor, str(response.url)
+        )
+
+    @staticmethod
+    def _extract_streamed(extractor, url):
+        try:
+            return extractor.record()
+        except Exception as e:
+            print(f"⚠️  Streamed extraction failed for {url}: {e}")
+            return None
+
+    async def _fetch_one(self, session, key, url, headers=None, stream=None, conditional=True):
+        semaphore = self._semaphore_for(url)
+        status = None
+        error = None
+        refetch = False
+        request_headers = dict(headers or get_headers())
+        if conditional:
+            request_headers.update(conditional_headers(url))
+
+        site = site_for(url)
+        spans = []
+        for attempt in range(self.max_retries):
+            try:
+                slot_started = time.perf_counter()
+                async with semaphore:
+                    # Reserve inside the host slot so waiting tasks never
+                    # hold more of the shared budget than they can use
+                    WAIT_SECONDS.observe(time.perf_counter() - slot_started, site=site, reason="host_slot")
+                    wait_started = time.time()
+                    waited = await self.rate_limiter.wait_async(url)
+                    WAIT_SECONDS.observe(waited, site=site, reason="rate_limit")
+                    if waited:
+                        spans.append(span_since("rate_limit_wait", wait_started))
+                    fetch_started = time.time()
+                    async with session.get(url, headers=request_headers,
+                                           allow_redirects=True) as response:
+                        status = response.status
+                        error = None
+                        record_response(url, status)
+                        if status == 200:
+                            extractor = stream(response.charset) if stream else None
+                            if extractor is not None:
+                                record = await self._read_streamed(response, extractor)
+                                spans.append(span_since("fetch", fetch_started))
+                                FETCH_SECONDS.observe(spans[-1].seconds, site=site, via="http")
+                                text = extractor.text()
+                                # Only a page read to the end is stored whole
+                                store_page(url, response.headers, None if extractor.done else text, record)
+                                return FetchResult(key, url, status, text, None, record, spans)
+
+                            body = await response.read()
+                            spans.append(span_since("fetch", fetch_started))
+                            FETCH_SECONDS.observe(spans[-1].seconds, site=site, via="http")
+                            self.stats['bytes_read'] += len(body)
+                            text = await response.text(errors="replace")
+                            store_page(url, response.headers, text)
+                            return FetchResult(key, url, status, text, None, None, spans)
+                        spans.append(span_since("fetch", fetch_started))
+                        if status == 304:
+                            if has_stored_copy(url):
+                                return FetchResult(key, url, status, None, None, None, spans)
+                            # The stored copy went away after the validators were sent
+                            refetch = True
+                            break
+                        if status == 404:
+                            # Product not found - don't retry
+                            return FetchResult(key, url, status, None, None, None, spans)
+
+                if status == 429:
+                    # Too many requests - back off outside the host slot
+                    wait_time = (attempt + 1) * 5
+                    print(f"⚠️  Rate limited on {urlparse(url).netloc}. Waiting {wait_time}s before retry...")
+                    await asyncio.sleep(wait_time)
+                    continue
+                print(f"⚠️  HTTP {status} for {url}")
+
+            except asyncio.TimeoutError as e:
+                error = e
+                print(f"⏱️  Timeout on attempt {attempt + 1}/{self.max_retries} for {url}")
+            except aiohttp.ClientError as e:
+                error = e
+                print(f"🔌 Connection error on attempt {attempt + 1}/{self.max_retries} for {url}")
+
+            # Wait before retry (except on last attempt)
+            if attempt < self.max_retries - 1:
+                await asyncio.sleep(random.uniform(2, 4))
+
+        if refetch:
+            # Ask for the whole page; the slot was released on the way out
+            fetched = await self._fetch_one(session, key, url, headers, stream, conditional=False)
+            return fetched._replace(timings=spans + list(fetched.timings))
+        return FetchResult(key, url, status, None, error, None, spans)
+
+    async def fetch_all(self, items):
+        """
+        Fetch every item, yielding results in completion order
+
+        Items are pulled lazily (on a helper thread, so a slow producer such
+        as a file being read does not block the loop), and at most
+        max_in_flight of them are pending at once.
+
+        Args:
+            items (iterable): (key, url, headers, stream) tuples; headers and
+                stream may be None. stream(charset) returns a StreamExtractor
+                (or None) so the page is extracted while it is read.
+
+        Yields:
+            FetchResult: One result per item, as soon as it completes
+        """
+        # Semaphores are bound to the running loop, so start fresh per run
+        self._host_semaphores = {}
+        connector = aiohttp.TCPConnector(limit=self.max_in_flight, ttl_dns_cache=300)
+        client_timeout = aiohttp.ClientTimeout(total=self.timeout)
+
+        loop = asyncio.get_running_loop()
+        iterator = iter(items)
+        exhausted = object()
+        finished = object()
+        completed = asyncio.Queue()
+        slots = asyncio.Semaphore(self.max_in_flight)
+        tasks = set()
+        producer_error = []
+
+        async with aiohttp.ClientSession(connector=connector, timeout=client_timeout,
+                                         trace_configs=[self._trace_config()]) as session:
+
+            async def run(key, url, headers, stream):
+                try:
+                    result = await self._fetch_one(session, key, url, headers, stream)
+                except Exception as e:
+                    result = FetchResult(key, url, None, None, e)
+                completed.put_nowait(result)
+                slots.release()
+
+            async def produce():
+                try:
+                    while True:
+                        await slots.acquire()
+                        item = await loop.run_in_executor(None, next, iterator, exhausted)
+                        if item is exhausted:
+                            break
+                        task = asyncio.ensure_future(run(*item))
+                        tasks.add(task)
+                        task.add_done_callback(tasks.discard)
+                    if tasks:
+                        await asyncio.wait(set(tasks))
+                except Exception as e:
+                    producer_error.append(e)
+                finally:
+                    completed.put_nowait(finished)
+
+            producer = asyncio.ensure_future(produce())
+            try:
+                while True:
+                    result = await completed.get()
+                    if result is finished:
+                        break
+                    yield result
+            finally:
+                producer.cancel()
+                for task in list(tasks):
+                    task.cancel()
+
+        if producer_error:
+            raise producer_error[0]
+
+    def iter_fetch(self, items, idle=None):
+        """
+        Blocking wrapper around fetch_all for use from regular threads.
+        The event loop runs on a background thread so callers can parse
+        each page while the remaining requests are still in flight.
+
+        Closing the generator (or calling close()) stops the run: no more
+        items are pulled and the requests in flight are cancelled. An item
+        the helper thread was already pulling is dropped.
+
+        Args:
+            items (iterable): (key, url, headers, stream) tuples
+            idle (float): If set, yield None whenever no result arrived
+                for this many seconds (so the caller can do other work)
+
+        Yields:
+            FetchResult or None: One result per item, in completion order
+        """
+        results = queue.Queue()
+        done = object()
+        stopped = threading.Event()
+        running = {}    # 'loop' and 'task' of the pump, once it started
+
+        async def pump():
+            running['loop'] = asyncio.get_running_loop()
+            running['task'] = asyncio.current_task()
+            if stopped.is_set():
+                return
+            async for result in self.fetch_all(items):
+                results.put(result)
+
+        def run_loop():
+            try:
+                asyncio.run(pump())
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                print(f"❌ Async fetch engine error: {e}")
+            finally:
+                results.put(done)
+
+        def stop():
+            if stopped.is_set():
+                return
+            stopped.set()
+            # pump() checks `stopped` after publishing its task, so either
+            # it sees the flag or the task is cancelled here
+            if 'task' in running:
+                try:
+                    running['loop'].call_soon_threadsafe(running['task'].cancel)
+                except RuntimeError:
+                    pass    # The loop already finished
+
+        with self._runs_lock:
+            self._runs.add(stop)
+        threading.Thread(target=run_loop, daemon=True).start()
+
+        try:
+            while not stopped.is_set():
+                try:
+                    result = results.get(timeout=idle)
+                except queue.Empty:
+                    yield None
+                    continue
+                if result is done:
+                    return
+                yield result
+        finally:
+            stop()
+            with self._runs_lock:
+                self._runs.discard(stop)
+
+    def close(self):
+        """
+        Stop every iter_fetch run of this fetcher: nothing more is pulled
+        from their items and their requests in flight are cancelled.
+        """
+        with self._runs_lock:
+            runs = list(self._runs)
+        for stop in runs:
+            stop()
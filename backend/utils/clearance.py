@@ -0,0 +1,114 @@
+"""
+Cloudflare clearance shared between the browser and plain HTTP scrapers.
+
+Once a browser has passed the Cloudflare check, its cookies and user agent
+are saved here so requests sessions can reuse them. The store is kept on
+disk, so a restart does not need a new manual solve while the cookies are
+still valid.
+"""
+import json
+import os
+import threading
+import time
+
+import config
+
+
+_clearances = None
+_lock = threading.Lock()
+
+
+def _load_all():
+    global _clearances
+    if _clearances is None:
+        try:
+            with open(config.CLEARANCE_FILE, 'r', encoding='utf-8') as f:
+                _clearances = json.load(f)
+        except (OSError, ValueError):
+            _clearances = {}
+    return _clearances
+
+
+def _write_all(clearances):
+    directory = os.path.dirname(config.CLEARANCE_FILE)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = config.CLEARANCE_FILE + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(clearances, f)
+    os.replace(tmp_path, config.CLEARANCE_FILE)
+
+
+def save_clearance(host, cookies, user_agent):
+    """
+    Store the cookies and user agent of a cleared browser session.
+
+    Args:
+        host (str): Host the clearance is for (e.g. www.inkstation.com.au)
+        cookies (list): Cookie dicts as returned by driver.get_cookies()
+        user_agent (str): Browser user agent (Cloudflare ties clearance to it)
+    """
+    with _lock:
+        clearances = _load_all()
+        clearances[host] = {
+            'cookies': cookies,
+            'user_agent': user_agent,
+            'saved_at': time.time(),
+        }
+        _write_all(clearances)
+
+
+def load_clearance(host):
+    """
+    Get the stored clearance for a host if its cookies have not expired.
+
+    Args:
+        host (str): Host name
+
+    Returns:
+        dict or None: {'cookies', 'user_agent', 'saved_at'} or None
+    """
+    with _lock:
+        clearance = _load_all().get(host)
+    if not clearance:
+        return None
+
+    now = time.time()
+    for cookie in clearance['cookies']:
+        if cookie.get('name') == 'cf_clearance' and cookie.get('expiry') and cookie['expiry'] < now:
+            return None
+    return clearance
+
+
+def discard_clearance(host):
+    """
+    Forget a host's clearance (e.g. after a challenge page came back).
+
+    Args:
+        host (str): Host name
+    """
+    with _lock:
+        clearances = _load_all()
+        if clearances.pop(host, None) is not None:
+            _write_all(clearances)
+
+
+def apply_clearance(session, clearance):
+    """
+    Copy clearance cookies into a requests session.
+
+    Args:
+        session (requests.Session): Session to update
+        clearance (dict): Value returned by load_clearance
+
+    Returns:
+        dict: Header overrides (the browser's User-Agent) to send with requests
+    """
+    for cookie in clearance['cookies']:
+        session.cookies.set(
+            cookie['name'],
+            cookie['value'],
+            domain=cookie.get('domain'),
+            path=cookie.get('path', '/'),
+        )
+    return {'User-Agent': clearance['user_agent']}
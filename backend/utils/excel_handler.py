@@ -1,42 +1,255 @@
 """
 Excel handling utilities for reading OEM codes and writing results.
 """
+import csv
+import io
+import json
 import pandas as pd
 import os
+import shutil
+import sys
+import tempfile
 
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-def read_oem_codes(filepath):
+import config
+
+
+# Extensions iter_oem_codes can read
+SUPPORTED_EXTENSIONS = {'xlsx', 'xls', 'csv'}
+
+OEM_CODE_COLUMN = 'OEM_CODE'
+
+
+def _column_index(header, name):
+    """Position of the OEM_CODE column in a header row"""
+    for index, column in enumerate(header or []):
+        if isinstance(column, str) and column.strip() == OEM_CODE_COLUMN:
+            return index
+    raise ValueError(f"{name} must contain an 'OEM_CODE' column")
+
+
+def _xlsx_rows(source):
+    # read_only streams rows from the zip instead of building every cell
+    from openpyxl import load_workbook
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        yield from workbook.worksheets[0].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _xls_rows(source):
+    try:
+        import xlrd
+    except ImportError:
+        raise ValueError("Reading .xls files needs the xlrd package (see requirements.txt)")
+    spooled = None
+    if not isinstance(source, str):
+        # xlrd needs the whole workbook: copy the upload to disk in chunks
+        # so xlrd can map the file instead of holding a copy in memory
+        with tempfile.NamedTemporaryFile(suffix='.xls', delete=False) as spooled:
+            shutil.copyfileobj(source, spooled, 1024 * 1024)
+        source = spooled.name
+    try:
+        workbook = xlrd.open_workbook(source, on_demand=True)
+        try:
+            sheet = workbook.sheet_by_index(0)
+            for row in range(sheet.nrows):
+                yield [None if cell.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK) else cell.value
+                       for cell in sheet.row(row)]
+        finally:
+            workbook.release_resources()
+    finally:
+        if spooled is not None:
+            os.remove(spooled.name)
+
+
+def _csv_rows(source):
+    if isinstance(source, str):
+        with open(source, 'r', encoding='utf-8-sig', newline='') as f:
+            for row in csv.reader(f):
+                yield [value if value != '' else None for value in row]
+    else:
+        text = io.TextIOWrapper(source, encoding='utf-8-sig', newline='')
+        try:
+            for row in csv.reader(text):
+                yield [value if value != '' else None for value in row]
+        finally:
+            text.detach()
+
+
+def iter_oem_codes(source, filename=None):
     """
-    Read OEM codes from an Excel file.
+    Stream OEM codes from an .xlsx, .xls or .csv file, row by row.
+    
+    Codes are yielded as soon as their row is read, skipping empty cells
+    and codes already seen, so scraping can start while the rest of the
+    file is still being read.
     
     Args:
-        filepath (str): Path to the Excel file containing OEM codes
+        source (str or file): Path, or a binary file object such as an
+            upload stream (must be seekable for .xlsx)
+        filename (str): Name used to pick the format (defaults to the path)
         
-    Returns:
-        list: List of OEM codes
+    Yields:
+        OEM codes in file order, without duplicates
         
     Raises:
         FileNotFoundError: If the input file doesn't exist
-        ValueError: If the Excel file doesn't have an 'OEM_CODE' column
+        ValueError: If the format is unsupported, the file can't be read or
+            it has no 'OEM_CODE' column
     """
-    if not os.path.exists(filepath):
-        raise FileNotFoundError(f"Input file not found: {filepath}")
+    name = filename or (source if isinstance(source, str) else getattr(source, 'name', ''))
+    extension = str(name).rsplit('.', 1)[-1].lower() if '.' in str(name) else ''
+    if extension not in SUPPORTED_EXTENSIONS:
+        raise ValueError(f"Unsupported file type: {name}")
+    
+    if isinstance(source, str) and not os.path.exists(source):
+        raise FileNotFoundError(f"Input file not found: {source}")
+    
+    readers = {'xlsx': _xlsx_rows, 'xls': _xls_rows, 'csv': _csv_rows}
+    rows = readers[extension](source)
     
     try:
-        df = pd.read_excel(filepath)
+        column = _column_index(next(rows, None), name)
+        seen = set()
+        for row in rows:
+            if column >= len(row):
+                continue
+            code = row[column]
+            if code is None or code in seen:
+                continue
+            seen.add(code)
+            yield code
+    except ValueError:
+        raise
     except Exception as e:
-        raise ValueError(f"Error reading Excel file: {e}")
-    
-    if 'OEM_CODE' not in df.columns:
-        raise ValueError("Excel file must contain an 'OEM_CODE' column")
+        raise ValueError(f"Error reading {name}: {e}")
+    finally:
+        rows.close()
+
+
+def read_oem_codes(filepath):
+    """
+    Read OEM codes from an .xlsx, .xls or .csv file.
     
-    # Remove duplicates and NaN values
-    oem_codes = df['OEM_CODE'].dropna().unique().tolist()
+    Args:
+        filepath (str): Path to the file containing OEM codes
+        
+    Returns:
+        list: List of OEM codes
+        
+    Raises:
+        FileNotFoundError: If the input file doesn't exist
+        ValueError: If the file doesn't have an 'OEM_CODE' column
+    """
+    oem_codes = list(iter_oem_codes(filepath))
     
     print(f"📋 Loaded {len(oem_codes)} unique OEM codes from {filepath}")
     return oem_codes
 
 
+class ResultWriter:
+    """
+    Writes result rows to disk as they arrive, in constant memory.
+    
+    The workbook is built in openpyxl's write-only mode, which streams rows
+    to a temporary file instead of keeping cells in memory; it becomes a
+    valid .xlsx when the writer is closed. Optional CSV/JSONL side outputs
+    are flushed every `flush_every` rows, so a crashed job still leaves
+    everything written up to the last flush on disk.
+    """
+    
+    def __init__(self, output_file, columns, side_outputs=None, flush_every=None):
+        """
+        Args:
+            output_file (str): Path of the .xlsx to write
+            columns (list): Column names, in order
+            side_outputs (list): Extra formats to write next to the
+                workbook: 'csv' and/or 'jsonl' (config.RESULT_SIDE_OUTPUTS if None)
+            flush_every (int): Rows between flushes to disk
+        """
+        from openpyxl import Workbook
+        
+        self.output_file = output_file
+        self.columns = list(columns)
+        self.flush_every = flush_every or config.RESULT_FLUSH_EVERY
+        self.rows_written = 0
+        self.closed = False
+        
+        output_dir = os.path.dirname(output_file)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet('Sheet1')
+        self._sheet.append(self.columns)
+        
+        if side_outputs is None:
+            side_outputs = config.RESULT_SIDE_OUTPUTS
+        base = os.path.splitext(output_file)[0]
+        self.side_files = {}
+        self._handles = []
+        self._csv = None
+        self._jsonl = None
+        for kind in side_outputs:
+            if kind not in ('csv', 'jsonl'):
+                raise ValueError(f"Unsupported result output: {kind}")
+            path = f"{base}.{kind}"
+            self.side_files[kind] = path
+            if kind == 'csv':
+                handle = open(path, 'w', encoding='utf-8', newline='')
+                self._csv = csv.writer(handle)
+                self._csv.writerow(self.columns)
+            else:
+                handle = self._jsonl = open(path, 'w', encoding='utf-8')
+            self._handles.append(handle)
+    
+    def write(self, row):
+        """
+        Append one result row.
+        
+        Args:
+            row (dict): Column -> value (missing columns are left empty)
+        """
+        values = [row.get(column) for column in self.columns]
+        self._sheet.append(values)
+        if self._csv:
+            self._csv.writerow(values)
+        if self._jsonl:
+            self._jsonl.write(json.dumps(row, default=str) + "\n")
+        self.rows_written += 1
+        if self.rows_written % self.flush_every == 0:
+            self.flush()
+    
+    def flush(self):
+        """Push buffered side-output rows to disk"""
+        for f in self._handles:
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def close(self):
+        """Finish the workbook and close the side outputs"""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._workbook.save(self.output_file)
+        finally:
+            self.flush()
+            for f in self._handles:
+                f.close()
+        print(f"✅ Results saved to {self.output_file} ({self.rows_written} rows)")
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
 def save_results(results, output_file):
     """
     Save scraping results to an Excel file.
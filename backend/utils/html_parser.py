@@ -0,0 +1,151 @@
+"""
+HTML parser backends for the scrapers.
+
+Each site's extraction can run on lxml (C parser + precompiled XPath) or on
+BeautifulSoup with the pure-Python html.parser. lxml is used when
+config.HTML_PARSER_BACKEND is "lxml" and it is installed; otherwise the
+scrapers fall back to BeautifulSoup.
+"""
+from functools import lru_cache
+
+from bs4 import BeautifulSoup
+
+import config
+
+try:
+    import lxml.html
+    from lxml import etree
+    HAVE_LXML = True
+except ImportError:
+    HAVE_LXML = False
+
+
+def parser_backend(site=None):
+    """
+    Backend to use for a site.
+
+    Args:
+        site (str): Website name (per-site overrides in HTML_PARSER_BACKENDS)
+
+    Returns:
+        str: "lxml" or "beautifulsoup"
+    """
+    backend = config.HTML_PARSER_BACKENDS.get(site, config.HTML_PARSER_BACKEND)
+    if backend == "lxml" and not HAVE_LXML:
+        return "beautifulsoup"
+    return backend
+
+
+def make_soup(html, site=None):
+    """
+    Build a BeautifulSoup tree, using lxml's C tokenizer when it is the
+    selected backend (for extraction code that still needs the bs4 API).
+
+    Args:
+        html (str): Page HTML
+        site (str): Website name
+
+    Returns:
+        BeautifulSoup: Parsed tree
+    """
+    builder = "lxml" if parser_backend(site) == "lxml" else "html.parser"
+    return BeautifulSoup(html, builder)
+
+
+def parse_document(html):
+    """
+    Parse a page with lxml.
+
+    Args:
+        html (str): Page HTML
+
+    Returns:
+        lxml.html.HtmlElement: Document root
+    """
+    if not html or not html.strip():
+        html = "<html></html>"
+    try:
+        return lxml.html.document_fromstring(html)
+    except (etree.ParserError, ValueError):
+        # e.g. an XML declaration in a str, or a body lxml rejects
+        return lxml.html.document_fromstring(html.encode("utf-8", "replace"))
+
+
+@lru_cache(maxsize=None)
+def _compiled(expression):
+    return etree.XPath(expression)
+
+
+def select(node, expression):
+    """
+    Evaluate an XPath expression (compiled once and cached).
+
+    Args:
+        node: lxml element to evaluate against
+        expression (str): XPath expression
+
+    Returns:
+        list: Matching elements or text nodes
+    """
+    if node is None:
+        return []
+    return _compiled(expression)(node)
+
+
+def select_first(node, expression):
+    """First match of select(), or None"""
+    matches = select(node, expression)
+    return matches[0] if matches else None
+
+
+def has_class(name):
+    """XPath predicate: class attribute contains the token `name`"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def class_contains(fragment):
+    """XPath predicate: class attribute contains `fragment` (case-insensitive)"""
+    return (
+        "contains(translate(@class, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', "
+        f"'abcdefghijklmnopqrstuvwxyz'), '{fragment.lower()}')"
+    )
+
+
+def text_contains_ci(fragment):
+    """XPath predicate on a text node: contains `fragment` (case-insensitive)"""
+    return (
+        "contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', "
+        f"'abcdefghijklmnopqrstuvwxyz'), '{fragment.lower()}')"
+    )
+
+
+def element_text(element, default="N/A"):
+    """
+    lxml counterpart of request_utils.safe_extract_text.
+
+    Args:
+        element: lxml element or text node (may be None)
+        default (str): Value if there is no element
+
+    Returns:
+        str: Stripped text content
+    """
+    if element is None:
+        return default
+    try:
+        if isinstance(element, str):
+            return element.strip()
+        return element.text_content().strip()
+    except Exception:
+        return default
+
+
+def text_parent(text_node):
+    """
+    Element that contains a text node (what BeautifulSoup's find_parent()
+    returns). lxml attaches tail text to the preceding sibling instead.
+    """
+    parent = text_node.getparent()
+    if parent is not None and text_node.is_tail:
+        parent = parent.getparent()
+    return parent
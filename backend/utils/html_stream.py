@@ -0,0 +1,144 @@
+"""
+Early-terminating extraction for pages streamed off the socket.
+
+The response is fed chunk by chunk into lxml's event-based pull parser.
+As soon as the element holding the wanted fields has been closed, the
+caller can stop reading: the footer, scripts and remaining results are
+never downloaded or parsed.
+"""
+import re
+
+import config
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    etree = None
+
+
+class StreamExtractor:
+    """Incrementally parse a page until a target element is complete"""
+
+    def __init__(self, is_target, extract, encoding=None):
+        """
+        Args:
+            is_target (callable): is_target(element) -> True once the closed
+                element holds everything extract() needs
+            extract (callable): extract(document_root) -> record
+            encoding (str): Response charset (utf-8 if None)
+        """
+        self.is_target = is_target
+        self.extract = extract
+        self.encoding = encoding or "utf-8"
+        self.bytes_read = 0
+        self.done = False
+        self._chunks = []
+        self._parser = etree.HTMLPullParser(events=("end",), encoding=self.encoding)
+        # Same element classes as lxml.html, so extraction code can be shared
+        self._parser.set_element_class_lookup(lxml.html.HtmlElementClassLookup())
+        self._root = None
+
+    def feed(self, chunk):
+        """
+        Parse the next chunk of the body.
+
+        Args:
+            chunk (bytes): Raw response bytes
+
+        Returns:
+            bool: True once the target element is complete (stop reading)
+        """
+        if self.done or not chunk:
+            return self.done
+        self._chunks.append(chunk)
+        self.bytes_read += len(chunk)
+        self._parser.feed(chunk)
+        for _, element in self._parser.read_events():
+            if self.is_target(element):
+                self._root = element.getroottree().getroot()
+                self.done = True
+                break
+        return self.done
+
+    def record(self):
+        """
+        Extract the record from what has been read so far.
+
+        Returns:
+            dict: Product record
+        """
+        if self._root is None:
+            try:
+                self._root = self._parser.close()
+            except etree.XMLSyntaxError:
+                self._root = lxml.html.document_fromstring("<html></html>")
+        return self.extract(self._root)
+
+    def text(self):
+        """The part of the page that was read, decoded"""
+        return b"".join(self._chunks).decode(self.encoding, errors="replace")
+
+
+def streaming_enabled():
+    """True if pages may be streamed (needs lxml and the config switch)"""
+    return etree is not None and config.HTML_STREAMING
+
+
+def should_drain(content_length, bytes_read):
+    """
+    Decide whether to read the rest of a body we no longer need.
+
+    Draining a short remainder keeps the keep-alive connection reusable;
+    closing is cheaper when most of the page is still unread.
+
+    Args:
+        content_length (str or None): Content-Length response header
+        bytes_read (int or None): Bytes consumed off the wire so far
+            (None if unknown, e.g. a compressed body)
+
+    Returns:
+        bool: True to drain, False to close the connection
+    """
+    if not content_length or bytes_read is None:
+        return False
+    try:
+        remaining = int(content_length) - bytes_read
+    except ValueError:
+        return False
+    return remaining <= config.HTML_STREAM_DRAIN_BYTES
+
+
+def charset_from(content_type):
+    """
+    Charset named in a Content-Type header.
+
+    Args:
+        content_type (str or None): Content-Type response header
+
+    Returns:
+        str or None: Charset, or None if the header does not name one
+    """
+    match = re.search(r'charset=["\']?([\w.:-]+)', content_type or "", re.IGNORECASE)
+    return match.group(1) if match else None
+
+
+def feed_response(response, extractor):
+    """
+    Feed a requests response opened with stream=True into an extractor,
+    then drain or close the connection.
+
+    Args:
+        response (requests.Response): Streamed response
+        extractor (StreamExtractor): Extractor to feed
+    """
+    chunks = response.iter_content(config.HTML_STREAM_CHUNK_SIZE)
+    for chunk in chunks:
+        if extractor.feed(chunk):
+            break
+
+    if extractor.done and should_drain(response.headers.get('Content-Length'), response.raw.tell()):
+        for _ in chunks:
+            pass
+    # Closing a partly read response drops the connection instead of reusing it
+    response.close()
@@ -0,0 +1,266 @@
+"""
+Conditional-request HTTP cache for search pages.
+
+For every URL that came back with an ETag or Last-Modified header, the
+validators, the zlib-compressed body and the record extracted from it are
+stored in SQLite. The next fetch sends If-None-Match / If-Modified-Since;
+on a 304 the stored record is reused without downloading or parsing the page.
+
+Validators are only kept while they can answer a 304: with the complete
+body, or with the record when the page was only partly read (streamed).
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import config
+
+
+class HttpCache:
+    """SQLite-backed store of validators, bodies and extracted records per URL"""
+
+    def __init__(self, path=None, max_age=None):
+        """
+        Args:
+            path (str): SQLite file (config.HTTP_CACHE_FILE if None)
+            max_age (int): Seconds after which unused entries are dropped
+        """
+        self.path = path or config.HTTP_CACHE_FILE
+        self.max_age = max_age or config.HTTP_CACHE_MAX_AGE
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body BLOB,
+                record TEXT,
+                stored_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("DELETE FROM pages WHERE stored_at < ?", (time.time() - self.max_age,))
+        self._conn.commit()
+
+    def validators(self, url):
+        """
+        Conditional headers for a URL we have a stored copy of.
+
+        Args:
+            url (str): URL about to be requested
+
+        Returns:
+            dict: If-None-Match / If-Modified-Since headers (empty if none)
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified FROM pages "
+                "WHERE url = ? AND (body IS NOT NULL OR record IS NOT NULL)", (url,)
+            ).fetchone()
+        if row is None:
+            return {}
+        etag, last_modified = row
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def store_page(self, url, headers, body, record=None):
+        """
+        Store a 200 response if it carries validators.
+
+        A page that was not read to the end is only stored with the record
+        extracted from it; otherwise a later 304 would reparse a partial page.
+
+        Args:
+            url (str): Requested URL
+            headers (Mapping): Response headers
+            body (str or None): Complete response text, None if only part was read
+            record (dict): Record extracted from the page, if already known
+        """
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if record and record.get("Status") == "Error":
+            record = None
+        if (not etag and not last_modified) or (body is None and record is None):
+            with self._lock:
+                # Whatever was stored belongs to an older version of the page
+                self._conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+                self._conn.commit()
+            return
+
+        compressed = zlib.compress(body.encode('utf-8'), 6) if body is not None else None
+        with self._lock:
+            # A new body invalidates any record extracted from the old one
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, etag, last_modified, body, record, stored_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, compressed,
+                 json.dumps(record) if record else None, time.time())
+            )
+            self._conn.commit()
+
+    def has_copy(self, url):
+        """True if a 304 for this URL can be answered from the cache"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM pages WHERE url = ? AND (body IS NOT NULL OR record IS NOT NULL)", (url,)
+            ).fetchone()
+        return row is not None
+
+    def body(self, url):
+        """Stored page text for a URL, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    def record(self, url):
+        """Record previously extracted from the stored page, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE pages SET stored_at = ? WHERE url = ?", (time.time(), url))
+                self._conn.commit()
+        if row is None or row[0] is None:
+            return None
+        return json.loads(row[0])
+
+    def store_record(self, url, record):
+        """Remember the record extracted from a stored page (errors are skipped)"""
+        if not record or record.get("Status") == "Error":
+            return
+        with self._lock:
+            self._conn.execute(
+                "UPDATE pages SET record = ? WHERE url = ?", (json.dumps(record), url)
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_http_cache = None
+_http_cache_lock = threading.Lock()
+
+
+def get_http_cache():
+    """
+    Get the HTTP cache shared by this process, or None if disabled.
+
+    Returns:
+        HttpCache or None: Shared cache
+    """
+    global _http_cache
+    if not config.HTTP_CACHE_ENABLED:
+        return None
+    with _http_cache_lock:
+        if _http_cache is None:
+            _http_cache = HttpCache()
+        return _http_cache
+
+
+def conditional_headers(url):
+    """
+    Validators to send for a URL (empty when the cache is off or cold).
+
+    Args:
+        url (str): URL about to be requested
+
+    Returns:
+        dict: Extra request headers
+    """
+    cache = get_http_cache()
+    return cache.validators(url) if cache else {}
+
+
+def store_page(url, headers, body, record=None):
+    """Store a 200 response's validators, body and record if the cache is on"""
+    cache = get_http_cache()
+    if cache:
+        cache.store_page(url, headers, body, record)
+
+
+def has_stored_copy(url):
+    """
+    True if a 304 for a URL can be answered from the cache. A conditional
+    request that comes back 304 without one must be repeated without
+    validators.
+
+    Args:
+        url (str): Requested URL
+
+    Returns:
+        bool: True if a stored record or body exists
+    """
+    cache = get_http_cache()
+    return bool(cache and cache.has_copy(url))
+
+
+def store_record(url, record):
+    """Remember the record extracted from a stored page if the cache is on"""
+    cache = get_http_cache()
+    if cache:
+        cache.store_record(url, record)
+
+
+def cached_page(url, oem_code):
+    """
+    What the cache holds for a page that came back 304.
+
+    Args:
+        url (str): Requested URL
+        oem_code (str): Code the page was fetched for
+
+    Returns:
+        tuple: (record, None) if a record was extracted before,
+        otherwise (None, stored body or None)
+    """
+    cache = get_http_cache()
+    if not cache:
+        return None, None
+    record = cache.record(url)
+    if record:
+        record["OEM_CODE"] = oem_code
+        return record, None
+    return None, cache.body(url)
+
+
+def extract_record(url, oem_code, html, not_modified, parse):
+    """
+    Parse a page into a record, reusing the stored record on a 304.
+
+    Args:
+        url (str): Requested URL
+        oem_code (str): Code the page was fetched for
+        html (str or None): Response text (None on a 304)
+        not_modified (bool): True if the server answered 304
+        parse (callable): parse(html, oem_code, url) -> record
+
+    Returns:
+        dict: Product record
+    """
+    if not_modified:
+        record, html = cached_page(url, oem_code)
+        if record:
+            return record
+
+    result = parse(html or "", oem_code, url)
+    store_record(url, result)
+    return result
@@ -0,0 +1,265 @@
+"""
+Durable checkpoints for scraping jobs.
+
+Every code read from an upload, and every row as it finishes, is written
+to a local SQLite file keyed by job id. When the API restarts, jobs that
+were still running are picked up again: finished rows are replayed from
+the checkpoint and only the remaining codes are scraped.
+
+Writes are buffered (CHECKPOINT_FLUSH_EVERY / CHECKPOINT_FLUSH_SECONDS),
+so a crash loses at most the last few rows, which are simply redone.
+Finished jobs are compacted away on the job store's schedule
+(JOB_STORE_TTL / JOB_STORE_COMPACT_INTERVAL).
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import config
+
+
+class JobCheckpoints:
+    """SQLite-backed record of each job's codes and finished rows"""
+
+    def __init__(self, path=None, flush_every=None, flush_seconds=None):
+        """
+        Args:
+            path (str): SQLite file (config.CHECKPOINT_FILE if None)
+            flush_every (int): Writes buffered before they are committed
+            flush_seconds (float): Longest time writes stay buffered
+        """
+        self.path = path or config.CHECKPOINT_FILE
+        self.flush_every = flush_every or config.CHECKPOINT_FLUSH_EVERY
+        self.flush_seconds = flush_seconds or config.CHECKPOINT_FLUSH_SECONDS
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS checkpoint_jobs (
+                job_id TEXT PRIMARY KEY,
+                filename TEXT,
+                output_file TEXT NOT NULL,
+                email TEXT,
+                status TEXT NOT NULL,
+                input_complete INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS checkpoint_jobs_status ON checkpoint_jobs (status);
+            CREATE TABLE IF NOT EXISTS checkpoint_codes (
+                job_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                code TEXT NOT NULL,
+                row TEXT,
+                PRIMARY KEY (job_id, seq)
+            );
+            CREATE INDEX IF NOT EXISTS checkpoint_codes_code ON checkpoint_codes (job_id, code);
+        """)
+        self._conn.commit()
+
+        self._pending = []    # (sql, params) in the order they were made
+        self._last_flush = time.monotonic()
+        self._last_compact = time.monotonic()
+
+    def _queue(self, sql, params):
+        # Called with the lock held
+        self._pending.append((sql, params))
+        if (len(self._pending) >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_seconds):
+            self._flush_locked()
+
+    def flush(self):
+        """Commit buffered writes"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        try:
+            for sql, params in self._pending:
+                self._conn.execute(sql, params)
+            self._conn.commit()
+        except sqlite3.Error as e:
+            # A missed checkpoint only means more work on resume
+            print(f"⚠️  Could not save job checkpoint: {e}")
+        self._pending = []
+        self._last_flush = time.monotonic()
+
+    def start(self, job_id, filename, output_file, email):
+        """
+        Register a new job.
+
+        Args:
+            job_id (str): Job id
+            filename (str): Uploaded file name
+            output_file (str): Where the job writes its results
+            email (str): Where the results are sent
+        """
+        now = time.time()
+        with self._lock:
+            self._queue(
+                "INSERT OR REPLACE INTO checkpoint_jobs "
+                "(job_id, filename, output_file, email, status, input_complete, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 'running', 0, ?, ?)",
+                (job_id, filename, output_file, email, now, now)
+            )
+            self._flush_locked()
+        if time.monotonic() - self._last_compact >= config.JOB_STORE_COMPACT_INTERVAL:
+            self.compact()
+
+    def add_code(self, job_id, seq, code):
+        """
+        Record a code read from the upload.
+
+        Args:
+            job_id (str): Job id
+            seq (int): Position of the code in the upload
+            code: OEM code as read from the sheet
+        """
+        with self._lock:
+            self._queue(
+                "INSERT OR IGNORE INTO checkpoint_codes (job_id, seq, code) VALUES (?, ?, ?)",
+                (job_id, seq, json.dumps(code))
+            )
+
+    def input_read(self, job_id):
+        """Record that every code of the upload has been recorded"""
+        with self._lock:
+            self._queue(
+                "UPDATE checkpoint_jobs SET input_complete = 1, updated_at = ? WHERE job_id = ?",
+                (time.time(), job_id)
+            )
+            self._flush_locked()
+
+    def code_done(self, job_id, code, row):
+        """
+        Record a finished row.
+
+        Args:
+            job_id (str): Job id
+            code: OEM code as read from the sheet
+            row (dict): The code's result row
+        """
+        with self._lock:
+            self._queue(
+                "UPDATE checkpoint_codes SET row = ? WHERE job_id = ? AND code = ?",
+                (json.dumps(row), job_id, json.dumps(code))
+            )
+
+    def finish(self, job_id, status):
+        """
+        Mark a job finished so it is not resumed, and drop its rows.
+
+        Args:
+            job_id (str): Job id
+            status (str): 'completed' or 'error'
+        """
+        with self._lock:
+            self._queue(
+                "UPDATE checkpoint_jobs SET status = ?, updated_at = ? WHERE job_id = ?",
+                (status, time.time(), job_id)
+            )
+            self._queue("DELETE FROM checkpoint_codes WHERE job_id = ?", (job_id,))
+            self._flush_locked()
+
+    def compact(self, ttl=None):
+        """
+        Delete finished jobs not updated within the TTL (and any code rows
+        left behind).
+
+        Args:
+            ttl (float): Seconds (config.JOB_STORE_TTL if None)
+
+        Returns:
+            int: Jobs deleted
+        """
+        cutoff = time.time() - (ttl if ttl is not None else config.JOB_STORE_TTL)
+        with self._lock:
+            self._flush_locked()
+            try:
+                deleted = self._conn.execute(
+                    "DELETE FROM checkpoint_jobs WHERE status != 'running' AND updated_at < ?",
+                    (cutoff,)
+                ).rowcount
+                self._conn.execute(
+                    "DELETE FROM checkpoint_codes WHERE job_id NOT IN "
+                    "(SELECT job_id FROM checkpoint_jobs WHERE status = 'running')"
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️  Could not compact job checkpoints: {e}")
+                deleted = 0
+            self._last_compact = time.monotonic()
+        return deleted
+
+    def unfinished_jobs(self):
+        """
+        Jobs that were running when the process stopped.
+
+        Returns:
+            list: dicts with job_id, filename, output_file, email, input_complete
+        """
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, filename, output_file, email, input_complete "
+                "FROM checkpoint_jobs WHERE status = 'running' ORDER BY created_at"
+            ).fetchall()
+        return [
+            {'job_id': job_id, 'filename': filename, 'output_file': output_file,
+             'email': email, 'input_complete': bool(input_complete)}
+            for job_id, filename, output_file, email, input_complete in rows
+        ]
+
+    def codes(self, job_id, chunk_size=1000):
+        """
+        A job's codes in upload order, with the rows already finished.
+
+        Args:
+            job_id (str): Job id
+            chunk_size (int): Rows read per query
+
+        Yields:
+            tuple: (code, row or None)
+        """
+        self.flush()
+        last_seq = -1
+        while True:
+            with self._lock:
+                chunk = self._conn.execute(
+                    "SELECT seq, code, row FROM checkpoint_codes "
+                    "WHERE job_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                    (job_id, last_seq, chunk_size)
+                ).fetchall()
+            if not chunk:
+                return
+            for seq, code, row in chunk:
+                yield json.loads(code), json.loads(row) if row else None
+            last_seq = chunk[-1][0]
+
+
+_job_checkpoints = None
+_job_checkpoints_lock = threading.Lock()
+
+
+def get_job_checkpoints():
+    """
+    Get the checkpoint store shared by every job, or None if disabled.
+
+    Returns:
+        JobCheckpoints or None: Shared store
+    """
+    global _job_checkpoints
+    if not config.CHECKPOINT_ENABLED:
+        return None
+    with _job_checkpoints_lock:
+        if _job_checkpoints is None:
+            _job_checkpoints = JobCheckpoints()
+        return _job_checkpoints
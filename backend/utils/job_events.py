@@ -0,0 +1,173 @@
+"""
+Live job events for the server-sent events endpoint.
+
+Jobs publish their progress, each finished row and their state changes to
+a per-job channel; every browser watching the job waits on that channel
+instead of polling /api/status. Watchers wake at most every
+SSE_MIN_INTERVAL seconds and get everything that happened since, so a
+fast job does not cost one message per code per watcher.
+"""
+import json
+import threading
+import time
+from collections import deque
+
+import config
+
+
+class _Channel:
+    """Events of one job"""
+
+    def __init__(self, backlog):
+        self.cond = threading.Condition()
+        self.state = {}                        # status, message, progress
+        self.version = 0                       # bumped on every state change
+        self.results = deque(maxlen=backlog)   # (seq, row), most recent rows
+        self.next_seq = 0
+        self.last_used = time.monotonic()
+
+
+class JobEventHub:
+    """Fans job events out to the watchers in this process"""
+
+    def __init__(self, backlog=None):
+        """
+        Args:
+            backlog (int): Recent rows kept per job for late watchers
+        """
+        self.backlog = backlog or config.SSE_RESULT_BACKLOG
+        self._lock = threading.Lock()
+        self._channels = {}
+
+    def _channel(self, job_id, create=True):
+        with self._lock:
+            channel = self._channels.get(job_id)
+            if channel is None and create:
+                channel = self._channels[job_id] = _Channel(self.backlog)
+                self._prune_locked()
+            return channel
+
+    def _prune_locked(self):
+        # Forget finished jobs nobody has looked at for a while
+        cutoff = time.monotonic() - config.SSE_CHANNEL_TTL
+        for job_id, channel in list(self._channels.items()):
+            if channel.state.get('status') in ('completed', 'error') and channel.last_used < cutoff:
+                del self._channels[job_id]
+
+    def publish_state(self, job_id, **state):
+        """
+        Record a change of state (status, message and/or progress).
+
+        Args:
+            job_id (str): Job id
+            **state: Fields that changed
+        """
+        channel = self._channel(job_id)
+        with channel.cond:
+            channel.state.update(state)
+            channel.version += 1
+            channel.last_used = time.monotonic()
+            channel.cond.notify_all()
+
+    def publish_result(self, job_id, row, timings=None):
+        """
+        Record a finished row.
+
+        Args:
+            job_id (str): Job id
+            row (dict): Result row
+            timings (dict): The code's seconds per stage, sent with the row
+                as `timings`
+        """
+        if timings is not None:
+            row = dict(row, timings=timings)
+        channel = self._channel(job_id)
+        with channel.cond:
+            channel.results.append((channel.next_seq, row))
+            channel.next_seq += 1
+            channel.cond.notify_all()
+
+    def has_job(self, job_id):
+        """True if the job publishes its events in this process"""
+        return self._channel(job_id, create=False) is not None
+
+    def watch(self, job_id, keepalive=None, min_interval=None, idle=None):
+        """
+        Follow a job's events until it finishes.
+
+        Args:
+            job_id (str): Job id
+            keepalive (float): Longest wait before yielding None (so the
+                caller can send a keep-alive or check the queue)
+            min_interval (float): Shortest time between two wake-ups
+            idle (callable): idle() -> list of extra (event, data) to send
+                when nothing happened within `keepalive`
+
+        Yields:
+            tuple or None: (event, data), or None when idle
+        """
+        keepalive = keepalive or config.SSE_KEEPALIVE_SECONDS
+        min_interval = min_interval if min_interval is not None else config.SSE_MIN_INTERVAL
+        channel = self._channel(job_id)
+        version = -1
+        with channel.cond:
+            # Rows already in the backlog are sent first
+            seq = channel.results[0][0] if channel.results else channel.next_seq
+
+        while True:
+            with channel.cond:
+                channel.cond.wait_for(
+                    lambda: channel.version != version or channel.next_seq != seq,
+                    timeout=keepalive
+                )
+                channel.last_used = time.monotonic()
+                rows = [row for row_seq, row in channel.results if row_seq >= seq]
+                seq = channel.next_seq
+                state = dict(channel.state) if channel.version != version else None
+                version = channel.version
+
+            if not rows and state is None:
+                yield None
+                for event in (idle() if idle else []):
+                    yield event
+                continue
+            for row in rows:
+                yield 'result', row
+            if state is not None:
+                yield 'progress', state
+                if state.get('status') in ('completed', 'error'):
+                    yield 'done', {'status': state['status'], 'message': state.get('message')}
+                    return
+            time.sleep(min_interval)
+
+
+def sse_message(event, data):
+    """
+    Format one server-sent event.
+
+    Args:
+        event (str): Event name
+        data: JSON-serialisable payload
+
+    Returns:
+        str: Event in text/event-stream format
+    """
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+_job_events = None
+_job_events_lock = threading.Lock()
+
+
+def get_job_events():
+    """
+    Get the event hub shared by every job in this process.
+
+    Returns:
+        JobEventHub: Shared hub
+    """
+    global _job_events
+    with _job_events_lock:
+        if _job_events is None:
+            _job_events = JobEventHub()
+        return _job_events
@@ -0,0 +1,643 @@
+"""
+Storage for job status and progress.
+
+JobStore is the interface the API talks to. SQLiteJobStore keeps jobs in
+a local SQLite file (WAL mode), so every API worker process on the host
+sees the same jobs and they survive a restart; MemoryJobStore keeps them
+in this process only. A networked store (Redis, Postgres, ...) only has
+to implement the same methods - set JOB_STORE_BACKEND to its class path.
+
+Progress counters change for every code scraped, so increments are added
+up in memory and written at most every JOB_STORE_FLUSH_SECONDS. Finished
+jobs older than JOB_STORE_TTL are compacted away.
+
+Each job records the store (one per API process) that runs it. A SQLite
+store keeps a heartbeat for its process in the shared file; a process
+only takes over the jobs of owners whose heartbeat is older than
+JOB_OWNER_LEASE_SECONDS, whatever the OS does with process ids.
+
+The limits that hold for the whole host - jobs running at once, jobs
+waiting and browsers open - are counted here too, over the live owners,
+so several API processes sharing the store also share those budgets.
+"""
+import importlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import config
+from utils.sqlite_utils import connect_shared
+
+
+# Counters kept per job: progress, result-cache lookups and lookups
+# shared with another job's identical request
+COUNTERS = ('current', 'total', 'cache_hits', 'cache_misses', 'coalesced')
+
+# Jobs in these states are never compacted
+ACTIVE_STATUSES = ('pending', 'running')
+
+
+def status_dict(status, message, created_at, counters, details):
+    """
+    Build the status payload returned by /api/status.
+
+    Args:
+        status (str): Job state
+        message (str): Latest message
+        created_at (str): ISO timestamp
+        counters (dict): Counter name -> value
+        details (dict): Extra sections (e.g. 'connections', 'browser_pool')
+
+    Returns:
+        dict: Job status
+    """
+    job = {
+        'status': status,
+        'progress': {'current': counters.get('current', 0), 'total': counters.get('total', 0)},
+        'message': message,
+        'created_at': created_at,
+    }
+    hits, misses = counters.get('cache_hits', 0), counters.get('cache_misses', 0)
+    if hits or misses:
+        job['cache'] = {'hits': hits, 'misses': misses, 'hit_ratio': round(hits / (hits + misses), 3)}
+    if counters.get('coalesced'):
+        job['coalesced'] = counters['coalesced']
+    job.update(details)
+    return job
+
+
+class JobStore:
+    """Interface implemented by every job-store backend"""
+
+    def create(self, job_id, status='pending', message='Job queued'):
+        """
+        Add a job (replacing any job with the same id) with zeroed counters,
+        owned by this process.
+
+        Args:
+            job_id (str): Job id
+            status (str): Initial state
+            message (str): Initial message
+        """
+        raise NotImplementedError
+
+    def get(self, job_id):
+        """
+        Look up a job.
+
+        Args:
+            job_id (str): Job id
+
+        Returns:
+            dict or None: Status payload (see status_dict), None if unknown
+        """
+        raise NotImplementedError
+
+    def update(self, job_id, status=None, message=None, **details):
+        """
+        Change a job's state, message and/or extra sections.
+
+        Args:
+            job_id (str): Job id
+            status (str): New state (unchanged if None)
+            message (str): New message (unchanged if None)
+            **details: Extra JSON-serialisable sections to set
+        """
+        raise NotImplementedError
+
+    def add_counts(self, job_id, **deltas):
+        """
+        Increment counters (see COUNTERS). Cheap enough to call per code.
+
+        Args:
+            job_id (str): Job id
+            **deltas: Counter name -> amount to add
+        """
+        raise NotImplementedError
+
+    def reset_counts(self, job_id):
+        """Set a job's counters back to zero"""
+        raise NotImplementedError
+
+    def claim(self, job_id):
+        """
+        Take over a job whose owning process is gone (its heartbeat
+        expired). An unknown job is added (pending) so no other process
+        claims it too.
+
+        Args:
+            job_id (str): Job id
+
+        Returns:
+            bool: True if this process owns the job now, False if its
+                owner is still alive (including this process itself)
+        """
+        raise NotImplementedError
+
+    def find(self, status):
+        """
+        Jobs in a given state, oldest first.
+
+        Args:
+            status (str): Job state
+
+        Returns:
+            list: Job ids
+        """
+        raise NotImplementedError
+
+    def active_jobs(self):
+        """
+        Pending and running jobs of live owners, in every process sharing
+        the store.
+
+        Returns:
+            dict: Status ('pending', 'running') -> job ids, oldest first
+        """
+        raise NotImplementedError
+
+    def start_job(self, job_id, max_running):
+        """
+        Mark a job running (owned by this process) if fewer than
+        max_running jobs of live owners are running. Check and update
+        are one step, so processes starting jobs together cannot overshoot.
+
+        Args:
+            job_id (str): Job id
+            max_running (int): Jobs allowed to run at once
+
+        Returns:
+            bool: True if the job may start now
+        """
+        raise NotImplementedError
+
+    def reserve_browser(self, limit):
+        """
+        Count one more browser open in this process, if fewer than `limit`
+        are open in all live processes together.
+
+        Args:
+            limit (int): Browsers allowed on the host
+
+        Returns:
+            bool: True if the browser may be launched
+        """
+        raise NotImplementedError
+
+    def release_browser(self):
+        """Count one browser of this process as closed"""
+        raise NotImplementedError
+
+    def compact(self, ttl=None):
+        """
+        Delete finished jobs not updated within the TTL.
+
+        Args:
+            ttl (float): Seconds (config.JOB_STORE_TTL if None)
+
+        Returns:
+            int: Jobs deleted
+        """
+        raise NotImplementedError
+
+
+class MemoryJobStore(JobStore):
+    """Jobs kept in this process only"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs = {}     # job_id -> {'status', 'message', 'created_at', 'updated_at', 'counters', 'details'}
+        self._browsers = 0
+        self._last_compact = time.monotonic()
+
+    def create(self, job_id, status='pending', message='Job queued'):
+        with self._lock:
+            self._jobs[job_id] = {
+                'status': status, 'message': message,
+                'created_at': datetime.now().isoformat(), 'updated_at': time.time(),
+                'counters': dict.fromkeys(COUNTERS, 0), 'details': {},
+            }
+        self._maybe_compact()
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return status_dict(job['status'], job['message'], job['created_at'],
+                               dict(job['counters']), json.loads(json.dumps(job['details'])))
+
+    def update(self, job_id, status=None, message=None, **details):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            if status is not None:
+                job['status'] = status
+            if message is not None:
+                job['message'] = message
+            job['details'].update(details)
+            job['updated_at'] = time.time()
+
+    def add_counts(self, job_id, **deltas):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            for name, delta in deltas.items():
+                job['counters'][name] = job['counters'].get(name, 0) + delta
+
+    def reset_counts(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job['counters'] = dict.fromkeys(COUNTERS, 0)
+
+    def claim(self, job_id):
+        # Every job here belongs to this process, which is alive
+        with self._lock:
+            if job_id in self._jobs:
+                return False
+        self.create(job_id)
+        return True
+
+    def find(self, status):
+        with self._lock:
+            matching = [(job['created_at'], job_id) for job_id, job in self._jobs.items()
+                        if job['status'] == status]
+        return [job_id for _, job_id in sorted(matching)]
+
+    def active_jobs(self):
+        with self._lock:
+            active = sorted((job['created_at'], job['status'], job_id) for job_id, job in self._jobs.items()
+                            if job['status'] in ACTIVE_STATUSES)
+        jobs = {status: [] for status in ACTIVE_STATUSES}
+        for _, status, job_id in active:
+            jobs[status].append(job_id)
+        return jobs
+
+    def start_job(self, job_id, max_running):
+        with self._lock:
+            running = sum(1 for other_id, job in self._jobs.items()
+                          if job['status'] == 'running' and other_id != job_id)
+            if running >= max_running:
+                return False
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job['status'] = 'running'
+                job['updated_at'] = time.time()
+        return True
+
+    def reserve_browser(self, limit):
+        with self._lock:
+            if self._browsers >= limit:
+                return False
+            self._browsers += 1
+            return True
+
+    def release_browser(self):
+        with self._lock:
+            self._browsers = max(self._browsers - 1, 0)
+
+    def _maybe_compact(self):
+        if time.monotonic() - self._last_compact >= config.JOB_STORE_COMPACT_INTERVAL:
+            self.compact()
+
+    def compact(self, ttl=None):
+        cutoff = time.time() - (ttl if ttl is not None else config.JOB_STORE_TTL)
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job['status'] not in ACTIVE_STATUSES and job['updated_at'] < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+            self._last_compact = time.monotonic()
+        return len(expired)
+
+
+class SQLiteJobStore(JobStore):
+    """Jobs kept in a SQLite file shared by every process on the host"""
+
+    def __init__(self, path=None, flush_seconds=None, lease_seconds=None):
+        """
+        Args:
+            path (str): SQLite file (config.JOB_STORE_FILE if None)
+            flush_seconds (float): Longest time counter increments stay buffered
+            lease_seconds (float): Heartbeat age after which an owner counts
+                as dead (config.JOB_OWNER_LEASE_SECONDS if None)
+        """
+        self.path = path or config.JOB_STORE_FILE
+        self.flush_seconds = (flush_seconds if flush_seconds is not None
+                              else config.JOB_STORE_FLUSH_SECONDS)
+        self.lease_seconds = lease_seconds or config.JOB_OWNER_LEASE_SECONDS
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = connect_shared(self.path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                message TEXT,
+                created_at TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                details TEXT NOT NULL DEFAULT '{}',
+                owner TEXT
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+            CREATE INDEX IF NOT EXISTS jobs_updated_at ON jobs (updated_at);
+            CREATE TABLE IF NOT EXISTS job_counters (
+                job_id TEXT NOT NULL,
+                name TEXT NOT NULL,
+                value INTEGER NOT NULL,
+                PRIMARY KEY (job_id, name)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS owners (
+                owner TEXT PRIMARY KEY,
+                heartbeat_at REAL NOT NULL,
+                browsers INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+        self._conn.commit()
+        # Unique per store, so a reused pid is never mistaken for its owner
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._deltas = {}     # (job_id, counter) -> increment not yet written
+        self._last_flush = time.monotonic()
+        self._last_compact = time.monotonic()
+
+        self._closed = threading.Event()
+        self._heartbeat()
+        threading.Thread(target=self._keep_alive, daemon=True).start()
+
+    def _heartbeat(self):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO owners (owner, heartbeat_at) VALUES (?, ?) "
+                "ON CONFLICT (owner) DO UPDATE SET heartbeat_at = excluded.heartbeat_at",
+                (self.owner, time.time())
+            )
+            self._conn.commit()
+
+    def _keep_alive(self):
+        interval = min(config.JOB_OWNER_HEARTBEAT_SECONDS, self.lease_seconds / 3)
+        while not self._closed.wait(interval):
+            try:
+                self._heartbeat()
+            except sqlite3.Error as e:
+                print(f"⚠️  Could not refresh the job store heartbeat: {e}")
+
+    def close(self):
+        """Stop the heartbeat (this process's jobs can then be taken over) and close the file"""
+        self._closed.set()
+        with self._lock:
+            self._flush_locked()
+            self._conn.execute("DELETE FROM owners WHERE owner = ?", (self.owner,))
+            self._conn.commit()
+            self._conn.close()
+
+    def _flush_locked(self):
+        if self._deltas:
+            try:
+                self._conn.executemany(
+                    "INSERT INTO job_counters (job_id, name, value) VALUES (?, ?, ?) "
+                    "ON CONFLICT (job_id, name) DO UPDATE SET value = value + excluded.value",
+                    [(job_id, name, delta) for (job_id, name), delta in self._deltas.items()]
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️  Could not save job progress: {e}")
+            self._deltas = {}
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        """Write buffered counter increments"""
+        with self._lock:
+            self._flush_locked()
+
+    def create(self, job_id, status='pending', message='Job queued'):
+        with self._lock:
+            self._flush_locked()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, status, message, created_at, updated_at, details, owner) "
+                "VALUES (?, ?, ?, ?, ?, '{}', ?)",
+                (job_id, status, message, datetime.now().isoformat(), time.time(), self.owner)
+            )
+            self._conn.execute("DELETE FROM job_counters WHERE job_id = ?", (job_id,))
+            self._conn.commit()
+        if time.monotonic() - self._last_compact >= config.JOB_STORE_COMPACT_INTERVAL:
+            self.compact()
+
+    def get(self, job_id):
+        with self._lock:
+            self._flush_locked()
+            row = self._conn.execute(
+                "SELECT status, message, created_at, details FROM jobs WHERE job_id = ?",
+                (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            counters = dict(self._conn.execute(
+                "SELECT name, value FROM job_counters WHERE job_id = ?", (job_id,)
+            ).fetchall())
+        status, message, created_at, details = row
+        return status_dict(status, message, created_at, counters, json.loads(details))
+
+    def update(self, job_id, status=None, message=None, **details):
+        with self._lock:
+            self._flush_locked()
+            if details:
+                row = self._conn.execute(
+                    "SELECT details FROM jobs WHERE job_id = ?", (job_id,)
+                ).fetchone()
+                if row is None:
+                    return
+                merged = json.loads(row[0])
+                merged.update(details)
+                details_json = json.dumps(merged, default=str)
+            else:
+                details_json = None
+            self._conn.execute(
+                "UPDATE jobs SET status = COALESCE(?, status), message = COALESCE(?, message), "
+                "details = COALESCE(?, details), updated_at = ? WHERE job_id = ?",
+                (status, message, details_json, time.time(), job_id)
+            )
+            self._conn.commit()
+
+    def add_counts(self, job_id, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                key = (job_id, name)
+                self._deltas[key] = self._deltas.get(key, 0) + delta
+            if time.monotonic() - self._last_flush >= self.flush_seconds:
+                self._flush_locked()
+
+    def reset_counts(self, job_id):
+        with self._lock:
+            self._flush_locked()
+            self._conn.execute("DELETE FROM job_counters WHERE job_id = ?", (job_id,))
+            self._conn.commit()
+
+    def claim(self, job_id):
+        with self._lock:
+            self._flush_locked()
+            # Check and take ownership in one write transaction, so two
+            # processes starting together cannot both claim a job
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT jobs.owner, owners.heartbeat_at FROM jobs "
+                    "LEFT JOIN owners ON owners.owner = jobs.owner WHERE job_id = ?", (job_id,)
+                ).fetchone()
+                if row is not None and row[1] is not None and row[1] >= self._live_since():
+                    self._conn.rollback()
+                    return False
+                if row is None:
+                    self._conn.execute(
+                        "INSERT INTO jobs (job_id, status, message, created_at, updated_at, details, owner) "
+                        "VALUES (?, 'pending', 'Job queued', ?, ?, '{}', ?)",
+                        (job_id, datetime.now().isoformat(), time.time(), self.owner)
+                    )
+                else:
+                    self._conn.execute("UPDATE jobs SET owner = ? WHERE job_id = ?", (self.owner, job_id))
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+        return True
+
+    def find(self, status):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id FROM jobs WHERE status = ? ORDER BY created_at", (status,)
+            ).fetchall()
+        return [job_id for job_id, in rows]
+
+    def _live_since(self):
+        return time.time() - self.lease_seconds
+
+    def active_jobs(self):
+        placeholders = ", ".join("?" for _ in ACTIVE_STATUSES)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, status FROM jobs JOIN owners ON owners.owner = jobs.owner "
+                f"WHERE status IN ({placeholders}) AND heartbeat_at >= ? ORDER BY created_at",
+                (*ACTIVE_STATUSES, self._live_since())
+            ).fetchall()
+        jobs = {status: [] for status in ACTIVE_STATUSES}
+        for job_id, status in rows:
+            jobs[status].append(job_id)
+        return jobs
+
+    def start_job(self, job_id, max_running):
+        with self._lock:
+            self._flush_locked()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                running = self._conn.execute(
+                    "SELECT COUNT(*) FROM jobs JOIN owners ON owners.owner = jobs.owner "
+                    "WHERE status = 'running' AND heartbeat_at >= ? AND job_id != ?",
+                    (self._live_since(), job_id)
+                ).fetchone()[0]
+                if running >= max_running:
+                    self._conn.rollback()
+                    return False
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'running', owner = ?, updated_at = ? WHERE job_id = ?",
+                    (self.owner, time.time(), job_id)
+                )
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+        return True
+
+    def reserve_browser(self, limit):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                open_browsers = self._conn.execute(
+                    "SELECT COALESCE(SUM(browsers), 0) FROM owners WHERE heartbeat_at >= ?",
+                    (self._live_since(),)
+                ).fetchone()[0]
+                if open_browsers >= limit:
+                    self._conn.rollback()
+                    return False
+                self._conn.execute("UPDATE owners SET browsers = browsers + 1 WHERE owner = ?",
+                                   (self.owner,))
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+        return True
+
+    def release_browser(self):
+        with self._lock:
+            self._conn.execute("UPDATE owners SET browsers = MAX(browsers - 1, 0) WHERE owner = ?",
+                               (self.owner,))
+            self._conn.commit()
+
+    def compact(self, ttl=None):
+        cutoff = time.time() - (ttl if ttl is not None else config.JOB_STORE_TTL)
+        placeholders = ", ".join("?" for _ in ACTIVE_STATUSES)
+        with self._lock:
+            self._flush_locked()
+            expired = [job_id for job_id, in self._conn.execute(
+                f"SELECT job_id FROM jobs WHERE updated_at < ? AND status NOT IN ({placeholders})",
+                (cutoff, *ACTIVE_STATUSES)
+            ).fetchall()]
+            self._conn.executemany("DELETE FROM job_counters WHERE job_id = ?",
+                                   [(job_id,) for job_id in expired])
+            self._conn.executemany("DELETE FROM jobs WHERE job_id = ?",
+                                   [(job_id,) for job_id in expired])
+            # An owner without a heartbeat row counts as dead all the same
+            self._conn.execute("DELETE FROM owners WHERE heartbeat_at < ?",
+                               (time.time() - self.lease_seconds,))
+            self._conn.commit()
+            self._last_compact = time.monotonic()
+        if expired:
+            print(f"🧹 Compacted {len(expired)} expired job(s)")
+        return len(expired)
+
+
+JOB_STORE_BACKENDS = {
+    'sqlite': SQLiteJobStore,
+    'memory': MemoryJobStore,
+}
+
+_job_store = None
+_job_store_pid = None
+_job_store_lock = threading.Lock()
+
+
+def _backend_class(name):
+    if name in JOB_STORE_BACKENDS:
+        return JOB_STORE_BACKENDS[name]
+    # Custom backend given as "package.module.ClassName"
+    module_name, _, class_name = name.rpartition('.')
+    if not module_name:
+        raise ValueError(f"Unknown job store backend: {name}")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def get_job_store():
+    """
+    Get this process's job store (backend chosen by config.JOB_STORE_BACKEND).
+
+    Returns:
+        JobStore: Shared store
+    """
+    global _job_store, _job_store_pid
+    with _job_store_lock:
+        # A forked child must not share the parent's SQLite connection
+        if _job_store is None or _job_store_pid != os.getpid():
+            _job_store = _backend_class(config.JOB_STORE_BACKEND)()
+            _job_store_pid = os.getpid()
+        return _job_store
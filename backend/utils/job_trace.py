@@ -0,0 +1,180 @@
+"""
+Per-code stage timing for scraping jobs.
+
+Fetchers and the parse stage return Spans - how long a lookup spent
+waiting for the rate limiter or a browser, downloading, waiting for the
+page to render and parsing - along with their pages, and the job's rows
+add the time taken to write them. A JobTrace holds each code's spans until
+its row is written, hands back the code's seconds per stage (sent with the
+row's live `result` event) and adds them up for the job's status. Profiled
+jobs also write them out as they finish:
+
+- <output>_timings.jsonl: one line per code with its seconds per stage
+- <output>_trace.json: Chrome trace-event JSON (one lane per code), for
+  chrome://tracing or https://ui.perfetto.dev
+
+Only codes still in flight are kept in memory, and both files are written
+incrementally, so timing a big job stays cheap.
+"""
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+
+# Stages in pipeline order
+STAGES = ("rate_limit_wait", "browser_wait", "fetch", "render_wait", "parse", "write")
+
+# A stage of one lookup. `start` is wall-clock time (time.time()), so
+# spans measured in the parse worker processes line up with the rest.
+Span = namedtuple("Span", ["stage", "start", "seconds"])
+
+
+def span_since(stage, started):
+    """
+    Span from `started` (time.time()) until now.
+
+    Args:
+        stage (str): One of STAGES
+        started (float): When the stage began
+
+    Returns:
+        Span: The stage's span
+    """
+    return Span(stage, started, max(time.time() - started, 0.0))
+
+
+def trace_paths(output_file):
+    """
+    Where a profiled job's timing files go.
+
+    Args:
+        output_file (str): The job's results workbook
+
+    Returns:
+        tuple: (timings .jsonl path, trace .json path)
+    """
+    base = os.path.splitext(output_file)[0]
+    return f"{base}_timings.jsonl", f"{base}_trace.json"
+
+
+class JobTrace:
+    """Collects a job's spans per code and adds them up per stage"""
+
+    def __init__(self, job_id, output_file=None, profile=False):
+        """
+        Args:
+            job_id (str): Job id (trace process name)
+            output_file (str): The job's results workbook (the timing
+                files are written next to it when profiling)
+            profile (bool): Write the per-code timings and the trace file
+        """
+        self.job_id = job_id
+        self.profile = bool(profile and output_file)
+        self.timings_file, self.trace_file = trace_paths(output_file) if self.profile else (None, None)
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self._totals = {stage: 0.0 for stage in STAGES}
+        self._codes = {}       # code -> [(site, Span)] until the code is written
+        self._lanes = 0
+        self._timings_out = None
+        self._trace_out = None
+        if self.profile:
+            self._timings_out = open(self.timings_file, "w", encoding="utf-8")
+            self._trace_out = open(self.trace_file, "w", encoding="utf-8")
+            self._trace_out.write('{"displayTimeUnit": "ms", "traceEvents": [\n')
+            self._event({"name": "process_name", "ph": "M", "pid": 1, "tid": 0,
+                         "args": {"name": f"job {job_id}"}}, first=True)
+
+    def add(self, code, site, spans):
+        """
+        Record spans of one code's lookup on a site.
+
+        Args:
+            code: OEM code
+            site (str): Site the spans belong to
+            spans (iterable): Span tuples
+        """
+        spans = list(spans)
+        if not spans:
+            return
+        with self._lock:
+            for span in spans:
+                self._totals[span.stage] = self._totals.get(span.stage, 0.0) + span.seconds
+            self._codes.setdefault(code, []).extend((site, span) for span in spans)
+
+    def written(self, code, span):
+        """
+        Record the write of a code's row; the code's timings are final.
+
+        Args:
+            code: OEM code
+            span (Span): The write
+
+        Returns:
+            dict: The code's seconds per stage
+        """
+        with self._lock:
+            self._totals["write"] += span.seconds
+            spans = self._codes.pop(code, []) + [(None, span)]
+            seconds = self._stage_seconds(spans)
+            if self.profile:
+                self._write_code(code, spans, seconds)
+            return seconds
+
+    @staticmethod
+    def _stage_seconds(spans):
+        seconds = dict.fromkeys(STAGES, 0.0)
+        for _, span in spans:
+            seconds[span.stage] = seconds.get(span.stage, 0.0) + span.seconds
+        return {stage: round(value, 4) for stage, value in seconds.items()}
+
+    def _write_code(self, code, spans, seconds):
+        # Called with the lock held
+        self._timings_out.write(json.dumps({"OEM_CODE": code, **seconds}, default=str) + "\n")
+
+        self._lanes += 1
+        lane = self._lanes
+        self._event({"name": "thread_name", "ph": "M", "pid": 1, "tid": lane,
+                     "args": {"name": str(code)}})
+        for site, span in sorted(spans, key=lambda item: item[1].start):
+            event = {"name": span.stage, "cat": site or "job", "ph": "X", "pid": 1, "tid": lane,
+                     "ts": round(span.start * 1e6), "dur": round(span.seconds * 1e6),
+                     "args": {"code": str(code)}}
+            if site:
+                event["args"]["site"] = site
+            self._event(event)
+
+    def _event(self, event, first=False):
+        self._trace_out.write(("" if first else ",\n") + json.dumps(event, default=str))
+
+    def summary(self):
+        """
+        Seconds per stage, added up over every code (lookups overlap, so
+        the stages can add up to more than the job's wall time).
+
+        Returns:
+            dict: {'stages': {stage: seconds}, 'wall_seconds', and the
+                'timings_file' / 'trace_file' names when profiling}
+        """
+        with self._lock:
+            stages = {stage: round(seconds, 3) for stage, seconds in self._totals.items()}
+        summary = {'stages': stages, 'wall_seconds': round(time.time() - self._started, 3)}
+        if self.profile:
+            summary['timings_file'] = os.path.basename(self.timings_file)
+            summary['trace_file'] = os.path.basename(self.trace_file)
+        return summary
+
+    def close(self):
+        """Write the codes never written (if any) and finish the files"""
+        with self._lock:
+            codes, self._codes = self._codes, {}
+            if not self.profile or self._trace_out is None:
+                return
+            for code, spans in codes.items():
+                self._write_code(code, spans, self._stage_seconds(spans))
+            self._trace_out.write("\n]}\n")
+            self._trace_out.close()
+            self._timings_out.close()
+            self._trace_out = self._timings_out = None
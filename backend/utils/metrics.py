@@ -0,0 +1,240 @@
+"""
+Prometheus metrics for the scraping pipeline.
+
+A small in-process registry of counters, gauges and histograms rendered
+in the Prometheus text exposition format by /api/metrics. Everything that
+fetches, parses or waits records into the module-level metrics below;
+parse workers run in other processes, so their timings are sent back
+with the records and recorded here (see scrapers.parse_pool).
+"""
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+
+# Site names for the hosts the scrapers fetch from (used as label values)
+SITE_HOSTS = {
+    "www.hottoner.com.au": "HotToner",
+    "www.inkstation.com.au": "InkStation",
+    "www.inkdepot.com.au": "InkDepot",
+}
+
+# Latency buckets in seconds: from a parse (milliseconds) up to a slow
+# browser page or a long wait for a free browser
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def site_for(url):
+    """Site name for a URL (the host itself for unknown hosts)"""
+    host = urlparse(url).netloc
+    return SITE_HOSTS.get(host, host)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+               for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def get(self, **labels):
+        """Current value for a set of labels (None if never recorded)"""
+        key = self._key(labels)
+        with self._lock:
+            return self._values.get(key)
+
+    def clear(self):
+        """Forget every labelled value (e.g. per-job gauges of finished jobs)"""
+        with self._lock:
+            self._values = {}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            values = dict(self._values)
+        for key in sorted(values):
+            lines.extend(self._render_value(key, values[key]))
+        return lines
+
+    def _render_value(self, key, value):
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, set when metrics are collected"""
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Distribution of durations, in cumulative buckets"""
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        super().__init__(name, documentation, labels)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[0][index] += 1
+                    break
+            counts[1] += value
+            counts[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with-block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _render_value(self, key, value):
+        buckets, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, buckets):
+            cumulative += bucket_count
+            le = (("le", _format_value(bound)),)
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+        labels = _format_labels(self.label_names, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Every metric of this process, in registration order"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = []
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self):
+        """
+        All metrics in the Prometheus text format (version 0.0.4).
+
+        Returns:
+            str: Exposition text
+        """
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ---- Pipeline metrics -----------------------------------------------------
+
+FETCH_SECONDS = Histogram(
+    "scraper_fetch_seconds", "Time to download one page",
+    ["site", "via"])
+PARSE_SECONDS = Histogram(
+    "scraper_parse_seconds", "Time to parse one downloaded page",
+    ["site"])
+WAIT_SECONDS = Histogram(
+    "scraper_wait_seconds", "Time spent waiting before a request or lookup could start",
+    ["site", "reason"])
+HTTP_RESPONSES = Counter(
+    "scraper_http_responses_total", "HTTP responses received, by status code",
+    ["site", "status"])
+HTTP_RATE_LIMITED = Counter(
+    "scraper_http_rate_limited_total", "HTTP 429 (Too Many Requests) responses",
+    ["site"])
+CACHE_LOOKUPS = Counter(
+    "scraper_cache_lookups_total", "Result-cache lookups, by outcome",
+    ["site", "result"])
+CACHE_HIT_RATIO = Gauge(
+    "scraper_cache_hit_ratio", "Share of result-cache lookups answered from the cache",
+    ["site"])
+CODES_COMPLETED = Counter(
+    "scraper_codes_completed_total", "OEM codes finished on every site")
+QUEUE_DEPTH = Gauge(
+    "scraper_jobs_queued", "Jobs waiting for a free slot")
+JOBS_RUNNING = Gauge(
+    "scraper_jobs_running", "Jobs being scraped")
+BROWSER_BATCHES_PENDING = Gauge(
+    "scraper_browser_batches_pending", "Browser batches waiting for a worker")
+BROWSERS_ACTIVE = Gauge(
+    "scraper_browsers_active", "Pooled browsers checked out by a job")
+BROWSERS_OPEN = Gauge(
+    "scraper_browsers_open", "Pooled browsers open")
+JOB_CODES_PER_SECOND = Gauge(
+    "scraper_job_codes_per_second", "Codes finished per second since the job started",
+    ["job_id"])
+
+
+def record_cache_lookup(site, hits, misses):
+    """Count result-cache hits and misses for a site and update its hit ratio"""
+    if hits:
+        CACHE_LOOKUPS.inc(hits, site=site, result="hit")
+    if misses:
+        CACHE_LOOKUPS.inc(misses, site=site, result="miss")
+    total_hits = CACHE_LOOKUPS.get(site=site, result="hit") or 0
+    total = total_hits + (CACHE_LOOKUPS.get(site=site, result="miss") or 0)
+    if total:
+        CACHE_HIT_RATIO.set(round(total_hits / total, 4), site=site)
+
+
+def record_response(url, status):
+    """Count an HTTP response (and 429s separately)"""
+    site = site_for(url)
+    HTTP_RESPONSES.inc(site=site, status=status)
+    if status == 429:
+        HTTP_RATE_LIMITED.inc(site=site)
@@ -0,0 +1,189 @@
+"""
+Per-site request rate limiting shared by every job and every API process.
+
+Each host gets a token bucket, so every job thread, browser worker and the
+async engine draw from the same budget. The buckets live in a small SQLite
+file (config.RATE_LIMIT_FILE) and are updated in a write transaction, so
+several API processes on one machine sharing the job store also share the
+budget instead of each getting its own. Fetching happens in the API
+processes only (the parse workers never send requests). Callers only wait
+when the budget for that host is actually used up.
+"""
+import asyncio
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import config
+from utils.sqlite_utils import connect_shared
+
+
+class BucketStore:
+    """Token buckets per host, kept in a SQLite file shared by processes"""
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path (str): SQLite file (config.RATE_LIMIT_FILE if None)
+        """
+        self.path = path or config.RATE_LIMIT_FILE
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = connect_shared(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS buckets (
+                host TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+
+    def reserve(self, host, rate, capacity):
+        """
+        Take one token from a host's bucket, going into debt if it is empty.
+
+        Args:
+            host (str): Host name
+            rate (float): Tokens added per second
+            capacity (float): Most tokens the bucket holds
+
+        Returns:
+            float: Seconds the caller must wait before sending its request
+        """
+        with self._lock:
+            # Read and update in one write transaction, so reservations
+            # from other processes cannot interleave
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._conn.execute(
+                    "SELECT tokens, updated_at FROM buckets WHERE host = ?", (host,)
+                ).fetchone()
+                if row is None:
+                    tokens = capacity
+                else:
+                    tokens, updated_at = row
+                    tokens = min(capacity, tokens + max(now - updated_at, 0.0) * rate)
+                tokens -= 1
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO buckets (host, tokens, updated_at) VALUES (?, ?, ?)",
+                    (host, tokens, now)
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return 0.0 if tokens >= 0 else -tokens / rate
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class RateLimiter:
+    """Token buckets for every host in config.RATE_LIMITS"""
+
+    def __init__(self, rate_limits=None, burst=None, path=None):
+        """
+        Args:
+            rate_limits (dict): Host name -> requests per second
+            burst (int): Bucket size (defaults to config.RATE_LIMIT_BURST)
+            path (str): Bucket file (config.RATE_LIMIT_FILE if None)
+        """
+        self.rate_limits = rate_limits if rate_limits is not None else config.RATE_LIMITS
+        self.burst = burst or config.RATE_LIMIT_BURST
+        self.path = path
+        self._store = None
+        self._store_lock = threading.Lock()
+
+    def _rate_for(self, host):
+        if host in self.rate_limits:
+            return self.rate_limits[host]
+        # Unlisted hosts get DEFAULT_RATE_LIMIT
+        return config.DEFAULT_RATE_LIMIT
+
+    def _bucket_store(self):
+        # Opened on first use, so unlimited hosts never touch the file
+        with self._store_lock:
+            if self._store is None:
+                self._store = BucketStore(self.path)
+            return self._store
+
+    def reserve(self, url):
+        """
+        Reserve a request slot for the host of a URL.
+
+        Args:
+            url (str): URL about to be requested
+
+        Returns:
+            float: Seconds to wait before sending the request
+        """
+        host = urlparse(url).netloc
+        rate = self._rate_for(host)
+        if not rate:
+            return 0.0
+        return self._bucket_store().reserve(host, float(rate), float(self.burst or max(1, rate)))
+
+    def wait(self, url):
+        """
+        Block until a request to the URL's host is allowed.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def wait_async(self, url):
+        """
+        Asyncio version of wait().
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        delay = self.reserve(url)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """
+    Get this process's rate limiter.
+
+    Created once and shared by every job thread in the API process; its
+    buckets are shared with the other API processes through the file.
+
+    Returns:
+        RateLimiter: Shared rate limiter
+    """
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter()
+        return _rate_limiter
+
+
+def wait_for_rate_limit(url):
+    """
+    Block until the shared budget allows a request to the URL's host.
+
+    Args:
+        url (str): URL about to be requested
+
+    Returns:
+        float: Seconds spent waiting
+    """
+    return get_rate_limiter().wait(url)
@@ -2,9 +2,20 @@
 HTTP request utilities with retry logic and rate limiting.
 """
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+import os
 import random
+import threading
 import time
-from typing import Optional
+from urllib.parse import urlparse
+
+import config
+from utils.rate_limiter import wait_for_rate_limit
+from utils.http_cache import conditional_headers, has_stored_copy, store_page
+from utils.metrics import FETCH_SECONDS, WAIT_SECONDS, record_response, site_for
+from utils.job_trace import span_since
 
 
 def get_random_user_agent():
@@ -41,7 +52,151 @@ def get_headers():
     }
 
 
-def make_request(url, max_retries=3, timeout=10):
+# New TCP connections opened by this process, per host name. urllib3's own
+# pool counters miss reconnects of dropped keep-alive sockets, so count at
+# connect() instead.
+_connections_opened = {}
+_connections_lock = threading.Lock()
+
+
+def _count_connection(host):
+    with _connections_lock:
+        _connections_opened[host] = _connections_opened.get(host, 0) + 1
+
+
+class _CountingHTTPConnection(HTTPConnection):
+    def connect(self):
+        _count_connection(self.host)
+        super().connect()
+
+
+class _CountingHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        _count_connection(self.host)
+        super().connect()
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
+
+class _PooledAdapter(HTTPAdapter):
+    """HTTPAdapter that counts requests and new connections"""
+    
+    def __init__(self, *args, **kwargs):
+        self.request_count = 0
+        super().__init__(*args, **kwargs)
+    
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+    
+    def send(self, request, **kwargs):
+        self.request_count += 1
+        return super().send(request, **kwargs)
+
+
+class SessionPool:
+    """
+    Keep-alive requests sessions, one per host.
+    
+    Each session keeps up to `pool_size` open connections to its host, so
+    consecutive lookups reuse the TCP+TLS connection instead of paying a
+    new handshake for every code.
+    """
+    
+    def __init__(self, pool_size=None):
+        """
+        Args:
+            pool_size (int): Maximum open connections kept per host
+        """
+        self.pool_size = pool_size or config.HTTP_POOL_SIZE
+        self._sessions = {}
+        self._lock = threading.Lock()
+    
+    def session_for(self, url):
+        """
+        Get the session for the host of a URL, creating it on first use.
+        
+        Args:
+            url (str): URL about to be requested
+            
+        Returns:
+            requests.Session: Session bound to the URL's host
+        """
+        host = urlparse(url).netloc
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                # Retries are handled by make_request, not urllib3
+                adapter = _PooledAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[host] = session
+            return session
+    
+    def connection_stats(self):
+        """
+        Connection reuse counters per host.
+        
+        Returns:
+            dict: host -> {'requests', 'new_connections', 'reused_connections'}
+        """
+        stats = {}
+        with self._lock:
+            for host, session in self._sessions.items():
+                host_requests = session.get_adapter("https://").request_count
+                with _connections_lock:
+                    new_connections = _connections_opened.get(urlparse(f"//{host}").hostname, 0)
+                stats[host] = {
+                    'requests': host_requests,
+                    'new_connections': new_connections,
+                    'reused_connections': max(host_requests - new_connections, 0),
+                }
+        return stats
+    
+    def close(self):
+        """Close every session and its open connections"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+
+
+_session_pool = None
+_session_pool_pid = None
+_session_pool_lock = threading.Lock()
+
+
+def get_session_pool():
+    """
+    Get the session pool owned by the current process.
+    
+    Worker processes each get their own pool (sockets are never shared
+    across a fork), and reuse it for every code they handle.
+    
+    Returns:
+        SessionPool: This process's session pool
+    """
+    global _session_pool, _session_pool_pid
+    with _session_pool_lock:
+        if _session_pool is None or _session_pool_pid != os.getpid():
+            with _connections_lock:
+                _connections_opened.clear()
+            _session_pool = SessionPool()
+            _session_pool_pid = os.getpid()
+        return _session_pool
+
+
+def make_request(url, max_retries=3, timeout=10, headers=None, session=None, conditional=True):
     """
     Make an HTTP GET request with retry logic.
     
@@ -49,21 +204,61 @@ def make_request(url, max_retries=3, timeout=10):
         url (str): URL to request
         max_retries (int): Maximum number of retry attempts
         timeout (int): Request timeout in seconds
+        headers (dict): Request headers (random browser headers if None)
+        session (requests.Session): Session to use (this process's pooled
+            session for the host if None)
+        conditional (bool): Send the HTTP cache's validators for the URL
         
     Returns:
-        requests.Response or None: Response object if successful, None otherwise
+        requests.Response or None: Response object if successful, None otherwise.
+        A 304 answer to a conditional request is returned with
+        `response.not_modified = True` and no body; see
+        utils.http_cache.extract_record. `response.timings` holds the
+        rate-limit waits and downloads of every attempt (utils.job_trace.Span).
     """
+    session = session or get_session_pool().session_for(url)
+    request_headers = dict(headers or get_headers())
+    if conditional:
+        request_headers.update(conditional_headers(url))
+    site = site_for(url)
+    spans = []
+    
     for attempt in range(max_retries):
         try:
-            response = requests.get(
-                url, 
-                headers=get_headers(), 
-                timeout=timeout,
-                allow_redirects=True
-            )
+            # Wait only if the shared per-site budget is used up
+            wait_started = time.time()
+            waited = wait_for_rate_limit(url)
+            WAIT_SECONDS.observe(waited, site=site, reason="rate_limit")
+            if waited:
+                spans.append(span_since("rate_limit_wait", wait_started))
+            fetch_started = time.time()
+            try:
+                response = session.get(
+                    url, 
+                    headers=request_headers, 
+                    timeout=timeout,
+                    allow_redirects=True
+                )
+            finally:
+                spans.append(span_since("fetch", fetch_started))
+                FETCH_SECONDS.observe(spans[-1].seconds, site=site, via="http")
+            record_response(url, response.status_code)
+            response.timings = spans
             
             if response.status_code == 200:
+                response.not_modified = False
+                store_page(url, response.headers, response.text)
                 return response
+            elif response.status_code == 304:
+                if has_stored_copy(url):
+                    # Unchanged since our stored copy
+                    response.not_modified = True
+                    return response
+                # The stored copy is gone - ask again for the whole page
+                refetched = make_request(url, max_retries, timeout, headers, session, conditional=False)
+                if refetched is not None:
+                    refetched.timings = spans + refetched.timings
+                return refetched
             elif response.status_code == 404:
                 # Product not found - don't retry
                 return None
@@ -0,0 +1,142 @@
+"""
+Persistent cache of scraped results keyed by (site, OEM code).
+
+Entries live in a local SQLite file and expire after a per-site TTL, so
+re-uploading the same cartridge list within the TTL skips the network.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import config
+
+
+def normalize_code(oem_code):
+    """
+    Normalise an OEM code for cache lookups.
+
+    Args:
+        oem_code: Code as read from the sheet (may be a number)
+
+    Returns:
+        str: Upper-case code with whitespace removed
+    """
+    return re.sub(r'\s+', '', str(oem_code)).upper()
+
+
+class ResultCache:
+    """SQLite-backed (site, OEM code) -> result cache"""
+
+    def __init__(self, path=None, ttls=None):
+        """
+        Args:
+            path (str): SQLite file (config.RESULT_CACHE_FILE if None)
+            ttls (dict): Site name -> TTL in seconds (config.RESULT_CACHE_TTL if None)
+        """
+        self.path = path or config.RESULT_CACHE_FILE
+        self.ttls = ttls if ttls is not None else config.RESULT_CACHE_TTL
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                site TEXT NOT NULL,
+                code TEXT NOT NULL,
+                title TEXT,
+                price TEXT,
+                status TEXT,
+                url TEXT,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (site, code)
+            )
+        """)
+        self._conn.commit()
+
+    def ttl_for(self, site):
+        """Seconds a result for the site stays fresh (0 disables caching)"""
+        return self.ttls.get(site, config.DEFAULT_RESULT_CACHE_TTL) or 0
+
+    def get(self, site, oem_code):
+        """
+        Look up a fresh cached result.
+
+        Args:
+            site (str): Website name (e.g. 'HotToner')
+            oem_code: OEM code as read from the sheet
+
+        Returns:
+            dict or None: Result in the scrapers' format, or None on a miss
+        """
+        ttl = self.ttl_for(site)
+        if ttl <= 0:
+            return None
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT title, price, status, url FROM results "
+                "WHERE site = ? AND code = ? AND fetched_at >= ?",
+                (site, normalize_code(oem_code), time.time() - ttl)
+            ).fetchone()
+
+        if row is None:
+            return None
+        title, price, status, url = row
+        return {
+            "OEM_CODE": oem_code,
+            "Title": title,
+            "Price": price,
+            "Website": site,
+            "Status": status,
+            "URL": url
+        }
+
+    def put(self, site, oem_code, result):
+        """
+        Store a result. Errors are never cached.
+
+        Args:
+            site (str): Website name
+            oem_code: OEM code as read from the sheet
+            result (dict): Result in the scrapers' format
+        """
+        if not result or result.get("Status") == "Error" or self.ttl_for(site) <= 0:
+            return
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (site, code, title, price, status, url, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (site, normalize_code(oem_code), result.get("Title"), result.get("Price"),
+                 result.get("Status"), result.get("URL"), time.time())
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """
+    Get the result cache shared by every job in this process.
+
+    Returns:
+        ResultCache: Shared cache
+    """
+    global _result_cache
+    with _result_cache_lock:
+        if _result_cache is None:
+            _result_cache = ResultCache()
+        return _result_cache
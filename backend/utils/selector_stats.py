@@ -0,0 +1,199 @@
+"""
+Adaptive ordering of selector cascades.
+
+Parsers try a list of selectors per field (product card, title, price)
+until one matches. This module records which selector matched for each
+site and field and hands the cascade back with the recent winners first,
+so a page normally costs one selector instead of every miss before it.
+
+Scores decay on every hit (SELECTOR_SCORE_DECAY), so when a site changes
+its markup the new winner overtakes the old one within a few dozen pages.
+Hits are kept in SQLite, shared by the API process and the parse workers
+and kept across restarts.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+import config
+
+
+class SelectorStats:
+    """Per-site, per-field selector hit counts and decayed scores"""
+
+    def __init__(self, path=None, decay=None, flush_every=None, flush_seconds=None):
+        """
+        Args:
+            path (str): SQLite file (config.SELECTOR_STATS_FILE if None)
+            decay (float): Score multiplier applied to a field's selectors on each hit
+            flush_every (int): Hits buffered before they are written
+            flush_seconds (float): Longest time hits stay buffered
+        """
+        self.path = path or config.SELECTOR_STATS_FILE
+        self.decay = decay or config.SELECTOR_SCORE_DECAY
+        self.flush_every = flush_every or config.SELECTOR_STATS_FLUSH_EVERY
+        self.flush_seconds = flush_seconds or config.SELECTOR_STATS_FLUSH_SECONDS
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS selector_hits (
+                site TEXT NOT NULL,
+                field TEXT NOT NULL,
+                selector TEXT NOT NULL,
+                hits INTEGER NOT NULL,
+                score REAL NOT NULL,
+                last_hit REAL NOT NULL,
+                PRIMARY KEY (site, field, selector)
+            )
+        """)
+        self._conn.commit()
+
+        self._scores = {}    # (site, field) -> {selector: score} (stored + local hits)
+        self._pending = {}   # (site, field) -> {selector: hits not yet written}
+        self._pending_count = 0
+        self._last_flush = time.monotonic()
+        self._reload()
+
+    def _reload(self):
+        scores = {}
+        for site, field, selector, score in self._conn.execute(
+                "SELECT site, field, selector, score FROM selector_hits"):
+            scores.setdefault((site, field), {})[selector] = score
+        self._scores = scores
+
+    def order(self, site, field, selectors):
+        """
+        Cascade with the best-scoring selectors first.
+
+        Args:
+            site (str): Website name
+            field (str): What the cascade extracts (e.g. 'product', 'title')
+            selectors (list): Selectors in declaration order
+
+        Returns:
+            list: Same selectors; ties keep declaration order
+        """
+        scores = self._scores.get((site, field))
+        if not scores:
+            return selectors
+        return sorted(selectors, key=lambda selector: -scores.get(selector, 0.0))
+
+    def hit(self, site, field, selector):
+        """
+        Record that a selector produced the field's value.
+
+        Args:
+            site (str): Website name
+            field (str): Cascade name
+            selector (str): Selector that matched
+        """
+        key = (site, field)
+        with self._lock:
+            scores = self._scores.setdefault(key, {})
+            for other in scores:
+                scores[other] *= self.decay
+            scores[selector] = scores.get(selector, 0.0) + 1.0
+
+            pending = self._pending.setdefault(key, {})
+            pending[selector] = pending.get(selector, 0) + 1
+            self._pending_count += 1
+
+            if (self._pending_count >= self.flush_every
+                    or time.monotonic() - self._last_flush >= self.flush_seconds):
+                self._flush_locked()
+
+    def flush(self):
+        """Write buffered hits and pick up other processes' hits"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        now = time.time()
+        try:
+            for (site, field), counts in self._pending.items():
+                total = sum(counts.values())
+                self._conn.execute(
+                    "UPDATE selector_hits SET score = score * ? WHERE site = ? AND field = ?",
+                    (self.decay ** total, site, field)
+                )
+                for selector, hits in counts.items():
+                    self._conn.execute(
+                        "INSERT INTO selector_hits (site, field, selector, hits, score, last_hit) "
+                        "VALUES (?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT (site, field, selector) DO UPDATE SET "
+                        "hits = hits + excluded.hits, score = score + excluded.score, "
+                        "last_hit = excluded.last_hit",
+                        (site, field, selector, hits, float(hits), now)
+                    )
+            self._conn.commit()
+            self._reload()
+        except sqlite3.Error as e:
+            # Stats are only an optimisation - never fail a parse over them
+            print(f"⚠️  Could not save selector stats: {e}")
+        self._pending = {}
+        self._pending_count = 0
+        self._last_flush = time.monotonic()
+
+    def snapshot(self):
+        """
+        Stored statistics for metrics.
+
+        Returns:
+            dict: site -> field -> [{'selector', 'hits', 'score'}] best first
+        """
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT site, field, selector, hits, score FROM selector_hits "
+                "ORDER BY site, field, score DESC"
+            ).fetchall()
+        stats = {}
+        for site, field, selector, hits, score in rows:
+            stats.setdefault(site, {}).setdefault(field, []).append(
+                {'selector': selector, 'hits': hits, 'score': round(score, 2)}
+            )
+        return stats
+
+
+_selector_stats = None
+_selector_stats_pid = None
+_selector_stats_lock = threading.Lock()
+
+
+def get_selector_stats():
+    """
+    Get this process's selector statistics, or None if disabled.
+
+    Returns:
+        SelectorStats or None: Shared statistics
+    """
+    global _selector_stats, _selector_stats_pid
+    if not config.SELECTOR_STATS_ENABLED:
+        return None
+    with _selector_stats_lock:
+        # A forked child must not share the parent's SQLite connection
+        if _selector_stats is None or _selector_stats_pid != os.getpid():
+            _selector_stats = SelectorStats()
+            _selector_stats_pid = os.getpid()
+        return _selector_stats
+
+
+def ordered(site, field, selectors):
+    """Cascade to try, best recent winner first (unchanged if stats are off)"""
+    stats = get_selector_stats()
+    return stats.order(site, field, selectors) if stats else selectors
+
+
+def record_hit(site, field, selector):
+    """Record the selector that matched, if stats are on"""
+    stats = get_selector_stats()
+    if stats:
+        stats.hit(site, field, selector)
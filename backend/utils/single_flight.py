@@ -0,0 +1,100 @@
+"""
+Single-flight coalescing of identical lookups across jobs.
+
+Teams share cartridge lists, so concurrent jobs often contain the same
+codes. The first job to ask for a (site, normalised code) leads the
+lookup; every other job that asks while it is in flight gets a future
+for the leader's result instead of fetching the page again. Once the
+leader resolves, later lookups are served by the result cache.
+"""
+import threading
+from concurrent.futures import Future
+
+from utils.result_cache import normalize_code
+
+
+def flight_key(site, oem_code):
+    """Key identifying a lookup: (site, normalised code)"""
+    return site, normalize_code(oem_code)
+
+
+class SingleFlight:
+    """Registry of lookups currently in flight"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}    # key -> Future
+        self.stats = {'led': 0, 'coalesced': 0}
+
+    def claim(self, key):
+        """
+        Join or start the lookup for a key.
+
+        Args:
+            key (tuple): See flight_key()
+
+        Returns:
+            tuple: (leader, future). A leader must fetch and then call
+                resolve() or fail(); everyone else waits on the future.
+        """
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                self.stats['coalesced'] += 1
+                return False, future
+            future = Future()
+            # Running futures cannot be cancelled, so one follower giving
+            # up cannot take the result away from the others
+            future.set_running_or_notify_cancel()
+            self._flights[key] = future
+            self.stats['led'] += 1
+            return True, future
+
+    def resolve(self, key, result):
+        """
+        Hand the leader's result to every waiting job.
+
+        Args:
+            key (tuple): Key that was claimed
+            result: Lookup result (None if nothing usable was found)
+        """
+        with self._lock:
+            future = self._flights.pop(key, None)
+        if future is not None:
+            future.set_result(result)
+
+    def fail(self, key, error):
+        """
+        Tell waiting jobs the leader gave up on a lookup.
+
+        Args:
+            key (tuple): Key that was claimed
+            error (Exception): Raised from the followers' future.result()
+        """
+        with self._lock:
+            future = self._flights.pop(key, None)
+        if future is not None:
+            future.set_exception(error)
+
+    def metrics(self):
+        """Lookups led and coalesced so far, and how many are in flight"""
+        with self._lock:
+            return {**self.stats, 'in_flight': len(self._flights)}
+
+
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight():
+    """
+    Get the registry shared by every job in this process.
+
+    Returns:
+        SingleFlight: Shared registry
+    """
+    global _single_flight
+    with _single_flight_lock:
+        if _single_flight is None:
+            _single_flight = SingleFlight()
+        return _single_flight
@@ -0,0 +1,37 @@
+"""
+Helpers for SQLite files opened by several API processes at once.
+"""
+import sqlite3
+import time
+
+
+def connect_shared(path, timeout=10, **kwargs):
+    """
+    Open a SQLite file other processes may be opening at the same moment,
+    in WAL mode.
+
+    Switching a new file to WAL does not wait on the busy timeout: the
+    process that loses the race gets "database is locked" straight away.
+    The switch is retried for up to `timeout` seconds instead.
+
+    Args:
+        path (str): SQLite file
+        timeout (float): Seconds to wait on another process's lock
+        **kwargs: Passed on to sqlite3.connect
+
+    Returns:
+        sqlite3.Connection: Connection in WAL mode
+    """
+    conn = sqlite3.connect(path, timeout=timeout, **kwargs)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            break
+        except sqlite3.OperationalError:
+            if time.monotonic() >= deadline:
+                conn.close()
+                raise
+            time.sleep(0.05)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
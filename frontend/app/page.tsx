@@ -1,6 +1,6 @@
 'use client'
 
-import { useState } from 'react'
+import { useEffect, useRef, useState } from 'react'
 import { Upload, Mail, Loader2, CheckCircle, XCircle, Download } from 'lucide-react'
 import axios from 'axios'
 
@@ -13,6 +13,11 @@ export default function Home() {
   const [progress, setProgress] = useState({ current: 0, total: 0 })
   const [message, setMessage] = useState('')
   const [jobId, setJobId] = useState<string | null>(null)
+  const [lastResult, setLastResult] = useState<Record<string, string> | null>(null)
+  const eventsRef = useRef<EventSource | null>(null)
+
+  // Close the progress stream when the page goes away
+  useEffect(() => () => eventsRef.current?.close(), [])
 
   const handleFileChange = (e: React.ChangeEvent<HTMLInputElement>) => {
     if (e.target.files && e.target.files[0]) {
@@ -45,11 +50,12 @@ export default function Home() {
       })
 
       setJobId(response.data.job_id)
+      setLastResult(null)
       setStatus('scraping')
       setMessage('Scraping in progress... This may take 1-2 hours.')
       
-      // Start polling for status
-      pollStatus(response.data.job_id)
+      // Follow progress as the server pushes it
+      watchJob(response.data.job_id)
       
     } catch (error: any) {
       setStatus('error')
@@ -57,23 +63,75 @@ export default function Home() {
     }
   }
 
+  const showJob = (data: any) => {
+    const { status: jobStatus, progress: jobProgress, message: jobMessage, queue } = data
+
+    if (jobProgress) {
+      setProgress(jobProgress)
+    }
+    if (queue) {
+      const start = queue.estimated_start
+        ? `, expected to start around ${new Date(queue.estimated_start).toLocaleTimeString()}`
+        : ''
+      setMessage(`Waiting for a free slot (position ${queue.position} in queue${start})`)
+    } else if (jobMessage) {
+      setMessage(jobMessage)
+    }
+
+    if (jobStatus === 'completed') {
+      setStatus('success')
+      setMessage('Scraping completed! Results sent to your email.')
+    } else if (jobStatus === 'error') {
+      setStatus('error')
+      setMessage(jobMessage)
+    }
+    return jobStatus === 'completed' || jobStatus === 'error'
+  }
+
+  const watchJob = (jobId: string) => {
+    if (typeof EventSource === 'undefined') {
+      pollStatus(jobId)
+      return
+    }
+
+    eventsRef.current?.close()
+    const events = new EventSource(`${API_URL}/api/events/${jobId}`)
+    eventsRef.current = events
+    let finished = false
+
+    const handle = (e: MessageEvent) => {
+      const data = JSON.parse(e.data)
+      if (showJob(data)) {
+        finished = true
+        events.close()
+      } else if (data.stream === 'closed') {
+        // The server stopped following a job that no longer changes
+        finished = true
+        events.close()
+        pollStatus(jobId)
+      }
+    }
+    events.addEventListener('status', handle)
+    events.addEventListener('progress', handle)
+    events.addEventListener('done', handle)
+    events.addEventListener('queue', (e: MessageEvent) => showJob({ queue: JSON.parse(e.data) }))
+    events.addEventListener('result', (e: MessageEvent) => setLastResult(JSON.parse(e.data)))
+
+    events.onerror = () => {
+      // EventSource reconnects by itself; only give up if the server refused
+      if (!finished && events.readyState === EventSource.CLOSED) {
+        pollStatus(jobId)
+      }
+    }
+  }
+
+  // Fallback when the event stream is unavailable
   const pollStatus = async (jobId: string) => {
     const interval = setInterval(async () => {
       try {
         const response = await axios.get(`${API_URL}/api/status/${jobId}`)
-        const { status: jobStatus, progress: jobProgress, message: jobMessage } = response.data
-
-        setProgress(jobProgress)
-        setMessage(jobMessage)
-
-        if (jobStatus === 'completed') {
-          clearInterval(interval)
-          setStatus('success')
-          setMessage('Scraping completed! Results sent to your email.')
-        } else if (jobStatus === 'error') {
+        if (showJob(response.data)) {
           clearInterval(interval)
-          setStatus('error')
-          setMessage(jobMessage)
         }
       } catch (error) {
         console.error('Status polling error:', error)
@@ -105,7 +163,7 @@ export default function Home() {
               <div className="relative">
                 <input
                   type="file"
-                  accept=".xlsx,.xls"
+                  accept=".xlsx,.xls,.csv"
                   onChange={handleFileChange}
                   className="block w-full text-sm text-gray-500
                     file:mr-4 file:py-2 file:px-4
@@ -202,6 +260,11 @@ export default function Home() {
                           style={{ width: `${(progress.current / progress.total) * 100}%` }}
                         ></div>
                       </div>
+                      {lastResult && (
+                        <p className="mt-1 text-xs text-gray-500">
+                          Latest: {lastResult.OEM_CODE} — Ink Station {lastResult['Ink Station']}, Hot Tonner {lastResult['Hot Tonner']}
+                        </p>
+                      )}
                     </div>
                   )}
                 </div>